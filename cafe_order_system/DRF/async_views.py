@@ -0,0 +1,214 @@
+import json
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.http import HttpResponse, JsonResponse
+from django.utils.cache import patch_cache_control
+from django.utils.decorators import method_decorator
+from django.utils.http import parse_etags
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.settings import api_settings
+
+from orders.cache import aget_cached_products, aget_products_version
+from orders.forms import OrderFilterForm
+from orders.models import Order, OrderConflictError, Product
+from .pagination import DefaultCursorPagination
+from .serializers import (
+    ORDER_VALUES,
+    PRODUCT_VALUES,
+    OrderSerializer,
+    order_rows,
+    product_rows,
+)
+
+NOT_FOUND = {"detail": "Не найдено."}
+
+
+def get_page_size(request):
+    """Размер страницы из параметра `page_size` в пределах, принятых в API."""
+    try:
+        size = int(request.GET[DefaultCursorPagination.page_size_query_param])
+    except (KeyError, ValueError):
+        return api_settings.PAGE_SIZE
+    return max(1, min(size, DefaultCursorPagination.max_page_size))
+
+
+def page_payload(request, rows, page_size, results, key):
+    """
+    Формирует страницу списка. Строк выбирается на одну больше размера
+    страницы; ссылка `next` продолжает выборку после последней записи
+    страницы (параметр `after`).
+    """
+    next_url = None
+    if len(rows) > page_size:
+        query = request.GET.copy()
+        query["after"] = key(rows[page_size - 1])
+        next_url = request.build_absolute_uri(f"{request.path}?{query.urlencode()}")
+    return {"next": next_url, "results": results}
+
+
+class AsyncOrderList(View):
+    """
+    Асинхронный список неархивированных заказов с позициями.
+
+    Выдаёт те же данные, что и `/api/orders/`, но работает через асинхронный
+    ORM: под ASGI ожидающий базу запрос не занимает поток. Фильтры `status`
+    и `table` (номер стола) и курсор `after` — как в HTML-списке заказов.
+    """
+
+    async def get(self, request):
+        form = OrderFilterForm(request.GET)
+        if not form.is_valid():
+            return JsonResponse(form.errors, status=400)
+
+        queryset = Order.objects.filter(archived=False).order_by("-pk")
+        if form.cleaned_data["status"]:
+            queryset = queryset.filter(status=form.cleaned_data["status"])
+        if form.cleaned_data["table"]:
+            queryset = queryset.filter(table_number__number=form.cleaned_data["table"])
+        if form.cleaned_data["after"]:
+            queryset = queryset.filter(pk__lt=form.cleaned_data["after"])
+
+        page_size = get_page_size(request)
+        rows = queryset.values(*ORDER_VALUES)[: page_size + 1]
+        orders = [row async for row in rows]
+        results = await sync_to_async(order_rows)(orders[:page_size])
+        return JsonResponse(
+            page_payload(request, orders, page_size, results, key=lambda o: o["pk"])
+        )
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class AsyncOrderDetail(View):
+    """
+    Асинхронные просмотр заказа и смена его статуса.
+
+    PATCH принимает `status` и необязательную `version`: как и в синхронном
+    API, заказ, изменённый после чтения клиентом, не перезаписывается (409).
+    """
+
+    http_method_names = ["get", "patch"]
+
+    async def get(self, request, pk):
+        orders = Order.objects.filter(pk=pk, archived=False).values(*ORDER_VALUES)
+        row = await orders.afirst()
+        if row is None:
+            return JsonResponse(NOT_FOUND, status=404)
+        results = await sync_to_async(order_rows)([row])
+        return JsonResponse(results[0])
+
+    async def patch(self, request, pk):
+        try:
+            data = json.loads(request.body)
+        except ValueError:
+            return JsonResponse({"detail": "Некорректный JSON."}, status=400)
+        errors = validate_status_change(data)
+        if errors:
+            return JsonResponse(errors, status=400)
+
+        try:
+            order = await Order.objects.with_items().aget(pk=pk, archived=False)
+        except Order.DoesNotExist:
+            return JsonResponse(NOT_FOUND, status=404)
+        try:
+            order.check_status_change(data["status"])
+        except ValidationError as exc:
+            return JsonResponse(exc.message_dict, status=400)
+        order.status = data["status"]
+        if data.get("version"):
+            order.version = data["version"]
+        try:
+            await save_status(order)
+        except OrderConflictError:
+            return JsonResponse(
+                {"detail": "Заказ был изменён другим запросом. Получите его заново."},
+                status=409,
+            )
+        return JsonResponse(OrderSerializer(order).data)
+
+
+def validate_status_change(data):
+    """Проверяет тело запроса смены статуса; возвращает словарь ошибок."""
+    if not isinstance(data, dict):
+        return {"detail": "Ожидается JSON-объект."}
+    errors = {}
+    if data.get("status") not in dict(Order.STATUS_CHOICES):
+        errors["status"] = ["Недопустимый статус."]
+    version = data.get("version")
+    if version is not None and (type(version) is not int or version < 1):
+        errors["version"] = ["Должно быть целым положительным числом."]
+    return errors
+
+
+@sync_to_async
+def save_status(order):
+    """
+    Сохраняет новый статус заказа.
+
+    Транзакции в асинхронном коде недоступны, поэтому сохранение вместе
+    с обработчиками сигналов выполняется в синхронном потоке.
+    """
+    with transaction.atomic():
+        order.save(update_fields=["status"])
+
+
+async def cached_products_response(request, compute):
+    """
+    Отдаёт данные меню из кэша с ETag текущей версии меню.
+    Если клиент уже знает эту версию (`If-None-Match`), возвращает 304.
+    Ключ кэша — полный адрес запроса: ссылка `next` абсолютная.
+    """
+    version = await aget_products_version()
+    etag = f'"products-{version}"'
+    client_etags = parse_etags(request.headers.get("If-None-Match", ""))
+    if etag in client_etags or "*" in client_etags:
+        response = HttpResponse(status=304)
+    else:
+        data = await aget_cached_products(
+            f"async:{request.build_absolute_uri()}", compute, version=version
+        )
+        if not data:
+            return JsonResponse(NOT_FOUND, status=404)
+        response = JsonResponse(data, safe=False)
+    response["ETag"] = etag
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+class AsyncProductList(View):
+    """
+    Асинхронное меню в алфавитном порядке из кэша меню.
+    Следующая страница начинается после блюда из параметра `after`.
+    """
+
+    async def get(self, request):
+        async def compute():
+            queryset = Product.objects.order_by("name")
+            if request.GET.get("after"):
+                queryset = queryset.filter(name__gt=request.GET["after"])
+            page_size = get_page_size(request)
+            rows = queryset.values(*PRODUCT_VALUES)[: page_size + 1]
+            products = [row async for row in rows]
+            results = product_rows(products[:page_size])
+            return page_payload(
+                request, products, page_size, results, key=lambda p: p["name"]
+            )
+
+        return await cached_products_response(request, compute)
+
+
+class AsyncProductDetail(View):
+    """Асинхронная карточка блюда из кэша меню."""
+
+    async def get(self, request, pk):
+        async def compute():
+            products = Product.objects.filter(pk=pk).values(*PRODUCT_VALUES)
+            row = await products.afirst()
+            if row is None:
+                # Отсутствие блюда тоже кэшируется до следующей смены меню.
+                return {}
+            return product_rows([row])[0]
+
+        return await cached_products_response(request, compute)
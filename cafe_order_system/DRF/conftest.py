@@ -1,6 +1,18 @@
 import pytest
+from django.core.cache import cache
 from rest_framework.test import APIClient
-from orders.models import Product, Order, Table
+from orders.models import Product, Order, OrderItem, Table
+
+
+@pytest.fixture(autouse=True)
+def clear_cache() -> None:
+    """
+    Фикстура, очищающая кэш перед каждым тестом.
+
+    Кэш в памяти процесса переживает откат транзакции тестовой базы,
+    поэтому без очистки тесты видели бы данные друг друга.
+    """
+    cache.clear()
 
 
 @pytest.fixture
@@ -63,7 +75,10 @@ def order(db, table: Table, product1: Product, product2: Product) -> Order:
         Order: Заказ, связанный с переданным столом и продуктами, с вычисленной общей стоимостью.
     """
     order = Order.objects.create(table_number=table, status="waiting")
-    order.products.set([product1, product2])
+    OrderItem.objects.bulk_create(
+        OrderItem(order=order, product=product, unit_price=product.price)
+        for product in (product1, product2)
+    )
     order.calculate_total_price()
     order.save()
     return order
@@ -0,0 +1,87 @@
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+from orders.cache import get_cached_products, get_products_version
+
+
+class CachedProductReadMixin:
+    """
+    Примесь для ViewSet, отдающих данные меню из кэша.
+
+    Ответы `list` и `retrieve` кэшируются по полному адресу запроса (со схемой
+    и хостом: ссылки курсора `next`/`previous` абсолютные) в пределах текущей
+    версии меню и сопровождаются ETag. Если клиент присылает `If-None-Match`
+    с актуальной версией, возвращается 304 без обращения к базе данных.
+    """
+
+    def cached_response(self, request, view, *args, **kwargs):
+        """Отдаёт ответ из кэша или вычисляет его обработчиком `view`."""
+        version = get_products_version()
+        etag = f'"products-{version}"'
+        client_etags = parse_etags(request.headers.get("If-None-Match", ""))
+        if etag in client_etags or "*" in client_etags:
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = None
+
+            def compute():
+                nonlocal response
+                response = view(request, *args, **kwargs)
+                return response.data
+
+            data = get_cached_products(
+                f"api:{request.build_absolute_uri()}", compute, version=version
+            )
+            if response is None:
+                response = Response(data)
+
+        response["ETag"] = etag
+        patch_cache_control(response, no_cache=True)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(request, super().retrieve, *args, **kwargs)
+
+
+class ValuesReadMixin:
+    """
+    Примесь для ModelViewSet с быстрым чтением.
+
+    `list` и `retrieve` выбирают строки `values(*values_fields)` и строят
+    ответ функцией `serialize_rows` — без экземпляров моделей и полей
+    сериализатора, которые на списках занимают большую часть времени ответа.
+    Запись по-прежнему идёт через `serializer_class`, формат ответов тот же.
+
+    Атрибуты:
+        values_fields: Поля для `values()`; должны включать поле сортировки
+                       курсорной пагинации.
+        serialize_rows: Функция, превращающая список строк в данные ответа.
+    """
+
+    values_fields = ()
+    serialize_rows = None
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ("list", "retrieve"):
+            queryset = (
+                queryset.select_related(None)
+                .prefetch_related(None)
+                .values(*self.values_fields)
+            )
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(self.serialize_rows(page))
+        return Response(self.serialize_rows(list(queryset)))
+
+    def retrieve(self, request, *args, **kwargs):
+        return Response(self.serialize_rows([self.get_object()])[0])
@@ -0,0 +1,51 @@
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+
+
+class DefaultCursorPagination(CursorPagination):
+    """
+    Курсорная пагинация по умолчанию для списков API.
+
+    Страница выбирается условием по ключу сортировки, а не OFFSET, поэтому
+    время ответа не зависит от того, насколько далеко клиент пролистал список.
+    Общее число записей (`COUNT(*)`) считается только по запросу `?count=true`.
+
+    Атрибуты:
+        ordering: Поле сортировки; должно быть уникальным и неизменным.
+        page_size_query_param: Параметр для выбора размера страницы.
+        max_page_size: Максимальный размер страницы.
+        count_query_param: Параметр, включающий подсчёт общего числа записей.
+    """
+
+    ordering = "-pk"
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+    count_query_param = "count"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count = None
+        if request.query_params.get(self.count_query_param, "").lower() in (
+            "1",
+            "true",
+            "yes",
+        ):
+            self.count = queryset.count()
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        payload = {"next": self.get_next_link(), "previous": self.get_previous_link()}
+        if self.count is not None:
+            payload["count"] = self.count
+        payload["results"] = data
+        return Response(payload)
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema["properties"]["count"] = {"type": "integer", "example": 123}
+        return response_schema
+
+
+class ProductCursorPagination(DefaultCursorPagination):
+    """Курсорная пагинация меню в алфавитном порядке (название уникально)."""
+
+    ordering = "name"
@@ -0,0 +1,38 @@
+import orjson
+from rest_framework.renderers import JSONRenderer
+
+UNICODE_LINE_SEPARATORS = (
+    ("\u2028".encode(), b"\\u2028"),
+    ("\u2029".encode(), b"\\u2029"),
+)
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSON-рендерер на orjson.
+
+    Для компактного UTF-8 вывода (настройки DRF по умолчанию) выдаёт те же
+    байты, что и `JSONRenderer`, но кодирует ответ в несколько раз быстрее.
+    Даты, Decimal и другие типы, которые orjson не кодирует так же, как DRF,
+    передаются кодировщику DRF. Форматированный вывод (`indent` в заголовке
+    Accept, Browsable API) и нестандартные настройки `UNICODE_JSON`
+    и `COMPACT_JSON` обрабатывает базовый рендерер.
+    """
+
+    options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if indent is not None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = orjson.dumps(
+            data, default=self.encoder_class().default, option=self.options
+        )
+        # Как и JSONRenderer, экранирует разделители строк, недопустимые в JavaScript.
+        for raw, escaped in UNICODE_LINE_SEPARATORS:
+            if raw in ret:
+                ret = ret.replace(raw, escaped)
+        return ret
@@ -1,6 +1,9 @@
-from dataclasses import fields
+from collections import defaultdict
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
 from rest_framework import serializers
-from orders.models import Product
+from orders.models import Order, OrderItem, Product, Table
 
 
 class ProductListSerializer(serializers.ModelSerializer):
@@ -17,3 +20,315 @@ class ProductListSerializer(serializers.ModelSerializer):
             "name",
             "price",
         ]
+
+
+class BulkPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Поле связи по первичному ключу для пакетной валидации.
+
+    Если в контексте сериализатора есть `related_objects` — словарь
+    {модель: {pk: объект}}, заполненный заранее одним запросом на модель,
+    объект берётся оттуда, а не запрашивается отдельно для каждого значения.
+    """
+
+    def to_internal_value(self, data):
+        objects = self.context.get("related_objects", {}).get(self.queryset.model)
+        if objects is None:
+            return super().to_internal_value(data)
+        if isinstance(data, bool):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        try:
+            pk = int(data)
+        except (TypeError, ValueError):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        if pk not in objects:
+            self.fail("does_not_exist", pk_value=data)
+        return objects[pk]
+
+
+def load_related_objects(orders_data):
+    """
+    Загружает столы и блюда, упомянутые в сырых данных заказов,
+    по одному запросу на модель.
+
+    Возвращает:
+        dict: Словарь {модель: {pk: объект}} для `BulkPrimaryKeyRelatedField`.
+    """
+    table_ids, product_ids = [], []
+    for order_data in orders_data:
+        if not isinstance(order_data, dict):
+            continue
+        table_ids.append(order_data.get("table_number"))
+        items = order_data.get("items")
+        if isinstance(items, list):
+            product_ids.extend(
+                item.get("product") for item in items if isinstance(item, dict)
+            )
+    return {
+        Table: Table.objects.in_bulk(_int_ids(table_ids)),
+        Product: Product.objects.in_bulk(_int_ids(product_ids)),
+    }
+
+
+def _int_ids(values):
+    """
+    Оставляет только числа и строки, которые можно привести к целому ключу.
+    Остальные значения (списки, словари) отклонит валидация поля.
+    """
+    ids = set()
+    for value in values:
+        if isinstance(value, bool) or not isinstance(value, (int, str)):
+            continue
+        try:
+            ids.add(int(value))
+        except (TypeError, ValueError):
+            pass
+    return ids
+
+
+class OrderItemSerializer(serializers.ModelSerializer):
+    """
+    Сериализатор позиции заказа.
+
+    Блюдо передаётся первичным ключом, цена за единицу только для чтения:
+    она фиксируется по цене блюда при создании позиции.
+    """
+
+    product = BulkPrimaryKeyRelatedField(queryset=Product.objects.all())
+
+    class Meta:
+        model = OrderItem
+        fields = ["product", "quantity", "unit_price"]
+        read_only_fields = ["unit_price"]
+        extra_kwargs = {"quantity": {"min_value": 1}}
+
+
+class OrderListSerializer(serializers.ListSerializer):
+    """
+    Сериализатор пакета заказов.
+
+    Весь пакет валидируется целиком (связанные столы и блюда загружаются
+    одним запросом на модель) и записывается в одной транзакции
+    двумя массовыми вставками.
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            self.context["related_objects"] = load_related_objects(data)
+        return super().to_internal_value(data)
+
+    def create(self, validated_data):
+        with transaction.atomic():
+            return self.child.create_orders(validated_data)
+
+
+class OrderSerializer(serializers.ModelSerializer):
+    """
+    Сериализатор заказа с позициями.
+
+    При создании позиции обязательны; при обновлении переданный список
+    `items` заменяет позиции заказа, сохраняя цену уже заказанных блюд.
+    Переданная при обновлении `version` — версия, которую видел клиент:
+    если заказ с тех пор изменился, сохранение завершится `OrderConflictError`.
+    """
+
+    table_number = BulkPrimaryKeyRelatedField(queryset=Table.objects.all())
+    items = OrderItemSerializer(many=True)
+    version = serializers.IntegerField(required=False, min_value=1)
+
+    class Meta:
+        model = Order
+        fields = [
+            "id",
+            "table_number",
+            "status",
+            "total_price",
+            "archived",
+            "version",
+            "items",
+        ]
+        read_only_fields = ["total_price", "archived"]
+        list_serializer_class = OrderListSerializer
+
+    def to_internal_value(self, data):
+        if self.root is self:
+            self.context["related_objects"] = load_related_objects([data])
+        return super().to_internal_value(data)
+
+    def validate_status(self, status):
+        """Проверяет смену статуса изменяемого заказа по `STATUS_TRANSITIONS`."""
+        if self.instance is not None:
+            try:
+                self.instance.check_status_change(status)
+            except DjangoValidationError as exc:
+                raise serializers.ValidationError(exc.message_dict["status"])
+        return status
+
+    def validate_items(self, items):
+        """Проверяет, что позиции есть и блюда в них не повторяются."""
+        if not items:
+            raise serializers.ValidationError(
+                "Заказ должен содержать хотя бы одно блюдо."
+            )
+        products = [item["product"].pk for item in items]
+        if len(products) != len(set(products)):
+            raise serializers.ValidationError("Блюда в заказе не должны повторяться.")
+        return items
+
+    def create_orders(self, validated_data):
+        """Создаёт заказы из списка провалидированных данных пакетной вставкой."""
+        entries = []
+        for order_data in validated_data:
+            order_data = dict(order_data)
+            order_data.pop("version", None)
+            items = [OrderItem(**item) for item in order_data.pop("items")]
+            entries.append((Order(**order_data), items))
+        return Order.objects.create_with_items(entries)
+
+    def create(self, validated_data):
+        with transaction.atomic():
+            return self.create_orders([validated_data])[0]
+
+    def update(self, instance, validated_data):
+        items = validated_data.pop("items", None)
+        with transaction.atomic():
+            instance = super().update(instance, validated_data)
+            if items is not None:
+                self.replace_items(instance, items)
+        return instance
+
+    def replace_items(self, order, items):
+        """Заменяет позиции заказа и пересчитывает его стоимость."""
+        prices = dict(order.items.values_list("product_id", "unit_price"))
+        order.items.all().delete()
+        OrderItem.objects.bulk_create(
+            OrderItem(
+                order=order,
+                product=item["product"],
+                quantity=item.get("quantity", 1),
+                unit_price=prices.get(item["product"].pk, item["product"].price),
+            )
+            for item in items
+        )
+        Order.objects.filter(pk=order.pk).update_totals()
+        order.refresh_from_db(fields=["total_price"])
+
+
+class OrderStatusBatchSerializer(serializers.Serializer):
+    """Массовая смена статуса: заказы и статус, в который их перевести."""
+
+    orders = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False, max_length=500
+    )
+    status = serializers.ChoiceField(choices=Order.STATUS_CHOICES)
+
+
+class ProductSearchSerializer(serializers.Serializer):
+    """Параметры поиска блюд: строка запроса и число подсказок."""
+
+    q = serializers.CharField(max_length=100, trim_whitespace=True)
+    limit = serializers.IntegerField(min_value=1, max_value=50, default=10)
+
+
+class SalesPeriodSerializer(serializers.Serializer):
+    """Параметры периода отчёта о продажах (обе границы включительно)."""
+
+    date_from = serializers.DateField(required=False)
+    date_to = serializers.DateField(required=False)
+
+    def validate(self, attrs):
+        date_from, date_to = attrs.get("date_from"), attrs.get("date_to")
+        if date_from and date_to and date_from > date_to:
+            raise serializers.ValidationError("date_from не может быть позже date_to.")
+        return attrs
+
+
+class DailySalesSerializer(serializers.Serializer):
+    """Продажи за день: число закрытых заказов и выручка."""
+
+    date = serializers.DateField()
+    orders_count = serializers.IntegerField()
+    revenue = serializers.DecimalField(max_digits=14, decimal_places=2)
+
+
+class ProductSalesSerializer(serializers.Serializer):
+    """Продажи блюда за период."""
+
+    product = serializers.IntegerField()
+    name = serializers.CharField()
+    quantity = serializers.IntegerField()
+    revenue = serializers.DecimalField(max_digits=14, decimal_places=2)
+
+
+class TableSalesSerializer(serializers.Serializer):
+    """Продажи стола за период."""
+
+    table = serializers.IntegerField()
+    number = serializers.IntegerField()
+    orders_count = serializers.IntegerField()
+    revenue = serializers.DecimalField(max_digits=14, decimal_places=2)
+
+
+class TableBoardSerializer(serializers.Serializer):
+    """Состояние стола в зале: занятость и открытые заказы."""
+
+    id = serializers.IntegerField()
+    number = serializers.IntegerField()
+    is_occupied = serializers.BooleanField()
+    open_orders = serializers.IntegerField()
+    open_total = serializers.DecimalField(max_digits=14, decimal_places=2)
+
+
+# Быстрое чтение: ответы строятся из строк values() без создания экземпляров
+# моделей и без полей сериализаторов. Формат совпадает с ProductListSerializer
+# и OrderSerializer (цены — строки с двумя знаками, связи — первичные ключи).
+
+PRODUCT_VALUES = ("name", "price")
+ORDER_VALUES = ("pk", "table_number", "status", "total_price", "archived", "version")
+
+
+def decimal_string(value):
+    """Денежное значение из базы в том же виде, что и `DecimalField` DRF."""
+    return None if value is None else f"{value:f}"
+
+
+def product_rows(rows):
+    """Представление блюд из строк `values(*PRODUCT_VALUES)`."""
+    return [
+        {"name": row["name"], "price": decimal_string(row["price"])} for row in rows
+    ]
+
+
+def order_rows(rows):
+    """
+    Представление заказов из строк `values(*ORDER_VALUES)`.
+
+    Позиции всех заказов читаются одним запросом в порядке добавления,
+    как и при `Order.objects.with_items()`.
+    """
+    items = defaultdict(list)
+    positions = (
+        OrderItem.objects.filter(order_id__in=[row["pk"] for row in rows])
+        .order_by("pk")
+        .values_list("order_id", "product_id", "quantity", "unit_price")
+    )
+    for order_id, product_id, quantity, unit_price in positions:
+        items[order_id].append(
+            {
+                "product": product_id,
+                "quantity": quantity,
+                "unit_price": decimal_string(unit_price),
+            }
+        )
+    return [
+        {
+            "id": row["pk"],
+            "table_number": row["table_number"],
+            "status": row["status"],
+            "total_price": decimal_string(row["total_price"]),
+            "archived": row["archived"],
+            "version": row["version"],
+            "items": items[row["pk"]],
+        }
+        for row in rows
+    ]
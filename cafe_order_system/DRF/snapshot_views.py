@@ -0,0 +1,112 @@
+from django.http import HttpResponse, JsonResponse
+from django.urls import reverse
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import parse_etags
+from django.views import View
+
+from orders.snapshots import get_menu_snapshot
+
+NOT_FOUND = {"detail": "Не найдено."}
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+
+def choose_encoding(header, available):
+    """
+    Выбирает кодирование ответа по заголовку `Accept-Encoding`.
+
+    Предпочтение — brotli, затем gzip, затем без сжатия; кодирования
+    с `q=0` клиент не принимает.
+
+    Аргументы:
+        header: Значение заголовка `Accept-Encoding`.
+        available: Кодирования, в которых есть снимок.
+    """
+    accepted = {}
+    for part in header.split(","):
+        coding, _, params = part.partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip().lower()] = quality
+    for encoding in ("br", "gzip"):
+        if encoding in available and accepted.get(encoding, accepted.get("*", 0)) > 0:
+            return encoding
+    return "identity"
+
+
+def snapshot_etag(version, encoding):
+    """Сильный ETag снимка: у каждого кодирования — свой."""
+    suffix = "" if encoding == "identity" else f"-{encoding}"
+    return f'"menu-{version}{suffix}"'
+
+
+def snapshot_response(request, snapshot, **cache_control):
+    """
+    Отдаёт заранее сжатый снимок меню или 304, если клиент уже знает эту
+    версию в любом из кодирований.
+    """
+    version, encodings = snapshot["version"], snapshot["encodings"]
+    encoding = choose_encoding(request.headers.get("Accept-Encoding", ""), encodings)
+    client_etags = set(parse_etags(request.headers.get("If-None-Match", "")))
+    known = {snapshot_etag(version, name) for name in encodings}
+    if "*" in client_etags or client_etags & known:
+        response = HttpResponse(status=304)
+    else:
+        response = HttpResponse(encodings[encoding], content_type="application/json")
+        if encoding != "identity":
+            response["Content-Encoding"] = encoding
+    response["ETag"] = snapshot_etag(version, encoding)
+    response["X-Menu-Version"] = version
+    patch_vary_headers(response, ["Accept-Encoding"])
+    patch_cache_control(response, **cache_control)
+    return response
+
+
+class MenuSnapshot(View):
+    """
+    Всё меню одним ответом: `{"version": ..., "products": [...]}`.
+
+    Снимок собран и сжат заранее, поэтому ответ не обращается к базе.
+    Клиент проверяет актуальность через `If-None-Match` и при неизменном
+    меню получает 304 без тела.
+    """
+
+    def get(self, request):
+        return snapshot_response(request, get_menu_snapshot(), no_cache=True)
+
+
+class MenuSnapshotVersion(View):
+    """
+    Снимок меню конкретной версии. Содержимое версии не меняется, поэтому
+    ответ кэшируется клиентами и прокси бессрочно. Версия, вытесненная
+    из кэша, отдаёт 404 — актуальную версию сообщает `MenuVersion`.
+    """
+
+    def get(self, request, version):
+        snapshot = get_menu_snapshot(version)
+        if snapshot is None:
+            return JsonResponse(NOT_FOUND, status=404)
+        return snapshot_response(
+            request,
+            snapshot,
+            public=True,
+            max_age=IMMUTABLE_MAX_AGE,
+            immutable=True,
+        )
+
+
+class MenuVersion(View):
+    """Указатель на текущую версию меню и адрес её снимка."""
+
+    def get(self, request):
+        version = get_menu_snapshot()["version"]
+        url = reverse("menu-snapshot-version", args=[version])
+        response = JsonResponse(
+            {"version": version, "url": request.build_absolute_uri(url)}
+        )
+        patch_cache_control(response, no_cache=True)
+        return response
@@ -1,6 +1,35 @@
+import gzip
+import json
+from datetime import date, datetime, timezone
+from decimal import Decimal
+
 import pytest
+from asgiref.sync import async_to_sync
+from django.db import connection, transaction
+from django.test import AsyncClient
+from django.test.utils import CaptureQueriesContext
+from django.core.cache import cache
 from django.urls import reverse
-from orders.models import Product
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+from orders.jobs import run_pending
+from orders.models import (
+    DailyProductSales,
+    DailyTableSales,
+    Order,
+    OrderItem,
+    Product,
+    Table,
+)
+from .renderers import ORJSONRenderer
+from .serializers import (
+    ORDER_VALUES,
+    PRODUCT_VALUES,
+    OrderSerializer,
+    ProductListSerializer,
+    order_rows,
+    product_rows,
+)
 
 
 @pytest.mark.django_db
@@ -39,7 +68,7 @@ class TestProductAPI:
         - корректность данных по каждому продукту
         """
         url = reverse("product-list")
-        response = api_client.get(url)
+        response = api_client.get(url, {"count": "true"})
 
         assert response.status_code == 200
         data = response.json()
@@ -95,3 +124,1128 @@ class TestProductAPI:
 
         assert response.status_code == 204
         assert Product.objects.count() == 0
+
+
+@pytest.mark.django_db
+class TestProductPagination:
+    """
+    Набор тестов курсорной пагинации меню.
+
+    Проверяет обход всех страниц по курсору и необязательный подсчёт записей.
+    """
+
+    @pytest.fixture
+    def menu(self, db) -> list:
+        """Создаёт меню из 25 продуктов."""
+        return Product.objects.bulk_create(
+            Product(name=f"Блюдо {index:02}", price=100 + index) for index in range(25)
+        )
+
+    def test_cursor_walks_all_pages(self, api_client, menu):
+        """
+        Тест обхода меню по ссылкам next
+
+        Проверяется:
+        - все продукты получены ровно один раз в алфавитном порядке
+        - последняя страница не содержит ссылки next
+        """
+        names = []
+        url = reverse("product-list")
+        while url:
+            data = api_client.get(url).json()
+            names.extend(product["name"] for product in data["results"])
+            url = data["next"]
+
+        assert names == sorted(product.name for product in menu)
+
+    def test_page_without_count_is_single_query(
+        self, api_client, menu, django_assert_num_queries
+    ):
+        """
+        Тест страницы без подсчёта записей
+
+        Проверяется:
+        - страница выбирается одним запросом без COUNT(*)
+        - в ответе нет поля count
+        """
+        with django_assert_num_queries(1):
+            data = api_client.get(reverse("product-list")).json()
+
+        assert "count" not in data
+        assert len(data["results"]) == 10
+
+    def test_cached_links_follow_request_host(self, api_client, menu, settings):
+        """
+        Тест кэширования страниц с абсолютными ссылками
+
+        Проверяется:
+        - ссылка next ведёт на хост и схему текущего запроса,
+          даже если та же страница уже закэширована для другого хоста
+        """
+        settings.ALLOWED_HOSTS = ["testserver", "cafe.example"]
+        url = reverse("product-list")
+
+        local = api_client.get(url).json()
+        public = api_client.get(url, HTTP_HOST="cafe.example", secure=True).json()
+
+        assert local["next"].startswith("http://testserver/")
+        assert public["next"].startswith("https://cafe.example/")
+        assert public["results"] == local["results"]
+
+    def test_count_on_request(self, api_client, menu):
+        """
+        Тест подсчёта записей по параметру count
+
+        Проверяется:
+        - при ?count=true в ответе общее число продуктов
+        """
+        data = api_client.get(reverse("product-list"), {"count": "true"}).json()
+
+        assert data["count"] == 25
+
+
+@pytest.mark.django_db
+class TestProductCache:
+    """
+    Набор тестов кэширования меню в API.
+
+    Проверяет повторное чтение без запросов к базе, условные GET-запросы
+    с ETag/If-None-Match и сброс кэша при изменении продуктов.
+    """
+
+    def test_repeated_list_served_from_cache(
+        self, api_client, product1, django_assert_num_queries
+    ):
+        """
+        Тест повторного получения списка продуктов
+
+        Проверяется:
+        - второй запрос не обращается к базе данных
+        - содержимое ответов совпадает
+        """
+        url = reverse("product-list")
+        first = api_client.get(url)
+
+        with django_assert_num_queries(0):
+            second = api_client.get(url)
+
+        assert second.status_code == 200
+        assert second.json() == first.json()
+
+    def test_if_none_match_returns_304(self, api_client, product1):
+        """
+        Тест условного GET-запроса к /api/products/
+
+        Проверяется:
+        - ответ содержит ETag
+        - запрос с тем же ETag в If-None-Match получает 304 без тела
+        """
+        url = reverse("product-list")
+        response = api_client.get(url)
+        etag = response["ETag"]
+
+        response = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        assert response.status_code == 304
+        assert response["ETag"] == etag
+        assert not response.content
+
+    def test_update_invalidates_cache(self, api_client, product1):
+        """
+        Тест сброса кэша при изменении продукта через API
+
+        Проверяется:
+        - ETag меняется после обновления
+        - старый ETag больше не даёт 304
+        - в ответе новые данные
+        """
+        list_url = reverse("product-list")
+        old_etag = api_client.get(list_url)["ETag"]
+
+        api_client.put(
+            reverse("product-detail", args=[product1.id]),
+            {"name": "Эспрессо", "price": "180.00"},
+            format="json",
+        )
+        response = api_client.get(list_url, HTTP_IF_NONE_MATCH=old_etag)
+
+        assert response.status_code == 200
+        assert response["ETag"] != old_etag
+        assert response.json()["results"][0]["name"] == "Эспрессо"
+
+    def test_delete_invalidates_detail(self, api_client, product1):
+        """
+        Тест сброса кэша при удалении продукта
+
+        Проверяется:
+        - закэшированный продукт после удаления отдаёт 404
+        """
+        url = reverse("product-detail", args=[product1.id])
+        assert api_client.get(url).status_code == 200
+
+        product1.delete()
+
+        assert api_client.get(url).status_code == 404
+
+
+@pytest.mark.django_db
+class TestProductSearch:
+    """
+    Набор тестов поиска блюд для подсказок при вводе.
+
+    Проверяет поиск по началу и части названия без учёта регистра,
+    порядок подсказок, обновление индекса при изменении меню и проверку
+    параметров запроса.
+    """
+
+    @pytest.fixture
+    def menu(self, product1, product2):
+        return [
+            product1,
+            product2,
+            Product.objects.create(name="Чай зелёный", price=120),
+            Product.objects.create(name="Зелёный салат", price=250),
+            Product.objects.create(name="Молочный коктейль", price=200),
+        ]
+
+    def search(self, api_client, q, **params):
+        response = api_client.get(reverse("product-search"), {"q": q, **params})
+        assert response.status_code == 200
+        return [product["name"] for product in response.json()]
+
+    def test_prefix_is_case_insensitive(self, api_client, menu):
+        """
+        Тест поиска по началу названия
+
+        Проверяется:
+        - регистр кириллицы не важен
+        - ответ содержит id, название и цену блюда
+        """
+        response = api_client.get(reverse("product-search"), {"q": "КОФ"})
+
+        assert response.json() == [
+            {"id": menu[0].id, "name": "Кофе", "price": "150.00"}
+        ]
+
+    def test_ranking(self, api_client, menu):
+        """
+        Тест порядка подсказок
+
+        Проверяется:
+        - сначала блюда, название которых начинается с запроса
+        - затем совпадения в начале слова, затем в середине слова
+        - «е» в запросе находит «ё» в названии
+        """
+        assert self.search(api_client, "чай") == ["Чай", "Чай зелёный"]
+        assert self.search(api_client, "зеле") == ["Зелёный салат", "Чай зелёный"]
+        assert self.search(api_client, "ктей") == ["Молочный коктейль"]
+        assert self.search(api_client, "ай") == ["Чай", "Чай зелёный"]
+
+    def test_limit(self, api_client, menu):
+        """
+        Тест ограничения числа подсказок
+        """
+        assert self.search(api_client, "ч", limit=1) == ["Чай"]
+
+    def test_index_follows_menu_changes(self, api_client, menu):
+        """
+        Тест обновления индекса при изменении меню
+
+        Проверяется:
+        - переименованное блюдо находится по новому названию
+        - удалённое блюдо пропадает из подсказок
+        """
+        assert self.search(api_client, "кофе") == ["Кофе"]
+
+        menu[0].name = "Эспрессо"
+        menu[0].save()
+        menu[1].delete()
+
+        assert self.search(api_client, "кофе") == []
+        assert self.search(api_client, "эсп") == ["Эспрессо"]
+        assert self.search(api_client, "чай") == ["Чай зелёный"]
+
+    def test_warm_index_skips_database(
+        self, api_client, menu, django_assert_num_queries
+    ):
+        """
+        Тест повторного поиска
+
+        Проверяется:
+        - пока меню не менялось, поиск не обращается к базе данных
+        """
+        self.search(api_client, "чай")
+
+        with django_assert_num_queries(0):
+            assert self.search(api_client, "салат") == ["Зелёный салат"]
+
+    @pytest.mark.parametrize("params", [{}, {"q": ""}, {"q": "чай", "limit": 0}])
+    def test_invalid_params(self, api_client, params):
+        """
+        Тест проверки параметров поиска
+        """
+        response = api_client.get(reverse("product-search"), params)
+
+        assert response.status_code == 400
+
+
+@pytest.mark.django_db
+class TestOrderAPI:
+    """
+    Набор тестов для API заказов.
+
+    Проверяет создание одного заказа и пакета заказов, валидацию пакета
+    целиком, обновление позиций и архивацию при удалении.
+    """
+
+    def test_create_single_order(self, api_client, table, product1, product2):
+        """
+        Тест создания заказа через POST-запрос к /api/orders/
+
+        Проверяется:
+        - успешное создание заказа (код 201)
+        - цена позиций фиксируется по цене блюда
+        - итоговая стоимость учитывает количество
+        """
+        data = {
+            "table_number": table.id,
+            "items": [
+                {"product": product1.id, "quantity": 2},
+                {"product": product2.id},
+            ],
+        }
+
+        response = api_client.post(reverse("order-list"), data, format="json")
+
+        assert response.status_code == 201
+        assert response.json()["total_price"] == "400.00"
+        assert response.json()["items"][0]["unit_price"] == "150.00"
+        assert Order.objects.get().items.count() == 2
+
+    def test_create_batch_constant_queries(
+        self, api_client, table, product1, product2, django_assert_max_num_queries
+    ):
+        """
+        Тест пакетного создания заказов
+
+        Проверяется:
+        - пакет из 50 заказов создаётся одним запросом (код 201)
+        - число запросов к базе не зависит от размера пакета
+        - в ответе все заказы в порядке пакета
+        """
+        data = [
+            {
+                "table_number": table.id,
+                "status": "waiting",
+                "items": [
+                    {"product": product1.id, "quantity": index % 3 + 1},
+                    {"product": product2.id, "quantity": 1},
+                ],
+            }
+            for index in range(50)
+        ]
+
+        with django_assert_max_num_queries(10):
+            response = api_client.post(reverse("order-list"), data, format="json")
+
+        assert response.status_code == 201
+        assert len(response.json()) == 50
+        assert response.json()[0]["total_price"] == "250.00"
+        assert Order.objects.count() == 50
+        assert OrderItem.objects.count() == 100
+
+    def test_batch_is_atomic(self, api_client, table, product1):
+        """
+        Тест валидации пакета целиком
+
+        Проверяется:
+        - ошибка в одном заказе отклоняет весь пакет (код 400)
+        - ошибка привязана к неверному заказу
+        - ни один заказ не сохранён
+        """
+        data = [
+            {"table_number": table.id, "items": [{"product": product1.id}]},
+            {"table_number": table.id, "items": [{"product": 999}]},
+        ]
+
+        response = api_client.post(reverse("order-list"), data, format="json")
+
+        assert response.status_code == 400
+        assert response.json()[0] == {}
+        assert "items" in response.json()[1]
+        assert Order.objects.count() == 0
+
+    def test_order_requires_items(self, api_client, table):
+        """
+        Тест создания заказа без позиций
+
+        Проверяется:
+        - заказ без блюд отклоняется (код 400)
+        """
+        data = {"table_number": table.id, "items": []}
+
+        response = api_client.post(reverse("order-list"), data, format="json")
+
+        assert response.status_code == 400
+        assert "items" in response.json()
+
+    @pytest.mark.parametrize("batch", [False, True])
+    def test_malformed_ids_rejected(self, api_client, table, product1, batch):
+        """
+        Тест создания заказа со списком или словарём вместо идентификатора
+
+        Проверяется:
+        - одиночный и пакетный POST отклоняются с кодом 400, а не 500
+        - ошибки привязаны к полям стола и блюда
+        """
+        orders = [
+            {"table_number": [table.id], "items": [{"product": product1.id}]},
+            {"table_number": table.id, "items": [{"product": {"id": product1.id}}]},
+        ]
+
+        for data in orders:
+            response = api_client.post(
+                reverse("order-list"), [data] if batch else data, format="json"
+            )
+            assert response.status_code == 400
+        errors = response.json()[0] if batch else response.json()
+        assert "product" in errors["items"][0]
+        assert Order.objects.count() == 0
+
+    def test_update_items_keeps_price_snapshot(self, api_client, order, product1):
+        """
+        Тест замены позиций заказа через PATCH-запрос к /api/orders/<id>/
+
+        Проверяется:
+        - цена уже заказанного блюда не меняется вслед за меню
+        - итоговая стоимость пересчитывается
+        """
+        product1.price = 999
+        product1.save()
+
+        response = api_client.patch(
+            reverse("order-detail", args=[order.id]),
+            {"items": [{"product": product1.id, "quantity": 3}]},
+            format="json",
+        )
+
+        assert response.status_code == 200
+        assert response.json()["total_price"] == "450.00"
+        assert response.json()["items"] == [
+            {"product": product1.id, "quantity": 3, "unit_price": "150.00"}
+        ]
+
+    def test_delete_archives_order(self, api_client, order):
+        """
+        Тест удаления заказа через DELETE-запрос к /api/orders/<id>/
+
+        Проверяется:
+        - успешный ответ (код 204)
+        - заказ архивирован, а не удалён
+        - архивный заказ не попадает в список
+        """
+        response = api_client.delete(reverse("order-detail", args=[order.id]))
+
+        assert response.status_code == 204
+        order.refresh_from_db()
+        assert order.archived
+        assert api_client.get(reverse("order-list")).json()["results"] == []
+
+
+    def test_update_with_stale_version_conflicts(self, api_client, order):
+        """
+        Тест оптимистичной блокировки PATCH /api/orders/<id>/
+
+        Проверяется:
+        - ответ с актуальной версией содержит следующую версию
+        - запрос с устаревшей версией отклоняется (код 409) и не меняет заказ
+        """
+        url = reverse("order-detail", args=[order.id])
+        version = api_client.get(url).json()["version"]
+
+        response = api_client.patch(
+            url, {"status": "ready", "version": version}, format="json"
+        )
+        assert response.status_code == 200
+        assert response.json()["version"] == version + 1
+
+        response = api_client.patch(
+            url, {"status": "paid", "version": version}, format="json"
+        )
+        assert response.status_code == 409
+        order.refresh_from_db()
+        assert order.status == "ready"
+
+    def test_update_rejects_illegal_transition(self, api_client, order):
+        """
+        Тест смены статуса оплаченного заказа через PATCH /api/orders/<id>/
+
+        Проверяется:
+        - возврат оплаченного заказа в работу отклоняется (код 400)
+        - ошибка привязана к полю статуса, заказ не меняется
+        """
+        url = reverse("order-detail", args=[order.id])
+        response = api_client.patch(url, {"status": "paid"}, format="json")
+        assert response.status_code == 200
+
+        response = api_client.patch(url, {"status": "waiting"}, format="json")
+
+        assert response.status_code == 400
+        assert "status" in response.json()
+        order.refresh_from_db()
+        assert order.status == "paid"
+
+    def test_delete_with_stale_version_conflicts(self, api_client, order):
+        """
+        Тест архивации с устаревшей версией DELETE /api/orders/<id>/?version=
+
+        Проверяется:
+        - запрос отклоняется (код 409)
+        - заказ не архивирован
+        """
+        Order.objects.filter(pk=order.pk).update(version=order.version + 1)
+
+        response = api_client.delete(
+            reverse("order-detail", args=[order.id]) + f"?version={order.version}"
+        )
+
+        assert response.status_code == 409
+        order.refresh_from_db()
+        assert not order.archived
+
+    def test_bulk_status_change(
+        self, api_client, order, table, django_capture_on_commit_callbacks
+    ):
+        """
+        Тест массовой смены статуса POST /api/orders/status/
+
+        Проверяется:
+        - заказы переводятся одним UPDATE, версия увеличивается
+        - оплата освобождает стол и попадает в сводки продаж
+        - заказы, уже имеющие статус, не меняются
+        """
+        other = Order.objects.create(table_number=table, status="ready")
+        paid = Order.objects.create(table_number=table, status="paid")
+        order.refresh_from_db()
+        version = order.version
+
+        with django_capture_on_commit_callbacks(execute=True):
+            response = api_client.post(
+                reverse("order-change-status"),
+                {"orders": [order.id, other.id, paid.id], "status": "paid"},
+                format="json",
+            )
+        run_pending()
+
+        assert response.status_code == 200
+        assert response.json() == {
+            "status": "paid",
+            "updated": [order.id, other.id],
+            "unchanged": [paid.id],
+            "rejected": [],
+        }
+        order.refresh_from_db()
+        assert (order.status, order.version) == ("paid", version + 1)
+        assert order.settled_at is not None
+        table.refresh_from_db()
+        assert not table.is_occupied
+        # Вместе с заказом, оплаченным до запроса.
+        assert DailyTableSales.objects.get().orders_count == 3
+
+    def test_bulk_status_rejects_illegal_transitions(self, api_client, order, table):
+        """
+        Тест отклонения недопустимых переходов POST /api/orders/status/
+
+        Проверяется:
+        - оплаченный заказ не возвращается в ожидание
+        - архивные и несуществующие заказы отклоняются
+        - допустимые переходы из того же запроса выполняются
+        """
+        paid = Order.objects.create(table_number=table, status="paid")
+        archived = Order.objects.create(table_number=table, archived=True)
+        ready = Order.objects.create(table_number=table, status="ready")
+
+        response = api_client.post(
+            reverse("order-change-status"),
+            {"orders": [paid.id, archived.id, ready.id, 999], "status": "waiting"},
+            format="json",
+        )
+
+        assert response.status_code == 200
+        assert response.json()["updated"] == [ready.id]
+        assert response.json()["rejected"] == [
+            {"id": paid.id, "status": "paid"},
+            {"id": archived.id, "status": None},
+            {"id": 999, "status": None},
+        ]
+        paid.refresh_from_db()
+        assert (paid.status, paid.version) == ("paid", 1)
+
+    def test_bulk_status_validation(self, api_client, order):
+        """
+        Тест валидации массовой смены статуса
+
+        Проверяется:
+        - неизвестный статус и пустой список заказов отклоняются (код 400)
+        """
+        url = reverse("order-change-status")
+
+        response = api_client.post(
+            url, {"orders": [order.id], "status": "eaten"}, format="json"
+        )
+        assert response.status_code == 400
+        response = api_client.post(url, {"orders": [], "status": "paid"}, format="json")
+        assert response.status_code == 400
+
+    def test_list_query_budget(self, api_client, order, table, product1):
+        """
+        Тест бюджета запросов списка заказов GET /api/orders/
+
+        Проверяется:
+        - число запросов из метрик ответа не превышает бюджет
+        - число запросов не растёт с числом заказов
+        """
+        before = api_client.get(reverse("order-list")).metrics.queries
+        for _ in range(5):
+            extra = Order.objects.create(table_number=table)
+            OrderItem.objects.create(
+                order=extra, product=product1, quantity=1, unit_price=150
+            )
+
+        response = api_client.get(reverse("order-list"))
+
+        assert response.metrics.queries <= 2
+        assert response.metrics.queries == before
+        assert "Server-Timing" in response
+
+
+@pytest.mark.django_db
+class TestSalesAPI:
+    """
+    Набор тестов API отчётов о продажах.
+
+    Проверяет, что отчёты строятся по дневным сводкам без обращения
+    к таблице заказов и учитывают период.
+    """
+
+    @pytest.fixture
+    def rollups(self, table, product1, product2) -> None:
+        """Создаёт сводки продаж за два дня."""
+        DailyTableSales.objects.bulk_create(
+            [
+                DailyTableSales(
+                    date=date(2026, 10, 1), table=table, orders_count=3, revenue=900
+                ),
+                DailyTableSales(
+                    date=date(2026, 10, 2), table=table, orders_count=1, revenue=150
+                ),
+            ]
+        )
+        DailyProductSales.objects.bulk_create(
+            [
+                DailyProductSales(
+                    date=date(2026, 10, 1), product=product1, quantity=4, revenue=600
+                ),
+                DailyProductSales(
+                    date=date(2026, 10, 1), product=product2, quantity=3, revenue=300
+                ),
+                DailyProductSales(
+                    date=date(2026, 10, 2), product=product1, quantity=1, revenue=150
+                ),
+            ]
+        )
+
+    def test_daily_sales_read_only_rollups(self, api_client, rollups):
+        """
+        Тест получения продаж по дням через GET-запрос к /api/sales/
+
+        Проверяется:
+        - один запрос к базе, и он не обращается к таблице заказов
+        - выручка и число заказов по каждому дню
+        """
+        with CaptureQueriesContext(connection) as queries:
+            response = api_client.get(reverse("sales-list"))
+
+        assert response.status_code == 200
+        assert len(queries) == 1
+        assert "orders_order" not in queries[0]["sql"]
+        assert response.json() == [
+            {"date": "2026-10-01", "orders_count": 3, "revenue": "900.00"},
+            {"date": "2026-10-02", "orders_count": 1, "revenue": "150.00"},
+        ]
+
+    def test_product_sales_for_period(self, api_client, rollups, product1, product2):
+        """
+        Тест продаж по блюдам за период через /api/sales/products/
+
+        Проверяется:
+        - учитываются только дни внутри периода
+        - блюда отсортированы по убыванию выручки
+        """
+        response = api_client.get(
+            reverse("sales-products"),
+            {"date_from": "2026-10-01", "date_to": "2026-10-01"},
+        )
+
+        assert response.status_code == 200
+        assert response.json() == [
+            {
+                "product": product1.id,
+                "name": "Кофе",
+                "quantity": 4,
+                "revenue": "600.00",
+            },
+            {
+                "product": product2.id,
+                "name": "Чай",
+                "quantity": 3,
+                "revenue": "300.00",
+            },
+        ]
+
+    def test_table_sales(self, api_client, rollups, table):
+        """
+        Тест продаж по столам через /api/sales/tables/
+
+        Проверяется:
+        - итоги стола суммируются по всем дням
+        """
+        response = api_client.get(reverse("sales-tables"))
+
+        assert response.json() == [
+            {"table": table.id, "number": 1, "orders_count": 4, "revenue": "1050.00"}
+        ]
+
+    def test_invalid_period(self, api_client):
+        """
+        Тест неверного периода
+
+        Проверяется:
+        - date_from позже date_to даёт ошибку 400
+        """
+        response = api_client.get(
+            reverse("sales-list"), {"date_from": "2026-10-02", "date_to": "2026-10-01"}
+        )
+
+        assert response.status_code == 400
+
+
+@pytest.mark.django_db
+class TestTableBoardAPI:
+    """
+    Набор тестов состояния зала GET /api/tables/board/
+
+    Проверяет агрегирование открытых заказов, кэширование ответа
+    и его сброс при изменении заказов.
+    """
+
+    def test_board_aggregates_open_orders(self, api_client, order, table):
+        """
+        Тест содержимого табло
+
+        Проверяется:
+        - стол с открытым заказом занят, свободный стол — нет
+        - сумма открытых заказов стола
+        - табло строится одним запросом
+        """
+        Table.objects.create(number=2)
+
+        response = api_client.get(reverse("table-board"))
+
+        assert response.status_code == 200
+        assert response.metrics.queries == 1
+        assert response.json() == [
+            {
+                "id": table.id,
+                "number": 1,
+                "is_occupied": True,
+                "open_orders": 1,
+                "open_total": "250.00",
+            },
+            {
+                "id": Table.objects.get(number=2).id,
+                "number": 2,
+                "is_occupied": False,
+                "open_orders": 0,
+                "open_total": "0.00",
+            },
+        ]
+
+    def test_board_cached_until_order_changes(self, api_client, order, table):
+        """
+        Тест кэширования табло
+
+        Проверяется:
+        - повторный запрос не обращается к базе
+        - оплата заказа через API сбрасывает кэш и освобождает стол
+        """
+        api_client.get(reverse("table-board"))
+        assert api_client.get(reverse("table-board")).metrics.queries == 0
+
+        api_client.patch(
+            reverse("order-detail", args=[order.id]), {"status": "paid"}, format="json"
+        )
+
+        row = api_client.get(reverse("table-board")).json()[0]
+        assert row["is_occupied"] is False
+        assert row["open_orders"] == 0
+
+    def test_batch_create_occupies_tables(self, api_client, table, product1):
+        """
+        Тест пакетного создания заказов
+
+        Проверяется:
+        - столы из пакета становятся занятыми в той же транзакции
+        """
+        other = Table.objects.create(number=2)
+        data = [
+            {"table_number": pk, "items": [{"product": product1.id}]}
+            for pk in (table.id, other.id)
+        ]
+
+        response = api_client.post(reverse("order-list"), data, format="json")
+
+        assert response.status_code == 201
+        assert set(Table.objects.values_list("is_occupied", flat=True)) == {True}
+
+
+@pytest.mark.django_db
+class TestAsyncAPI:
+    """
+    Набор тестов асинхронных эндпоинтов /api/async/
+
+    Проверяет, что асинхронные представления отдают те же данные,
+    что и синхронный API, и работают под ASGI.
+    """
+
+    def test_order_list_matches_sync_api(self, api_client, order):
+        """
+        Тест асинхронного списка заказов под ASGI
+
+        Проверяется:
+        - заказы совпадают с ответом синхронного API
+        - запросы асинхронного ORM учитываются в метриках (2 запроса)
+        """
+        response = async_to_sync(AsyncClient().get)(reverse("async-order-list"))
+
+        assert response.status_code == 200
+        assert response.metrics.queries == 2
+        assert (
+            response.json()["results"]
+            == api_client.get(reverse("order-list")).json()["results"]
+        )
+
+    def test_order_list_pages(self, api_client, order, table):
+        """
+        Тест листания асинхронного списка
+
+        Проверяется:
+        - ссылка next ведёт на следующую страницу без повторов
+        """
+        for _ in range(2):
+            Order.objects.create(table_number=table)
+
+        first = api_client.get(reverse("async-order-list"), {"page_size": 2}).json()
+        second = api_client.get(first["next"]).json()
+
+        ids = [row["id"] for row in first["results"] + second["results"]]
+        assert ids == sorted(Order.objects.values_list("pk", flat=True), reverse=True)
+        assert second["next"] is None
+
+    def test_status_change(self, api_client, order):
+        """
+        Тест смены статуса PATCH /api/async/orders/<id>/
+
+        Проверяется:
+        - статус и версия обновляются
+        - устаревшая версия отклоняется (код 409)
+        - недопустимый статус отклоняется (код 400)
+        - оплаченный заказ не возвращается в работу (код 400)
+        """
+        url = reverse("async-order-detail", args=[order.id])
+
+        response = api_client.patch(
+            url, {"status": "ready", "version": order.version}, format="json"
+        )
+        assert response.status_code == 200
+        assert response.json()["status"] == "ready"
+        assert response.json()["version"] == order.version + 1
+
+        response = api_client.patch(
+            url, {"status": "paid", "version": order.version}, format="json"
+        )
+        assert response.status_code == 409
+
+        response = api_client.patch(url, {"status": "lost"}, format="json")
+        assert response.status_code == 400
+
+        response = api_client.patch(url, {"status": "paid"}, format="json")
+        assert response.status_code == 200
+        response = api_client.patch(url, {"status": "waiting"}, format="json")
+        assert response.status_code == 400
+        assert "status" in response.json()
+        order.refresh_from_db()
+        assert order.status == "paid"
+
+    def test_archived_order_not_found(self, api_client, order):
+        """
+        Тест асинхронного просмотра архивного заказа
+
+        Проверяется:
+        - архивный заказ не отдаётся (код 404)
+        """
+        Order.objects.filter(pk=order.pk).update(archived=True)
+
+        response = api_client.get(reverse("async-order-detail", args=[order.id]))
+
+        assert response.status_code == 404
+
+    def test_product_reads_cached(self, api_client, product1, product2):
+        """
+        Тест асинхронного чтения меню
+
+        Проверяется:
+        - меню в алфавитном порядке, повторный запрос не обращается к базе
+        - клиент с актуальным ETag получает 304
+        - карточка блюда и 404 для несуществующего
+        """
+        url = reverse("async-product-list")
+        response = api_client.get(url)
+        assert [row["name"] for row in response.json()["results"]] == ["Кофе", "Чай"]
+        assert api_client.get(url).metrics.queries == 0
+
+        response = api_client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        assert response.status_code == 304
+
+        detail = api_client.get(reverse("async-product-detail", args=[product1.id]))
+        assert detail.json() == {"name": "Кофе", "price": "150.00"}
+        missing = api_client.get(reverse("async-product-detail", args=[999]))
+        assert missing.status_code == 404
+
+
+@pytest.mark.django_db
+class TestFastSerialization:
+    """
+    Набор тестов быстрого пути чтения и рендерера orjson
+
+    Проверяет, что ответы из строк values() и байты рендерера
+    совпадают с сериализаторами и JSONRenderer DRF.
+    """
+
+    def test_product_rows_match_serializer(self, product1, product2):
+        """
+        Тест представления блюд из строк values()
+
+        Проверяется:
+        - данные совпадают с ProductListSerializer, включая формат цен
+        """
+        Product.objects.create(name="Торт", price=Decimal("1234567.5"))
+        products = Product.objects.order_by("name")
+
+        assert product_rows(products.values(*PRODUCT_VALUES)) == (
+            ProductListSerializer(products, many=True).data
+        )
+
+    def test_order_rows_match_serializer(self, order, table, product1, product2):
+        """
+        Тест представления заказов из строк values()
+
+        Проверяется:
+        - данные совпадают с OrderSerializer для заказов с позициями,
+          без позиций и без итоговой стоимости
+        """
+        extra = Order.objects.create(table_number=table, status="paid")
+        OrderItem.objects.create(
+            order=extra, product=product2, quantity=3, unit_price=Decimal("99.90")
+        )
+        OrderItem.objects.create(
+            order=extra, product=product1, quantity=1, unit_price=150
+        )
+        Order.objects.create(table_number=table, total_price=None)
+        orders = Order.objects.order_by("-pk")
+
+        assert order_rows(list(orders.values(*ORDER_VALUES))) == (
+            OrderSerializer(orders.with_items(), many=True).data
+        )
+
+    def test_api_responses_match_serializers(self, api_client, order, product1):
+        """
+        Тест ответов API на быстром пути
+
+        Проверяется:
+        - списки и карточки заказов и блюд совпадают с сериализаторами
+        """
+        order_data = OrderSerializer(Order.objects.with_items().get()).data
+        product_data = ProductListSerializer(product1).data
+
+        orders = api_client.get(reverse("order-list")).json()
+        detail = api_client.get(reverse("order-detail", args=[order.pk])).json()
+        products = api_client.get(reverse("product-list")).json()
+        product = api_client.get(reverse("product-detail", args=[product1.pk])).json()
+
+        assert orders["results"] == [order_data]
+        assert detail == order_data
+        assert products["results"][0] == product_data
+        assert product == product_data
+
+    def test_orjson_renderer_matches_json_renderer(self):
+        """
+        Тест рендерера orjson
+
+        Проверяется:
+        - байты совпадают с JSONRenderer для кириллицы, разделителей строк,
+          Decimal, дат, ленивых строк и нестроковых ключей
+        - форматированный вывод (indent) совпадает с JSONRenderer
+        """
+        data = {
+            "name": "Кофе\u2028латте\u2029",
+            "price": Decimal("150.00"),
+            "created": datetime(2025, 1, 2, 3, 4, 5, 678901, tzinfo=timezone.utc),
+            "naive": datetime(2025, 1, 2, 3, 4, 5),
+            "day": date(2025, 1, 2),
+            "label": gettext_lazy("Готово"),
+            "items": [{"quantity": 2, "ok": True, "note": None}, 1.5],
+            1: "one",
+        }
+
+        assert ORJSONRenderer().render(data) == JSONRenderer().render(data)
+        media_type = "application/json; indent=4"
+        assert ORJSONRenderer().render(data, media_type) == (
+            JSONRenderer().render(data, media_type)
+        )
+
+
+@pytest.mark.django_db(transaction=True)
+class TestMenuSnapshot:
+    """
+    Набор тестов снимка меню /api/menu/
+
+    Снимок собирается после фиксации изменения продуктов, поэтому тесты
+    работают с настоящими транзакциями.
+    """
+
+    def test_snapshot_prepared_on_change(self, api_client, product1, product2):
+        """
+        Тест подготовки снимка при изменении меню
+
+        Проверяется:
+        - снимок готов до первого запроса: ответ не обращается к базе
+        - меню целиком в алфавитном порядке, с id и ценами как в API
+        - gzip-версия совпадает с несжатой, ETag сильный и свой у кодирования
+        """
+        response = api_client.get(reverse("menu-snapshot"))
+        assert response.metrics.queries == 0
+        body = json.loads(response.content)
+        assert body["products"] == [
+            {"id": product1.id, "name": "Кофе", "price": "150.00"},
+            {"id": product2.id, "name": "Чай", "price": "100.00"},
+        ]
+        assert response["ETag"] == f'"menu-{body["version"]}"'
+        assert response["X-Menu-Version"] == body["version"]
+        assert "no-cache" in response["Cache-Control"]
+
+        compressed = api_client.get(
+            reverse("menu-snapshot"), HTTP_ACCEPT_ENCODING="gzip, deflate"
+        )
+        assert compressed["Content-Encoding"] == "gzip"
+        assert compressed["ETag"] == f'"menu-{body["version"]}-gzip"'
+        assert compressed["Vary"] == "Accept-Encoding"
+        assert gzip.decompress(compressed.content) == response.content
+
+    def test_if_none_match_until_menu_changes(self, api_client, product1):
+        """
+        Тест условного запроса снимка
+
+        Проверяется:
+        - клиент с ETag текущей версии (любого кодирования) получает 304
+        - после изменения блюда — новый снимок с новой версией
+        """
+        first = api_client.get(reverse("menu-snapshot"), HTTP_ACCEPT_ENCODING="gzip")
+        unchanged = api_client.get(
+            reverse("menu-snapshot"), HTTP_IF_NONE_MATCH=first["ETag"]
+        )
+        assert unchanged.status_code == 304
+        assert unchanged.content == b""
+
+        product1.price = 175
+        product1.save()
+
+        changed = api_client.get(
+            reverse("menu-snapshot"), HTTP_IF_NONE_MATCH=first["ETag"]
+        )
+        assert changed.status_code == 200
+        assert changed["X-Menu-Version"] != first["X-Menu-Version"]
+        assert json.loads(changed.content)["products"][0]["price"] == "175.00"
+
+    def test_version_pointer_and_immutable_snapshot(self, api_client, product1):
+        """
+        Тест указателя версии и снимка по версии
+
+        Проверяется:
+        - указатель ведёт на снимок той же версии
+        - снимок по версии кэшируется бессрочно
+        - неизвестная версия — 404
+        - снимок собирается и при пустом кэше
+        """
+        pointer = api_client.get(reverse("menu-version")).json()
+        response = api_client.get(pointer["url"])
+
+        assert response.status_code == 200
+        assert json.loads(response.content)["version"] == pointer["version"]
+        assert "immutable" in response["Cache-Control"]
+        missing = api_client.get(reverse("menu-snapshot-version", args=["0"]))
+        assert missing.status_code == 404
+
+        cache.clear()
+        response = api_client.get(reverse("menu-snapshot"))
+        assert response["X-Menu-Version"] == pointer["version"]
+
+    def test_brotli_preferred(self, api_client, product1):
+        """
+        Тест сжатия brotli
+
+        Проверяется:
+        - при поддержке клиентом отдаётся brotli, gzip с q=0 не выбирается
+        """
+        brotli = pytest.importorskip("brotli")
+        response = api_client.get(
+            reverse("menu-snapshot"), HTTP_ACCEPT_ENCODING="gzip;q=0, br"
+        )
+
+        assert response["Content-Encoding"] == "br"
+        plain = api_client.get(reverse("menu-snapshot"))
+        assert brotli.decompress(response.content) == plain.content
+
+    def test_snapshot_built_once_per_transaction(
+        self, monkeypatch, api_client, product1
+    ):
+        """
+        Тест сборки снимка при изменении многих блюд сразу
+
+        Проверяется:
+        - сохранения и удаления блюд в одной транзакции собирают снимок один раз
+        - снимок строится после фиксации и содержит итоговое меню
+        """
+        from orders import snapshots
+
+        builds = []
+        build = snapshots.build_menu_snapshot
+
+        def counted_build():
+            builds.append(build())
+
+        monkeypatch.setattr(snapshots, "build_menu_snapshot", counted_build)
+        with transaction.atomic():
+            for number in range(30):
+                Product.objects.create(name=f"Блюдо {number}", price=100)
+            Product.objects.filter(name__startswith="Блюдо 1").delete()
+            product1.price = 175
+            product1.save()
+            assert builds == []
+
+        assert len(builds) == 1
+        response = api_client.get(reverse("menu-snapshot"))
+        assert response.metrics.queries == 0
+        products = json.loads(response.content)["products"]
+        assert len(products) == 20
+        assert {"id": product1.id, "name": "Кофе", "price": "175.00"} in products
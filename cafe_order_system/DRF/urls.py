@@ -1,10 +1,39 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import ProductViewSet
+from .async_views import (
+    AsyncOrderDetail,
+    AsyncOrderList,
+    AsyncProductDetail,
+    AsyncProductList,
+)
+from .snapshot_views import MenuSnapshot, MenuSnapshotVersion, MenuVersion
+from .views import OrderViewSet, ProductViewSet, SalesViewSet, TableViewSet
 
 router = DefaultRouter()
 router.register(r"products", ProductViewSet)
+router.register(r"orders", OrderViewSet)
+router.register(r"sales", SalesViewSet, basename="sales")
+router.register(r"tables", TableViewSet, basename="table")
 
 urlpatterns = [
     path("", include(router.urls)),
+    path("async/orders/", AsyncOrderList.as_view(), name="async-order-list"),
+    path(
+        "async/orders/<int:pk>/",
+        AsyncOrderDetail.as_view(),
+        name="async-order-detail",
+    ),
+    path("async/products/", AsyncProductList.as_view(), name="async-product-list"),
+    path(
+        "async/products/<int:pk>/",
+        AsyncProductDetail.as_view(),
+        name="async-product-detail",
+    ),
+    path("menu/", MenuSnapshot.as_view(), name="menu-snapshot"),
+    path("menu/version/", MenuVersion.as_view(), name="menu-version"),
+    path(
+        "menu/<str:version>/",
+        MenuSnapshotVersion.as_view(),
+        name="menu-snapshot-version",
+    ),
 ]
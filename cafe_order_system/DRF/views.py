@@ -1,19 +1,259 @@
-from rest_framework import viewsets
-from orders.models import Product
-from .serializers import ProductListSerializer
+from django.db import transaction
+from django.db.models import F, Sum
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.response import Response
+from orders.cache import get_cached_tables
+from orders.search import search_products
+from orders.models import (
+    DailyProductSales,
+    DailyTableSales,
+    Order,
+    OrderConflictError,
+    Product,
+    Table,
+)
+from .mixins import CachedProductReadMixin, ValuesReadMixin
+from .pagination import ProductCursorPagination
+from .serializers import (
+    ORDER_VALUES,
+    PRODUCT_VALUES,
+    DailySalesSerializer,
+    OrderSerializer,
+    OrderStatusBatchSerializer,
+    ProductListSerializer,
+    ProductSalesSerializer,
+    ProductSearchSerializer,
+    SalesPeriodSerializer,
+    TableBoardSerializer,
+    TableSalesSerializer,
+    order_rows,
+    product_rows,
+)
 
 
-class ProductViewSet(viewsets.ModelViewSet):
+class Conflict(APIException):
+    """Ответ 409: заказ изменён другим запросом после того, как клиент его прочитал."""
+
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "Заказ был изменён другим запросом. Получите его заново."
+    default_code = "conflict"
+
+
+class ProductViewSet(CachedProductReadMixin, ValuesReadMixin, viewsets.ModelViewSet):
     """
     ViewSet для управления продуктами.
 
     Позволяет выполнять полный CRUD (создание, чтение, обновление, удаление)
     над объектами модели `Product` через API.
+    Чтение списка и отдельного продукта идёт через кэш меню с поддержкой
+    ETag/`If-None-Match`; кэш сбрасывается при сохранении и удалении продуктов.
+    Список листается курсором по названию, без COUNT(*) и OFFSET.
+    При промахе кэша ответ строится из строк `values()`.
+    `search/?q=` подсказывает блюда по началу или части названия
+    из индекса меню в памяти процесса.
 
     Используемые классы:
     - queryset: все объекты Product
     - serializer_class: сериализатор, определяющий структуру входных/выходных данных
+    - pagination_class: курсорная пагинация в алфавитном порядке
     """
 
     queryset = Product.objects.all()
     serializer_class = ProductListSerializer
+    pagination_class = ProductCursorPagination
+    values_fields = PRODUCT_VALUES
+    serialize_rows = staticmethod(product_rows)
+
+    @action(detail=False)
+    def search(self, request):
+        """
+        Подсказки для ввода: до `limit` блюд, название которых содержит `q`
+        без учёта регистра. Блюда, название которых начинается с `q`, идут
+        первыми.
+        """
+        params = ProductSearchSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        data = params.validated_data
+        return Response(search_products(data["q"], data["limit"]))
+
+
+class OrderViewSet(ValuesReadMixin, viewsets.ModelViewSet):
+    """
+    ViewSet для управления заказами.
+
+    Отдаёт неархивированные заказы вместе с позициями (фиксированное число
+    запросов на страницу, ответ строится из строк `values()`). POST принимает как один заказ, так и список заказов:
+    пакет валидируется целиком и записывается в одной транзакции массовыми
+    вставками. Удаление, как и в HTML-интерфейсе, архивирует заказ.
+    Изменение и архивация выполняются условным UPDATE по версии заказа;
+    если заказ успели изменить, возвращается 409. POST на `status/`
+    переводит сразу несколько заказов в новый статус.
+
+    Используемые классы:
+    - queryset: неархивированные заказы со столами и позициями
+    - serializer_class: сериализатор заказа с вложенными позициями
+    - max_batch_size: максимальное число заказов в одном пакете
+    """
+
+    queryset = Order.objects.filter(archived=False).with_items().order_by("-pk")
+    serializer_class = OrderSerializer
+    values_fields = ORDER_VALUES
+    serialize_rows = staticmethod(order_rows)
+    max_batch_size = 500
+
+    def create(self, request, *args, **kwargs):
+        """Создаёт один заказ или пакет заказов, если передан список."""
+        if not isinstance(request.data, list):
+            return super().create(request, *args, **kwargs)
+
+        serializer = self.get_serializer(
+            data=request.data, many=True, max_length=self.max_batch_size
+        )
+        serializer.is_valid(raise_exception=True)
+        orders = serializer.save()
+        created = (
+            self.get_queryset()
+            .filter(pk__in=[order.pk for order in orders])
+            .order_by("pk")
+        )
+        return Response(
+            self.get_serializer(created, many=True).data,
+            status=status.HTTP_201_CREATED,
+        )
+
+    @action(
+        detail=False,
+        methods=["post"],
+        url_path="status",
+        serializer_class=OrderStatusBatchSerializer,
+    )
+    def change_status(self, request):
+        """
+        Переводит заказы `orders` в статус `status` одним условным UPDATE.
+
+        Допустимые переходы выполняются, остальные (например, из оплаченного
+        обратно в ожидание) и архивные заказы перечисляются в `rejected`
+        с текущим статусом. Заказы, уже имеющие этот статус, не меняются.
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        new_status = serializer.validated_data["status"]
+        updated, unchanged, rejected = Order.objects.change_status(
+            serializer.validated_data["orders"], new_status
+        )
+        return Response(
+            {
+                "status": new_status,
+                "updated": updated,
+                "unchanged": unchanged,
+                "rejected": [
+                    {"id": pk, "status": current} for pk, current in rejected.items()
+                ],
+            }
+        )
+
+    def perform_update(self, serializer):
+        try:
+            serializer.save()
+        except OrderConflictError:
+            raise Conflict()
+
+    def perform_destroy(self, instance):
+        """
+        Архивирует заказ вместо удаления. Версию, которую видел клиент,
+        можно передать параметром `version`.
+        """
+        version = self.request.query_params.get("version")
+        if version is not None:
+            if not version.isdigit():
+                raise ValidationError({"version": "Должно быть целым числом."})
+            instance.version = int(version)
+        instance.archived = True
+        try:
+            with transaction.atomic():
+                instance.save(update_fields=["archived"])
+        except OrderConflictError:
+            raise Conflict()
+
+
+class SalesViewSet(viewsets.ViewSet):
+    """
+    ViewSet отчётов о продажах.
+
+    Читает только дневные сводки (`DailyTableSales`, `DailyProductSales`),
+    которые пополняются при закрытии заказов, поэтому отчёты не просматривают
+    таблицу заказов. Период задаётся параметрами `date_from` и `date_to`.
+
+    Эндпоинты:
+    - list: выручка и число заказов по дням
+    - products: продажи по блюдам за период
+    - tables: продажи по столам за период
+    """
+
+    def get_period(self, queryset):
+        """Ограничивает сводки периодом из параметров запроса."""
+        period = SalesPeriodSerializer(data=self.request.query_params)
+        period.is_valid(raise_exception=True)
+        if "date_from" in period.validated_data:
+            queryset = queryset.filter(date__gte=period.validated_data["date_from"])
+        if "date_to" in period.validated_data:
+            queryset = queryset.filter(date__lte=period.validated_data["date_to"])
+        return queryset
+
+    def list(self, request):
+        rows = (
+            self.get_period(DailyTableSales.objects.all())
+            .values("date")
+            .annotate(orders_count=Sum("orders_count"), revenue=Sum("revenue"))
+            .order_by("date")
+        )
+        return Response(DailySalesSerializer(rows, many=True).data)
+
+    @action(detail=False)
+    def products(self, request):
+        rows = (
+            self.get_period(DailyProductSales.objects.all())
+            .values("product")
+            .annotate(
+                name=F("product__name"),
+                quantity=Sum("quantity"),
+                revenue=Sum("revenue"),
+            )
+            .order_by("-revenue", "product")
+        )
+        return Response(ProductSalesSerializer(rows, many=True).data)
+
+    @action(detail=False)
+    def tables(self, request):
+        rows = (
+            self.get_period(DailyTableSales.objects.all())
+            .values("table")
+            .annotate(
+                number=F("table__number"),
+                orders_count=Sum("orders_count"),
+                revenue=Sum("revenue"),
+            )
+            .order_by("number")
+        )
+        return Response(TableSalesSerializer(rows, many=True).data)
+
+
+class TableViewSet(viewsets.ViewSet):
+    """
+    ViewSet состояния зала.
+
+    Эндпоинты:
+    - board: все столы с занятостью, числом и суммой открытых заказов.
+      Считается одним агрегирующим запросом и отдаётся из кэша, пока
+      не изменится какой-либо стол или заказ.
+    """
+
+    @action(detail=False)
+    def board(self, request):
+        data = get_cached_tables(
+            "api:board",
+            lambda: TableBoardSerializer(Table.objects.board(), many=True).data,
+        )
+        return Response(data)
@@ -0,0 +1,154 @@
+import asyncio
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import async_to_sync
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.test.client import FakePayload
+
+
+def serve_asgi(path, clients, delay):
+    """
+    Обслуживает `clients` одновременных медленных клиентов одним
+    ASGI-приложением в одном цикле событий.
+
+    Медленный клиент читает каждую часть ответа `delay` секунд; пока он
+    читает, цикл событий обслуживает остальных.
+
+    Возвращает:
+        tuple: Время обслуживания всех клиентов в секундах и список статусов.
+    """
+    handler = ASGIHandler()
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "headers": [(b"host", b"testserver")],
+        "server": ("testserver", 80),
+        "client": ("127.0.0.1", 0),
+    }
+
+    async def client():
+        request_sent = False
+        status = None
+
+        async def receive():
+            nonlocal request_sent
+            if not request_sent:
+                request_sent = True
+                return {"type": "http.request", "body": b"", "more_body": False}
+            # Клиент не отключается; ожидание отменит сам обработчик.
+            await asyncio.Event().wait()
+
+        async def send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                await asyncio.sleep(delay)
+
+        await handler(dict(scope), receive, send)
+        return status
+
+    async def serve():
+        return await asyncio.gather(*(client() for _ in range(clients)))
+
+    started = time.perf_counter()
+    statuses = async_to_sync(serve)()
+    return time.perf_counter() - started, statuses
+
+
+def serve_wsgi(path, clients, delay, threads):
+    """
+    Обслуживает `clients` медленных клиентов WSGI-приложением с пулом
+    из `threads` потоков, как это делает многопоточный WSGI-сервер.
+
+    Поток занят запросом, пока клиент не дочитает ответ, поэтому
+    одновременно обслуживается не больше `threads` клиентов.
+
+    Возвращает:
+        tuple: Время обслуживания всех клиентов в секундах и список статусов.
+    """
+    handler = WSGIHandler()
+
+    def client(_):
+        statuses = []
+
+        def start_response(status, headers, exc_info=None):
+            statuses.append(int(status.split()[0]))
+
+        environ = {
+            "REQUEST_METHOD": "GET",
+            "PATH_INFO": path,
+            "QUERY_STRING": "",
+            "SCRIPT_NAME": "",
+            "SERVER_NAME": "testserver",
+            "SERVER_PORT": "80",
+            "SERVER_PROTOCOL": "HTTP/1.1",
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": "http",
+            "wsgi.input": FakePayload(b""),
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": False,
+            "wsgi.run_once": False,
+        }
+        response = handler(environ, start_response)
+        try:
+            for _ in response:
+                time.sleep(delay)
+        finally:
+            response.close()
+        return statuses[0]
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        statuses = list(pool.map(client, range(clients)))
+    return time.perf_counter() - started, statuses
+
+
+def compare(
+    clients,
+    delay,
+    threads,
+    asgi_path="/api/async/orders/",
+    wsgi_path="/api/orders/",
+):
+    """
+    Сравнивает, как быстро один рабочий процесс обслуживает пачку медленных
+    клиентов: асинхронное представление под ASGI против синхронного
+    под многопоточным WSGI.
+
+    Аргументы:
+        clients: Число одновременных клиентов.
+        delay: Сколько секунд клиент читает каждую часть ответа.
+        threads: Размер пула потоков WSGI-сервера.
+        asgi_path: Адрес, запрашиваемый у ASGI-приложения.
+        wsgi_path: Адрес, запрашиваемый у WSGI-приложения.
+
+    Возвращает:
+        dict: Время обслуживания всех клиентов и пропускная способность
+              (клиентов в секунду) для обоих вариантов.
+    """
+    asgi_time, asgi_statuses = serve_asgi(asgi_path, clients, delay)
+    wsgi_time, wsgi_statuses = serve_wsgi(wsgi_path, clients, delay, threads)
+    for path, statuses in ((asgi_path, asgi_statuses), (wsgi_path, wsgi_statuses)):
+        failed = [status for status in statuses if status != 200]
+        if failed:
+            raise RuntimeError(f"{path}: unexpected status {failed[0]}")
+    return {
+        "clients": clients,
+        "delay_ms": round(delay * 1000, 3),
+        "wsgi_threads": threads,
+        "asgi_s": round(asgi_time, 3),
+        "wsgi_s": round(wsgi_time, 3),
+        "asgi_clients_per_s": round(clients / asgi_time, 1),
+        "wsgi_clients_per_s": round(clients / wsgi_time, 1),
+    }
@@ -0,0 +1,74 @@
+import random
+from dataclasses import dataclass
+from decimal import Decimal
+
+from orders.models import Order, OrderItem, Product, Table
+
+
+@dataclass(frozen=True)
+class Scale:
+    """Объём синтетических данных для бенчмарка."""
+
+    tables: int
+    products: int
+    orders: int
+    max_items: int = 4
+
+
+SCALES = {
+    "tiny": Scale(tables=5, products=50, orders=200),
+    "small": Scale(tables=100, products=5_000, orders=100_000),
+    "full": Scale(tables=100, products=5_000, orders=1_000_000),
+}
+
+
+def generate(scale, batch_size=10_000, seed=0, progress=None):
+    """
+    Заполняет базу синтетическими столами, меню и заказами.
+
+    Заказы и позиции вставляются пачками через `bulk_create`; в памяти
+    одновременно находится не больше одной пачки. Четверть заказов
+    архивирована, статусы распределены равномерно.
+
+    Аргументы:
+        scale: Объём данных (`Scale`).
+        batch_size: Размер пачки вставки.
+        seed: Зерно генератора случайных чисел, чтобы данные были одинаковыми.
+        progress: Необязательная функция, вызываемая с числом созданных заказов.
+    """
+    rng = random.Random(seed)
+
+    tables = Table.objects.bulk_create(
+        Table(number=number) for number in range(1, scale.tables + 1)
+    )
+    products = Product.objects.bulk_create(
+        (
+            Product(
+                name=f"Блюдо {index:05}",
+                price=Decimal(rng.randrange(5_000, 150_000)) / 100,
+            )
+            for index in range(scale.products)
+        ),
+        batch_size=batch_size,
+    )
+    statuses = [status for status, _ in Order.STATUS_CHOICES]
+
+    created = 0
+    while created < scale.orders:
+        count = min(batch_size, scale.orders - created)
+        entries = []
+        for _ in range(count):
+            order = Order(
+                table_number=rng.choice(tables),
+                status=rng.choice(statuses),
+                archived=rng.random() < 0.25,
+            )
+            items = [
+                OrderItem(product=product, quantity=rng.randint(1, 3))
+                for product in rng.sample(products, rng.randint(1, scale.max_items))
+            ]
+            entries.append((order, items))
+        Order.objects.create_with_items(entries)
+        created += count
+        if progress is not None:
+            progress(created)
@@ -0,0 +1,125 @@
+import json
+import platform
+import statistics
+import time
+
+from django.db import connection, reset_queries
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+
+def percentile(values, fraction):
+    """Возвращает перцентиль по методу ближайшего ранга."""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+def measure(scenario, iterations, client=None):
+    """
+    Выполняет сценарий `iterations` раз и возвращает метрики.
+
+    Возвращает:
+        dict: Число запросов к базе (максимум по итерациям) и задержки в мс:
+              p50, p95 и максимум.
+    """
+    client = client or Client()
+    scenario.setup(client)
+    timings = []
+    queries = 0
+    for _ in range(iterations):
+        scenario.before_each()
+        reset_queries()
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = scenario.request(client)
+            if hasattr(response, "render"):
+                response.render()
+            timings.append((time.perf_counter() - started) * 1000)
+        if response.status_code >= 400:
+            raise RuntimeError(
+                f"{scenario.name}: unexpected status {response.status_code}"
+            )
+        queries = max(queries, len(captured))
+    return {
+        "queries": queries,
+        "p50_ms": round(statistics.median(timings), 3),
+        "p95_ms": round(percentile(timings, 0.95), 3),
+        "max_ms": round(max(timings), 3),
+    }
+
+
+def run(scenarios, iterations, progress=None):
+    """Выполняет все сценарии и возвращает результаты с описанием окружения."""
+    results = {}
+    for scenario_class in scenarios:
+        scenario = scenario_class()
+        results[scenario.name] = measure(scenario, iterations)
+        if progress is not None:
+            progress(scenario.name, results[scenario.name])
+    return {
+        "environment": {
+            "python": platform.python_version(),
+            "database": connection.vendor,
+        },
+        "iterations": iterations,
+        "results": results,
+    }
+
+
+def compare(results, baseline, tolerance, slack_ms=1.0):
+    """
+    Сравнивает результаты с эталоном.
+
+    Регрессией считается рост числа запросов или p95 больше чем
+    в `1 + tolerance` раз по сравнению с эталоном. Для быстрых сценариев
+    допускается также абсолютный рост до `slack_ms`, иначе шум измерений
+    в доли миллисекунды выглядел бы как регрессия.
+
+    Возвращает:
+        list: Описания регрессий; пустой список, если их нет.
+    """
+    regressions = []
+    for name, expected in baseline.items():
+        actual = results.get(name)
+        if actual is None:
+            regressions.append(f"{name}: scenario missing from results")
+            continue
+        if actual["queries"] > expected["queries"]:
+            regressions.append(
+                f"{name}: {actual['queries']} queries, baseline {expected['queries']}"
+            )
+        limit = max(
+            expected["p95_ms"] * (1 + tolerance), expected["p95_ms"] + slack_ms
+        )
+        if actual["p95_ms"] > limit:
+            regressions.append(
+                f"{name}: p95 {actual['p95_ms']} ms, "
+                f"baseline {expected['p95_ms']} ms (limit {limit:.3f} ms)"
+            )
+    return regressions
+
+
+def load_baseline(path, scale):
+    """Читает эталон для заданного объёма данных; без файла эталона — пустой."""
+    try:
+        with open(path, encoding="utf-8") as file:
+            return json.load(file).get(scale, {})
+    except FileNotFoundError:
+        return {}
+
+
+def save_baseline(path, scale, results):
+    """Записывает результаты как эталон для заданного объёма данных."""
+    try:
+        with open(path, encoding="utf-8") as file:
+            baselines = json.load(file)
+    except FileNotFoundError:
+        baselines = {}
+    baselines[scale] = {
+        name: {"queries": metrics["queries"], "p95_ms": metrics["p95_ms"]}
+        for name, metrics in results.items()
+    }
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(baselines, file, indent=2, sort_keys=True)
+        file.write("\n")
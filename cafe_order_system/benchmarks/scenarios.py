@@ -0,0 +1,164 @@
+from django.core.cache import cache
+from django.urls import reverse
+
+from orders.models import Order, Product, Table
+
+
+class Scenario:
+    """
+    Сценарий бенчмарка: один HTTP-запрос, повторяемый много раз.
+
+    Подклассы задают `name` и метод `request`, а при необходимости `setup`,
+    который выполняется один раз перед замерами и не входит в них.
+    """
+
+    name = None
+
+    def setup(self, client):
+        pass
+
+    def before_each(self):
+        pass
+
+    def request(self, client):
+        raise NotImplementedError
+
+
+class OrderListScenario(Scenario):
+    name = "order_list"
+
+    def request(self, client):
+        return client.get(reverse("orders:order_list"))
+
+
+class OrderListUncachedScenario(OrderListScenario):
+    """Список заказов без кэша блоков: каждый заказ отрисовывается заново."""
+
+    name = "order_list_uncached"
+
+    def before_each(self):
+        cache.clear()
+
+
+class OrderListDeepScenario(Scenario):
+    """Страница из самого конца истории заказов."""
+
+    name = "order_list_deep"
+
+    def setup(self, client):
+        oldest = Order.objects.filter(archived=False).order_by("pk")[20:21].get()
+        self.url = f"{reverse('orders:order_list')}?after={oldest.pk}"
+
+    def request(self, client):
+        return client.get(self.url)
+
+
+class OrderDetailScenario(Scenario):
+    name = "order_detail"
+
+    def setup(self, client):
+        order = Order.objects.order_by("-pk").first()
+        self.url = reverse("orders:order_detail", args=(order.pk,))
+
+    def request(self, client):
+        return client.get(self.url)
+
+
+def order_form_data(table, products, status="waiting", items=None):
+    """Собирает данные POST-запроса формы заказа с набором позиций."""
+    items = items or []
+    data = {
+        "table_number": table.pk,
+        "status": status,
+        "items-TOTAL_FORMS": str(len(products)),
+        "items-INITIAL_FORMS": str(len(items)),
+        "items-MIN_NUM_FORMS": "1",
+        "items-MAX_NUM_FORMS": "1000",
+    }
+    for index, product in enumerate(products):
+        data[f"items-{index}-product"] = product.pk
+        data[f"items-{index}-quantity"] = "2"
+        if index < len(items):
+            data[f"items-{index}-id"] = items[index].pk
+    return data
+
+
+class OrderCreateScenario(Scenario):
+    name = "order_create"
+
+    def setup(self, client):
+        self.url = reverse("orders:order_create")
+        self.data = order_form_data(
+            Table.objects.first(), list(Product.objects.all()[:3])
+        )
+
+    def request(self, client):
+        return client.post(self.url, self.data)
+
+
+class OrderUpdateScenario(Scenario):
+    name = "order_update"
+
+    def setup(self, client):
+        order = Order.objects.filter(archived=False).order_by("-pk").first()
+        items = list(order.items.select_related("product"))
+        self.url = reverse("orders:order_update", args=(order.pk,))
+        self.data = order_form_data(
+            order.table_number,
+            [item.product for item in items],
+            status="ready",
+            items=items,
+        )
+
+    def request(self, client):
+        return client.post(self.url, self.data)
+
+
+class ProductListScenario(Scenario):
+    """Список продуктов API без кэша: каждый запрос идёт в базу."""
+
+    name = "products_list"
+
+    def before_each(self):
+        cache.clear()
+
+    def request(self, client):
+        return client.get(reverse("product-list"))
+
+
+class ProductListCachedScenario(Scenario):
+    """Список продуктов API при прогретом кэше меню."""
+
+    name = "products_list_cached"
+
+    def setup(self, client):
+        client.get(reverse("product-list"))
+
+    def request(self, client):
+        return client.get(reverse("product-list"))
+
+
+class ProductSearchScenario(Scenario):
+    """Подсказка по части названия блюда при прогретом индексе меню."""
+
+    name = "product_search"
+
+    def setup(self, client):
+        self.url = f"{reverse('product-search')}?q=юдо+012"
+        client.get(self.url)
+
+    def request(self, client):
+        return client.get(self.url)
+
+
+SCENARIOS = [
+    OrderListScenario,
+    OrderListUncachedScenario,
+    OrderListDeepScenario,
+    OrderDetailScenario,
+    OrderCreateScenario,
+    OrderUpdateScenario,
+    ProductListScenario,
+    ProductListCachedScenario,
+    ProductSearchScenario,
+]
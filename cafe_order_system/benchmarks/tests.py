@@ -0,0 +1,81 @@
+from django.test import TestCase, TransactionTestCase
+
+from benchmarks import concurrency, data, runner
+from benchmarks.scenarios import SCENARIOS
+from orders.models import Order, OrderItem, Product, Table
+
+
+class GenerateDataTest(TestCase):
+    """Тесты генератора синтетических данных."""
+
+    def test_generates_requested_volume(self) -> None:
+        """Проверяет, что создаётся заданное число столов, блюд и заказов."""
+        data.generate(data.Scale(tables=3, products=10, orders=25), batch_size=10)
+
+        self.assertEqual(Table.objects.count(), 3)
+        self.assertEqual(Product.objects.count(), 10)
+        self.assertEqual(Order.objects.count(), 25)
+        self.assertFalse(OrderItem.objects.filter(unit_price__isnull=True).exists())
+
+
+class RunnerTest(TestCase):
+    """
+    Тесты запуска сценариев и сравнения с эталоном.
+    Проверяет, что все сценарии выполняются на небольшом наборе данных.
+    """
+
+    def test_all_scenarios_run(self) -> None:
+        """Проверяет, что каждый сценарий возвращает число запросов и задержки."""
+        data.generate(data.SCALES["tiny"])
+
+        report = runner.run(SCENARIOS, iterations=2)
+
+        self.assertEqual(
+            set(report["results"]), {scenario.name for scenario in SCENARIOS}
+        )
+        for metrics in report["results"].values():
+            self.assertGreaterEqual(metrics["p95_ms"], metrics["p50_ms"])
+        self.assertEqual(report["results"]["order_list"]["queries"], 2)
+        self.assertEqual(report["results"]["products_list_cached"]["queries"], 0)
+
+    def test_compare_reports_regressions(self) -> None:
+        """Проверяет, что рост запросов и p95 сверх допуска считается регрессией."""
+        baseline = {
+            "order_list": {"queries": 2, "p95_ms": 10.0},
+            "order_detail": {"queries": 2, "p95_ms": 10.0},
+            "order_create": {"queries": 10, "p95_ms": 10.0},
+        }
+        results = {
+            "order_list": {"queries": 3, "p95_ms": 10.0},
+            "order_detail": {"queries": 2, "p95_ms": 16.0},
+            "order_create": {"queries": 9, "p95_ms": 14.0},
+        }
+
+        regressions = runner.compare(results, baseline, tolerance=0.5)
+
+        self.assertEqual(len(regressions), 2)
+        self.assertTrue(regressions[0].startswith("order_list: 3 queries"))
+        self.assertTrue(regressions[1].startswith("order_detail: p95"))
+
+
+class ConcurrencyTest(TransactionTestCase):
+    """
+    Тест сравнения ASGI и WSGI на медленных клиентах.
+
+    Транзакционный: потоки WSGI-сервера работают со своими соединениями
+    и должны видеть общую базу.
+    """
+
+    def test_asgi_serves_slow_clients_concurrently(self) -> None:
+        """
+        Проверяет, что 20 клиентов, читающих ответ по 50 мс, ASGI обслуживает
+        быстрее, чем WSGI с двумя потоками, которому нужно не меньше
+        10 последовательных очередей по 50 мс.
+        """
+        result = concurrency.compare(clients=20, delay=0.05, threads=2)
+
+        self.assertGreaterEqual(result["wsgi_s"], 0.5)
+        self.assertLess(result["asgi_s"], result["wsgi_s"])
+        self.assertGreater(
+            result["asgi_clients_per_s"], result["wsgi_clients_per_s"]
+        )
@@ -0,0 +1,131 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.db import OperationalError, connection, connections, transaction
+
+from cafe_order_system.databases import postgres_database, sqlite_database
+from orders.models import Order, OrderItem, Product, Table
+
+
+def sqlite_default(directory):
+    """SQLite без настройки: журнал отката и отложенные транзакции."""
+    path = str(directory / "default.sqlite3")
+    return {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": path,
+        "TEST": {"NAME": path},
+    }
+
+
+def sqlite_tuned(directory):
+    """Профиль SQLite из настроек: WAL, busy_timeout, synchronous=NORMAL."""
+    path = str(directory / "tuned.sqlite3")
+    return {**sqlite_database(path), "TEST": {"NAME": path}}
+
+
+def postgres(directory):
+    """Профиль PostgreSQL из переменных окружения (тестовая база test_<имя>)."""
+    return postgres_database(os.environ)
+
+
+PROFILES = {
+    "sqlite-default": sqlite_default,
+    "sqlite-tuned": sqlite_tuned,
+    "postgres": postgres,
+}
+
+
+@contextmanager
+def use_database(config):
+    """Временно подменяет настройки базы `default` во всех потоках."""
+    original = connections.settings["default"]
+    connection.close()
+    connections.settings["default"] = connections.configure_settings(
+        {"default": config}
+    )["default"]
+    del connections["default"]
+    try:
+        yield
+    finally:
+        connection.close()
+        connections.settings["default"] = original
+        del connections["default"]
+
+
+def write_throughput(config, writers, orders, tables=10, products=20):
+    """
+    Замеряет пропускную способность записи заказов для настроек базы.
+
+    Создаёт временную базу, после чего `writers` потоков одновременно
+    создают по `orders` заказов из трёх позиций, каждый в своей транзакции,
+    тем же путём, что и API (`Order.objects.create_with_items`).
+
+    Возвращает:
+        dict: Число созданных заказов, ошибок блокировки, время в секундах
+              и заказов в секунду.
+    """
+    with use_database(config):
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        try:
+            table_ids = [
+                table.pk
+                for table in Table.objects.bulk_create(
+                    Table(number=number) for number in range(1, tables + 1)
+                )
+            ]
+            menu = list(
+                Product.objects.bulk_create(
+                    Product(name=f"Блюдо {index}", price=100 + index)
+                    for index in range(products)
+                )
+            )
+
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=writers) as pool:
+                results = list(
+                    pool.map(
+                        lambda writer: write_orders(writer, orders, table_ids, menu),
+                        range(writers),
+                    )
+                )
+            elapsed = time.perf_counter() - started
+        finally:
+            if hasattr(connection, "close_pool"):
+                connection.close_pool()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    created = sum(result[0] for result in results)
+    return {
+        "writers": writers,
+        "orders": created,
+        "errors": sum(result[1] for result in results),
+        "seconds": round(elapsed, 3),
+        "orders_per_s": round(created / elapsed, 1),
+    }
+
+
+def write_orders(writer, count, table_ids, menu):
+    """Создаёт заказы в отдельном потоке; возвращает (создано, ошибок)."""
+    created = errors = 0
+    try:
+        for index in range(count):
+            position = writer * count + index
+            order = Order(table_number_id=table_ids[position % len(table_ids)])
+            items = [
+                OrderItem(product=menu[(position + offset) % len(menu)], quantity=1)
+                for offset in range(3)
+            ]
+            try:
+                with transaction.atomic():
+                    Order.objects.create_with_items([(order, items)])
+            except OperationalError:
+                errors += 1
+            else:
+                created += 1
+    finally:
+        connection.close()
+    return created, errors
@@ -0,0 +1,129 @@
+"""
+Профили подключения к базе данных.
+
+Профиль выбирается переменной окружения `DATABASE_PROFILE`:
+`sqlite` (по умолчанию) или `postgres`.
+"""
+
+from django.core.exceptions import ImproperlyConfigured
+
+TRUE_VALUES = ("1", "true", "yes", "on")
+
+
+def sqlite_database(path, busy_timeout_ms=5000, synchronous="NORMAL"):
+    """
+    SQLite, настроенный на конкурентную запись.
+
+    При каждом подключении включаются:
+    - `journal_mode=WAL`: читатели не блокируют писателя и наоборот;
+    - `busy_timeout`: занятая база ожидается, а не сразу даёт
+      "database is locked";
+    - `synchronous=NORMAL`: в режиме WAL база не повреждается при сбое,
+      а fsync выполняется при контрольной точке, а не на каждый коммит.
+
+    Транзакции открываются как `BEGIN IMMEDIATE` и сразу берут блокировку
+    записи. Отложенная транзакция, начавшая с чтения, при попытке записи
+    получила бы "database is locked" без ожидания `busy_timeout`.
+    """
+    pragmas = [
+        "PRAGMA journal_mode=WAL",
+        f"PRAGMA busy_timeout={int(busy_timeout_ms)}",
+        f"PRAGMA synchronous={synchronous}",
+    ]
+    return {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": path,
+        "OPTIONS": {
+            "init_command": ";".join(pragmas),
+            "transaction_mode": "IMMEDIATE",
+        },
+    }
+
+
+def postgres_database(env):
+    """
+    PostgreSQL с пулом или постоянными соединениями.
+
+    По умолчанию используется пул psycopg (`POSTGRES_POOL`): приложение
+    работает под ASGI, где Django рекомендует пул вместо постоянных
+    соединений. Соединение из пула проверяется перед выдачей.
+    С `POSTGRES_POOL=false` (например, под WSGI) соединения живут
+    `POSTGRES_CONN_MAX_AGE` секунд и проверяются перед каждым запросом.
+    """
+    config = {
+        "ENGINE": "django.db.backends.postgresql",
+        "NAME": env.get("POSTGRES_DB", "cafe"),
+        "USER": env.get("POSTGRES_USER", "postgres"),
+        "PASSWORD": env.get("POSTGRES_PASSWORD", ""),
+        "HOST": env.get("POSTGRES_HOST", "localhost"),
+        "PORT": env.get("POSTGRES_PORT", "5432"),
+        "OPTIONS": {},
+    }
+    if env.get("POSTGRES_POOL", "true").lower() in TRUE_VALUES:
+        from psycopg_pool import ConnectionPool
+
+        config["OPTIONS"]["pool"] = {
+            "min_size": int(env.get("POSTGRES_POOL_MIN_SIZE", 2)),
+            "max_size": int(env.get("POSTGRES_POOL_MAX_SIZE", 10)),
+            "timeout": float(env.get("POSTGRES_POOL_TIMEOUT", 10)),
+            "check": ConnectionPool.check_connection,
+        }
+    else:
+        config["CONN_MAX_AGE"] = int(env.get("POSTGRES_CONN_MAX_AGE", 60))
+        config["CONN_HEALTH_CHECKS"] = True
+    return config
+
+
+def database_from_env(env, base_dir):
+    """
+    Возвращает настройки базы `default` по переменным окружения.
+
+    Аргументы:
+        env: Словарь переменных окружения (обычно `os.environ`).
+        base_dir: Каталог проекта; в нём по умолчанию лежит файл SQLite.
+    """
+    profile = env.get("DATABASE_PROFILE", "sqlite")
+    if profile == "sqlite":
+        return sqlite_database(
+            env.get("SQLITE_PATH", base_dir / "db.sqlite3"),
+            busy_timeout_ms=int(env.get("SQLITE_BUSY_TIMEOUT_MS", 5000)),
+            synchronous=env.get("SQLITE_SYNCHRONOUS", "NORMAL"),
+        )
+    if profile == "postgres":
+        return postgres_database(env)
+    raise ImproperlyConfigured(f"Unknown DATABASE_PROFILE: {profile!r}")
+
+
+def replicas_from_env(env, primary):
+    """
+    Возвращает настройки реплик для чтения по переменной `DATABASE_REPLICAS`.
+
+    Значение — список через запятую: пути к файлам SQLite или хосты
+    PostgreSQL (`host` или `host:port`). Остальные параметры реплики
+    берутся из основной базы. В тестах реплики зеркалируют основную базу,
+    отдельные тестовые базы для них не создаются.
+
+    Аргументы:
+        env: Словарь переменных окружения (обычно `os.environ`).
+        primary: Настройки основной базы.
+
+    Возвращает:
+        dict: Алиасы `replica1`, `replica2`, ... и их настройки.
+    """
+    locations = [
+        location.strip()
+        for location in env.get("DATABASE_REPLICAS", "").split(",")
+        if location.strip()
+    ]
+    replicas = {}
+    for index, location in enumerate(locations, start=1):
+        config = {**primary, "OPTIONS": dict(primary.get("OPTIONS", {}))}
+        if primary["ENGINE"].endswith("sqlite3"):
+            config["NAME"] = location
+        else:
+            host, _, port = location.partition(":")
+            config["HOST"] = host
+            config["PORT"] = port or primary.get("PORT", "")
+        config["TEST"] = {"MIRROR": "default"}
+        replicas[f"replica{index}"] = config
+    return replicas
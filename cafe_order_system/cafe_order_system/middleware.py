@@ -0,0 +1,222 @@
+import json
+import logging
+from contextlib import ExitStack, contextmanager
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+from . import routers
+
+logger = logging.getLogger("cafe_order_system.performance")
+
+
+class RequestMetrics:
+    """
+    Метрики одного запроса: число SQL-запросов и их суммарное время,
+    время работы представления, отрисовки шаблона и всего запроса.
+
+    Объект сам служит обёрткой выполнения SQL (`connection.execute_wrapper`),
+    поэтому запросы считаются и при выключенном DEBUG.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_time = 0.0
+        self.view_time = None
+        self.render_time = None
+        self.total_time = None
+        self.started = perf_counter()
+        self.view_started = None
+        self.render_started = None
+
+    def __call__(self, execute, sql, params, many, context):
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.sql_time += perf_counter() - started
+
+    def start_view(self):
+        self.view_started = perf_counter()
+
+    def start_render(self):
+        self.render_started = perf_counter()
+        if self.view_started is not None:
+            self.view_time = self.render_started - self.view_started
+
+    def finish_render(self):
+        self.render_time = perf_counter() - self.render_started
+
+    def finish(self):
+        now = perf_counter()
+        self.total_time = now - self.started
+        if self.view_time is None and self.view_started is not None:
+            self.view_time = now - self.view_started
+
+    def as_dict(self):
+        """Возвращает метрики в миллисекундах."""
+        return {
+            "queries": self.queries,
+            "sql_ms": _ms(self.sql_time),
+            "view_ms": _ms(self.view_time),
+            "render_ms": _ms(self.render_time),
+            "total_ms": _ms(self.total_time),
+        }
+
+    def server_timing(self):
+        """Формирует значение заголовка Server-Timing."""
+        metrics = self.as_dict()
+        parts = [f'db;dur={metrics["sql_ms"]};desc="{self.queries} queries"']
+        if metrics["view_ms"] is not None:
+            parts.append(f"view;dur={metrics['view_ms']}")
+        if metrics["render_ms"] is not None:
+            parts.append(f"render;dur={metrics['render_ms']}")
+        parts.append(f"total;dur={metrics['total_ms']}")
+        return ", ".join(parts)
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 3)
+
+
+class RequestMetricsMiddleware:
+    """
+    Middleware, собирающее метрики каждого запроса.
+
+    Метрики доступны как `request.metrics` и `response.metrics` (в том числе
+    в тестах, для проверки бюджета запросов к базе), отдаются клиенту
+    в заголовке `Server-Timing`, а запросы дольше порога
+    `SLOW_REQUEST_THRESHOLD_MS` пишутся в журнал
+    `cafe_order_system.performance` отдельной структурированной записью.
+
+    Должно стоять первым в `MIDDLEWARE`, чтобы учитывать работу остальных.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        request.metrics = metrics = RequestMetrics()
+        with self.track(metrics):
+            response = self.get_response(request)
+        return self.finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        request.metrics = metrics = RequestMetrics()
+        # Соединения с базой привязаны к потоку, а асинхронный ORM выполняет
+        # запросы в синхронном потоке запроса, поэтому счётчик подключается
+        # и снимается там же.
+        stack = ExitStack()
+        await sync_to_async(self.install)(stack, metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+        return self.finish(request, response, metrics)
+
+    @contextmanager
+    def track(self, metrics):
+        """Подключает подсчёт SQL ко всем соединениям на время запроса."""
+        with ExitStack() as stack:
+            self.install(stack, metrics)
+            yield
+
+    @staticmethod
+    def install(stack, metrics):
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(metrics))
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.metrics.start_view()
+
+    def process_template_response(self, request, response):
+        metrics = request.metrics
+        metrics.start_render()
+        response.add_post_render_callback(lambda rendered: metrics.finish_render())
+        return response
+
+    def finish(self, request, response, metrics):
+        metrics.finish()
+        response.metrics = metrics
+        if getattr(settings, "SERVER_TIMING_HEADER", True):
+            response["Server-Timing"] = metrics.server_timing()
+
+        threshold = getattr(settings, "SLOW_REQUEST_THRESHOLD_MS", None)
+        if threshold is not None and metrics.total_time * 1000 >= threshold:
+            record = {
+                "method": request.method,
+                "path": request.path,
+                "status": response.status_code,
+                **metrics.as_dict(),
+            }
+            logger.warning(json.dumps(record), extra={"request_metrics": record})
+        return response
+
+
+class ReplicaPinMiddleware:
+    """
+    Middleware, закрепляющее чтения клиента за основной базой после записи.
+
+    Изменяющие запросы (POST, PUT, PATCH, DELETE) читают из основной базы.
+    Если запрос что-то записал, клиент получает cookie `REPLICA_PIN_COOKIE`
+    на `REPLICA_PIN_SECONDS` секунд, и пока она жива, его чтения тоже идут
+    в основную базу: клиент видит свои изменения, даже если реплика ещё
+    не догнала основную базу. Остальные чтения уходят на реплики
+    (см. `routers.PrimaryReplicaRouter`).
+    """
+
+    sync_capable = True
+    async_capable = True
+    safe_methods = ("GET", "HEAD", "OPTIONS", "TRACE")
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        state, token = routers.start_request(self.pinned(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            routers.finish_request(token)
+        return self.finish(state, response)
+
+    async def __acall__(self, request):
+        state, token = routers.start_request(self.pinned(request))
+        try:
+            response = await self.get_response(request)
+        finally:
+            routers.finish_request(token)
+        return self.finish(state, response)
+
+    def pinned(self, request):
+        return (
+            request.method not in self.safe_methods
+            or settings.REPLICA_PIN_COOKIE in request.COOKIES
+        )
+
+    def finish(self, state, response):
+        if state.wrote:
+            response.set_cookie(
+                settings.REPLICA_PIN_COOKIE,
+                "1",
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
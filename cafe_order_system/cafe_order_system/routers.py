@@ -0,0 +1,112 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+_request_state = ContextVar("replica_request_state", default=None)
+_force_primary = ContextVar("replica_force_primary", default=False)
+
+
+class PinState:
+    """
+    Состояние маршрутизации в рамках одного запроса.
+
+    Атрибуты:
+        pinned: Чтения идут в основную базу (недавняя запись клиента
+                или изменяющий запрос).
+        wrote: Во время запроса была запись в основную базу.
+    """
+
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.wrote = False
+
+
+def start_request(pinned):
+    """
+    Включает маршрутизацию чтений для текущего запроса.
+
+    Объект состояния изменяемый, поэтому отметка о записи, сделанной
+    в потоке `sync_to_async`, видна и middleware в асинхронном контексте.
+
+    Возвращает:
+        tuple: Состояние запроса и токен для `finish_request`.
+    """
+    state = PinState(pinned)
+    return state, _request_state.set(state)
+
+
+def finish_request(token):
+    _request_state.reset(token)
+
+
+@contextmanager
+def use_primary():
+    """Направляет все чтения внутри блока в основную базу."""
+    token = _force_primary.set(True)
+    try:
+        yield
+    finally:
+        _force_primary.reset(token)
+
+
+def in_transaction(using=DEFAULT_DB_ALIAS):
+    """
+    Проверяет, открыта ли транзакция в основной базе.
+
+    Транзакции, в которые `TestCase` оборачивает тесты, не учитываются —
+    так же, как при проверке `atomic(durable=True)` в Django.
+    """
+    return any(
+        not block._from_testcase for block in connections[using].atomic_blocks
+    )
+
+
+class PrimaryReplicaRouter:
+    """
+    Маршрутизатор основной базы и реплик для чтения.
+
+    Запись всегда идёт в основную базу. Чтение внутри HTTP-запроса
+    распределяется по репликам из настройки `DATABASE_REPLICAS`, кроме
+    случаев, когда клиент должен увидеть свои изменения:
+    - запрос изменяющий (POST, PUT, PATCH, DELETE) или клиент недавно писал
+      (см. `ReplicaPinMiddleware`);
+    - во время запроса уже была запись;
+    - чтение идёт внутри транзакции основной базы или в блоке `use_primary`.
+
+    Вне HTTP-запросов (команды, сигналы при импорте) чтение идёт в основную
+    базу. Реплики не мигрируются: схему на них приносит репликация.
+    """
+
+    def db_for_read(self, model, **hints):
+        replicas = getattr(settings, "DATABASE_REPLICAS", [])
+        state = _request_state.get()
+        if (
+            not replicas
+            or state is None
+            or state.pinned
+            or state.wrote
+            or _force_primary.get()
+            or in_transaction()
+        ):
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        state = _request_state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *getattr(settings, "DATABASE_REPLICAS", [])}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in getattr(settings, "DATABASE_REPLICAS", []):
+            return False
+        return None
@@ -10,8 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from .databases import database_from_env, replicas_from_env
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -43,6 +46,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "cafe_order_system.middleware.RequestMetricsMiddleware",
+    "cafe_order_system.middleware.ReplicaPinMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -76,12 +81,20 @@ WSGI_APPLICATION = "cafe_order_system.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
-DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
-    }
-}
+# Профиль базы выбирается переменной DATABASE_PROFILE: sqlite (WAL, busy_timeout,
+# synchronous=NORMAL) или postgres (пул соединений psycopg), см. databases.py.
+
+DATABASES = {"default": database_from_env(os.environ, BASE_DIR)}
+
+# Реплики для чтения (DATABASE_REPLICAS: пути SQLite или хосты PostgreSQL через
+# запятую). Запись идёт в основную базу; после записи чтения клиента
+# REPLICA_PIN_SECONDS секунд остаются на основной базе, см. routers.py.
+
+DATABASES.update(replicas_from_env(os.environ, DATABASES["default"]))
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != "default"]
+DATABASE_ROUTERS = ["cafe_order_system.routers.PrimaryReplicaRouter"]
+REPLICA_PIN_COOKIE = "primary_pin"
+REPLICA_PIN_SECONDS = int(os.environ.get("REPLICA_PIN_SECONDS", 5))
 
 
 # Password validation
@@ -126,17 +139,79 @@ STATIC_URL = "static/"
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 REST_FRAMEWORK = {
-    "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
+    "DEFAULT_PAGINATION_CLASS": "DRF.pagination.DefaultCursorPagination",
     "PAGE_SIZE": 10,
+    "DEFAULT_RENDERER_CLASSES": [
+        "DRF.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
 }
 
-CACHEOPS_REDIS = {
-    "host": "localhost",
-    "port": 6379,
-    "db": 0,
-    "socket_timeout": 3,
-}
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# Кэш в памяти процесса по умолчанию; при заданном REDIS_URL — общий Redis.
 
-CACHEOPS = {
-    "orders.product": {"timeout": 60 * 5},
+REDIS_URL = os.environ.get("REDIS_URL")
+
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+# Кэш меню: алиас из CACHES и время жизни записей (версия меню живёт бессрочно).
+PRODUCT_CACHE_ALIAS = "default"
+PRODUCT_CACHE_TIMEOUT = 60 * 60
+
+# Кэш отрисованных блоков заказов: ключ меняется вместе с заказом, столом
+# и меню, время жизни ограничивает только хранение устаревших блоков.
+ORDER_FRAGMENT_TIMEOUT = 60 * 60
+
+# Хранение архива: архивные заказы старше срока выгружаются командой
+# archive_orders в сжатые файлы JSONL этого каталога и удаляются из базы.
+ORDER_RETENTION_DAYS = int(os.environ.get("ORDER_RETENTION_DAYS", 365))
+ORDER_ARCHIVE_DIR = os.environ.get("ORDER_ARCHIVE_DIR", BASE_DIR / "archive")
+
+# Фоновые задачи: очередь в базе, воркер — `python manage.py run_jobs`.
+# С JOBS_EAGER=1 задачи выполняются после фиксации транзакции в том же
+# процессе, без воркера. Неудачная попытка повторяется через
+# JOBS_RETRY_DELAY * 2 ** (попытка - 1) секунд; задача, выполняющаяся
+# дольше JOBS_TIMEOUT секунд, возвращается в очередь.
+JOBS_EAGER = os.environ.get("JOBS_EAGER") == "1"
+JOBS_RETRY_DELAY = 5
+JOBS_TIMEOUT = 10 * 60
+
+# Order events (Server-Sent Events)
+# Рассылка внутри процесса по умолчанию; с REDIS_URL — через Redis Pub/Sub,
+# чтобы события доходили до всех процессов ASGI-сервера.
+
+ORDER_EVENTS_BACKEND = (
+    "orders.events.RedisBroadcast" if REDIS_URL else "orders.events.LocalBroadcast"
+)
+ORDER_EVENTS_KEEPALIVE = 15
+
+# Метрики запросов: заголовок Server-Timing и журнал медленных запросов.
+SERVER_TIMING_HEADER = True
+SLOW_REQUEST_THRESHOLD_MS = int(os.environ.get("SLOW_REQUEST_THRESHOLD_MS", 500))
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "cafe_order_system.performance": {
+            "handlers": ["console"],
+            "level": "WARNING",
+        },
+    },
 }
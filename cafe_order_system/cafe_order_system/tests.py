@@ -0,0 +1,192 @@
+import sys
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections, transaction
+from django.db.utils import ConnectionHandler
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from orders.models import Order, Product, Table
+
+from .databases import database_from_env, replicas_from_env
+from .routers import PrimaryReplicaRouter, finish_request, start_request
+
+
+class DatabaseProfileTest(SimpleTestCase):
+    """
+    Тесты профилей подключения к базе данных.
+    Проверяет выбор профиля по переменным окружения и настройки соединений.
+    """
+
+    def test_sqlite_profile_applies_pragmas_on_connect(self) -> None:
+        """Проверяет, что новое соединение SQLite работает в WAL с нужными PRAGMA."""
+        with tempfile.TemporaryDirectory() as directory:
+            config = database_from_env(
+                {"SQLITE_BUSY_TIMEOUT_MS": "2500"}, Path(directory)
+            )
+            wrapper = ConnectionHandler({"default": config})["default"]
+            # Соединение открывается так же, как это делает Django при первом
+            # запросе, но в обход запрета обращений к базе в SimpleTestCase.
+            connection = wrapper.get_new_connection(wrapper.get_connection_params())
+            try:
+                pragmas = {
+                    name: connection.execute(f"PRAGMA {name}").fetchone()[0]
+                    for name in ("journal_mode", "busy_timeout", "synchronous")
+                }
+            finally:
+                connection.close()
+
+        self.assertEqual(config["NAME"], Path(directory) / "db.sqlite3")
+        self.assertEqual(config["OPTIONS"]["transaction_mode"], "IMMEDIATE")
+        # synchronous=NORMAL соответствует значению 1.
+        self.assertEqual(
+            pragmas, {"journal_mode": "wal", "busy_timeout": 2500, "synchronous": 1}
+        )
+
+    def test_postgres_profile_uses_checked_pool(self) -> None:
+        """Проверяет, что по умолчанию PostgreSQL работает через пул с проверкой."""
+        pool_module = mock.MagicMock()
+        with mock.patch.dict(sys.modules, {"psycopg_pool": pool_module}):
+            config = database_from_env(
+                {"DATABASE_PROFILE": "postgres", "POSTGRES_DB": "cafe_prod"}, Path()
+            )
+
+        self.assertEqual(config["ENGINE"], "django.db.backends.postgresql")
+        self.assertEqual(config["NAME"], "cafe_prod")
+        self.assertEqual(config["OPTIONS"]["pool"]["max_size"], 10)
+        self.assertIs(
+            config["OPTIONS"]["pool"]["check"],
+            pool_module.ConnectionPool.check_connection,
+        )
+        self.assertNotIn("CONN_MAX_AGE", config)
+
+    def test_postgres_profile_without_pool_keeps_connections(self) -> None:
+        """Проверяет постоянные соединения с проверкой, если пул выключен."""
+        config = database_from_env(
+            {"DATABASE_PROFILE": "postgres", "POSTGRES_POOL": "false"}, Path()
+        )
+
+        self.assertNotIn("pool", config["OPTIONS"])
+        self.assertEqual(config["CONN_MAX_AGE"], 60)
+        self.assertTrue(config["CONN_HEALTH_CHECKS"])
+
+    def test_unknown_profile(self) -> None:
+        """Проверяет, что неизвестный профиль — ошибка конфигурации."""
+        with self.assertRaises(ImproperlyConfigured):
+            database_from_env({"DATABASE_PROFILE": "mysql"}, Path())
+
+    def test_replicas_follow_primary_profile(self) -> None:
+        """Проверяет настройки реплик SQLite и PostgreSQL из DATABASE_REPLICAS."""
+        primary = database_from_env({}, Path("/srv"))
+        replicas = replicas_from_env(
+            {"DATABASE_REPLICAS": "/srv/r1.sqlite3, /srv/r2.sqlite3"}, primary
+        )
+
+        self.assertEqual(list(replicas), ["replica1", "replica2"])
+        self.assertEqual(replicas["replica2"]["NAME"], "/srv/r2.sqlite3")
+        self.assertEqual(replicas["replica1"]["OPTIONS"], primary["OPTIONS"])
+        self.assertEqual(replicas["replica1"]["TEST"], {"MIRROR": "default"})
+
+        primary = database_from_env(
+            {"DATABASE_PROFILE": "postgres", "POSTGRES_POOL": "false"}, Path()
+        )
+        replica = replicas_from_env({"DATABASE_REPLICAS": "db-ro:6432"}, primary)
+        self.assertEqual(replica["replica1"]["HOST"], "db-ro")
+        self.assertEqual(replica["replica1"]["PORT"], "6432")
+        self.assertEqual(replica["replica1"]["NAME"], primary["NAME"])
+        self.assertEqual(replicas_from_env({}, primary), {})
+
+
+@override_settings(DATABASE_REPLICAS=["replica"])
+class ReplicaRoutingTest(TestCase):
+    """
+    Тесты маршрутизации чтений на реплику.
+
+    Реплика — отдельная база SQLite в памяти, которая намеренно не получает
+    данных основной базы: по содержимому ответа видно, откуда шло чтение.
+    """
+
+    databases = "__all__"
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        # Алиас реплики добавляется до создания тестовых баз класса; пока
+        # DATABASE_REPLICAS ещё не подменён, схема на неё мигрирует.
+        connections.settings["replica"] = connections.configure_settings(
+            {
+                "default": connections.settings["default"],
+                "replica": {"ENGINE": "django.db.backends.sqlite3"},
+            }
+        )["replica"]
+        cls.replica_name = connections["replica"].creation.create_test_db(
+            verbosity=0, serialize=False
+        )
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        super().tearDownClass()
+        connections["replica"].creation.destroy_test_db(
+            cls.replica_name, verbosity=0
+        )
+        del connections.settings["replica"]
+        del connections["replica"]
+
+    def setUp(self) -> None:
+        self.table = Table.objects.create(number=1)
+        self.product = Product.objects.create(name="Чай", price=100)
+        self.order = Order.objects.create(table_number=self.table)
+
+    def test_reads_go_to_replica(self) -> None:
+        """Проверяет, что чтения без недавней записи идут на реплику."""
+        Table.objects.using("replica").create(number=7)
+
+        detail = self.client.get(reverse("orders:order_detail", args=[self.order.pk]))
+        board = self.client.get(reverse("table-board"))
+
+        self.assertEqual(detail.status_code, 404)
+        # Доска зала кэшируется, поэтому при промахе читается основная база.
+        self.assertEqual([row["number"] for row in board.json()], [1])
+        self.assertNotIn(settings.REPLICA_PIN_COOKIE, detail.cookies)
+
+    def test_reads_stay_on_primary_after_own_write(self) -> None:
+        """Проверяет, что после записи клиент читает из основной базы."""
+        response = self.client.post(
+            reverse("order-list"),
+            {"table_number": self.table.pk, "items": [{"product": self.product.pk}]},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 201)
+        cookie = response.cookies[settings.REPLICA_PIN_COOKIE]
+        self.assertEqual(cookie["max-age"], settings.REPLICA_PIN_SECONDS)
+
+        created = response.json()["id"]
+        response = self.client.get(reverse("orders:order_detail", args=[created]))
+        self.assertEqual(response.status_code, 200)
+
+        self.client.cookies.clear()
+        response = self.client.get(reverse("orders:order_detail", args=[created]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_router_keeps_writes_and_transactions_on_primary(self) -> None:
+        """Проверяет запись, чтение в транзакции, вне запроса и миграции."""
+        router = PrimaryReplicaRouter()
+        self.assertEqual(router.db_for_read(Order), "default")
+
+        state, token = start_request(pinned=False)
+        try:
+            self.assertEqual(router.db_for_read(Order), "replica")
+            with transaction.atomic():
+                self.assertEqual(router.db_for_read(Order), "default")
+            self.assertEqual(router.db_for_write(Order), "default")
+            self.assertTrue(state.wrote)
+            self.assertEqual(router.db_for_read(Order), "default")
+        finally:
+            finish_request(token)
+
+        self.assertFalse(router.allow_migrate("replica", "orders"))
+        self.assertIsNone(router.allow_migrate("default", "orders"))
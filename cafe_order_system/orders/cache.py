@@ -0,0 +1,238 @@
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import prefetch_related_objects
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from cafe_order_system.routers import use_primary
+
+from .models import Product, items_prefetch
+
+VERSION_KEY = "products:version"
+TABLES_VERSION_KEY = "tables:version"
+
+
+def get_cache():
+    """Возвращает кэш, выбранный настройкой `PRODUCT_CACHE_ALIAS`."""
+    return caches[getattr(settings, "PRODUCT_CACHE_ALIAS", "default")]
+
+
+def get_products_version():
+    """
+    Возвращает текущую версию меню.
+
+    Версия входит во все ключи кэша продуктов и в ETag ответов API,
+    поэтому её смена разом делает неактуальными все закэшированные данные.
+    """
+    return _get_version(VERSION_KEY)
+
+
+def invalidate_products():
+    """Сменяет версию меню после изменения или удаления продуктов."""
+    _bump_version(VERSION_KEY)
+
+
+def invalidate_products_on_commit():
+    """
+    Сбрасывает кэш меню сейчас и ещё раз после фиксации транзакции:
+    иначе параллельный запрос мог бы закэшировать старые данные под новой
+    версией. После фиксации заранее собирается снимок меню.
+
+    Изменение многих блюд в одной транзакции (импорт, удаление пачкой)
+    после фиксации сбрасывает кэш и собирает снимок один раз.
+    """
+    from .snapshots import build_menu_snapshot
+
+    invalidate_products()
+    if not _pending_on_commit(invalidate_products):
+        transaction.on_commit(invalidate_products)
+        transaction.on_commit(build_menu_snapshot)
+
+
+def _pending_on_commit(func):
+    """
+    Проверяет, ждёт ли `func` фиксации текущей транзакции.
+
+    Обработчики из отменённых точек сохранения Django убирает из очереди,
+    поэтому обработчик, записанный раньше в той же транзакции, выполнится.
+    """
+    connection = transaction.get_connection()
+    return connection.in_atomic_block and any(
+        callback is func for _, callback, _ in connection.run_on_commit
+    )
+
+
+def _get_version(key):
+    cache = get_cache()
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+
+async def _aget_version(key):
+    cache = get_cache()
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, uuid4().hex, None)
+        version = await cache.aget(key)
+    return version
+
+
+def _bump_version(key):
+    get_cache().set(key, uuid4().hex, None)
+
+
+def _from_primary(compute):
+    # Версия сменяется сразу после записи, а реплика может отставать:
+    # данные для новой версии читаются из основной базы, иначе в кэш
+    # надолго попало бы устаревшее состояние.
+    with use_primary():
+        return compute()
+
+
+def get_cached_products(suffix, compute, version=None):
+    """
+    Возвращает данные о продуктах из кэша текущей версии меню.
+
+    Аргументы:
+        suffix: Часть ключа, различающая кэшируемые данные (например, путь запроса).
+        compute: Функция без аргументов, вычисляющая данные при промахе.
+        version: Версия меню, если она уже получена вызывающим кодом.
+    """
+    if version is None:
+        version = get_products_version()
+    key = f"products:{version}:{suffix}"
+    return get_cache().get_or_set(
+        key,
+        lambda: _from_primary(compute),
+        getattr(settings, "PRODUCT_CACHE_TIMEOUT", 60 * 60),
+    )
+
+
+async def aget_products_version():
+    """Асинхронный вариант `get_products_version`."""
+    return await _aget_version(VERSION_KEY)
+
+
+async def aget_cached_products(suffix, compute, version=None):
+    """
+    Асинхронный вариант `get_cached_products`.
+
+    Аргументы:
+        suffix: Часть ключа, различающая кэшируемые данные.
+        compute: Корутинная функция без аргументов, вычисляющая данные при промахе.
+        version: Версия меню, если она уже получена вызывающим кодом.
+    """
+    if version is None:
+        version = await aget_products_version()
+    key = f"products:{version}:{suffix}"
+    cache = get_cache()
+    data = await cache.aget(key)
+    if data is None:
+        with use_primary():
+            data = await compute()
+        await cache.aset(
+            key, data, getattr(settings, "PRODUCT_CACHE_TIMEOUT", 60 * 60)
+        )
+    return data
+
+
+def get_product_choices():
+    """Возвращает варианты выбора блюд для форм заказа."""
+    return get_cached_products(
+        "choices",
+        lambda: [(product.pk, str(product)) for product in Product.objects.all()],
+    )
+
+
+def invalidate_tables():
+    """Сменяет версию состояния зала после изменения столов или заказов."""
+    _bump_version(TABLES_VERSION_KEY)
+
+
+def invalidate_tables_on_commit():
+    """
+    Сбрасывает кэш зала сейчас и ещё раз после фиксации транзакции,
+    чтобы параллельный запрос не закэшировал незафиксированное состояние.
+    """
+    invalidate_tables()
+    if not _pending_on_commit(invalidate_tables):
+        transaction.on_commit(invalidate_tables)
+
+
+def get_cached_tables(suffix, compute):
+    """
+    Возвращает данные о зале из кэша текущей версии столов.
+
+    Аргументы:
+        suffix: Часть ключа, различающая кэшируемые данные.
+        compute: Функция без аргументов, вычисляющая данные при промахе.
+    """
+    key = f"tables:{_get_version(TABLES_VERSION_KEY)}:{suffix}"
+    return get_cache().get_or_set(
+        key,
+        lambda: _from_primary(compute),
+        getattr(settings, "PRODUCT_CACHE_TIMEOUT", 60 * 60),
+    )
+
+
+def order_fragment_key(name, order, products_version):
+    """
+    Ключ отрисованного блока заказа.
+
+    Содержимое блока зависит от полей заказа (версия растёт при каждом
+    сохранении, в том числе вместе с изменением позиций), номера стола
+    и названий блюд (версия меню). Время создания отличает заказ от нового
+    заказа, получившего тот же id после удаления; у старых заказов его нет.
+    """
+    created = order.created_at.timestamp() if order.created_at else ""
+    return (
+        f"orders:fragment:{name}:{order.pk}:{created}:"
+        f"{order.version}:{order.table_number.number}:{products_version}"
+    )
+
+
+def render_order_fragments(orders, name):
+    """
+    Возвращает HTML блоков заказов, по возможности из кэша.
+
+    Изменение заказа, его блюд или стола меняет ключ блока, поэтому
+    устаревшие блоки не читаются и вытесняются по времени жизни. Позиции
+    подгружаются одним запросом и только для заказов, которых нет в кэше.
+
+    Аргументы:
+        orders: Заказы с подгруженными столами (`select_related`).
+        name: Имя шаблона блока `orders/fragments/<name>.html`.
+
+    Возвращает:
+        list: Безопасные строки HTML в порядке `orders`.
+    """
+    cache = get_cache()
+    products_version = get_products_version()
+    keys = [order_fragment_key(name, order, products_version) for order in orders]
+    fragments = cache.get_many(keys)
+    missing = [
+        (key, order) for key, order in zip(keys, orders) if key not in fragments
+    ]
+    if missing:
+        rendered = _from_primary(lambda: _render_orders(missing, name))
+        cache.set_many(
+            rendered, getattr(settings, "ORDER_FRAGMENT_TIMEOUT", 60 * 60)
+        )
+        fragments.update(rendered)
+    return [mark_safe(fragments[key]) for key in keys]
+
+
+def _render_orders(missing, name):
+    orders = [order for key, order in missing]
+    prefetch_related_objects(orders, items_prefetch())
+    template_name = f"orders/fragments/{name}.html"
+    return {
+        key: render_to_string(template_name, {"order": order})
+        for key, order in missing
+    }
@@ -0,0 +1,179 @@
+import asyncio
+import json
+import threading
+from contextlib import asynccontextmanager
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+CHANNEL = "orders:events"
+
+
+class LocalBroadcast:
+    """
+    Рассылка событий внутри одного процесса.
+
+    Каждый подписчик получает собственную очередь в своём цикле событий.
+    Публиковать можно из любого потока: сообщение передаётся в цикл
+    подписчика через `call_soon_threadsafe`. Если подписчик не успевает
+    читать и его очередь заполнена, лишние сообщения отбрасываются.
+    """
+
+    def __init__(self, max_queue_size=1000):
+        self.max_queue_size = max_queue_size
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def publish(self, message):
+        """Отправляет сообщение всем текущим подписчикам."""
+        self.publish_many([message])
+
+    def publish_many(self, messages):
+        """Отправляет сообщения по порядку всем текущим подписчикам."""
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for loop, queue in subscribers:
+            for message in messages:
+                loop.call_soon_threadsafe(self._put, queue, message)
+
+    @staticmethod
+    def _put(queue, message):
+        try:
+            queue.put_nowait(message)
+        except asyncio.QueueFull:
+            pass
+
+    @asynccontextmanager
+    async def subscribe(self):
+        """Подписывает вызывающий код на события; возвращает очередь сообщений."""
+        subscriber = (
+            asyncio.get_running_loop(),
+            asyncio.Queue(maxsize=self.max_queue_size),
+        )
+        with self._lock:
+            self._subscribers.add(subscriber)
+        try:
+            yield subscriber[1]
+        finally:
+            with self._lock:
+                self._subscribers.discard(subscriber)
+
+
+class SubscriptionQueue(asyncio.Queue):
+    """
+    Очередь сообщений подписки, которую может оборвать её источник.
+
+    Если в очередь положено исключение, `get` выбрасывает его: так читающий
+    код узнаёт, что сообщений больше не будет, и закрывает поток.
+    """
+
+    async def get(self):
+        item = await super().get()
+        if isinstance(item, BaseException):
+            raise item
+        return item
+
+
+class RedisBroadcast:
+    """
+    Рассылка событий через Redis Pub/Sub.
+
+    Нужна, когда приложение работает в нескольких процессах или на нескольких
+    серверах: события из любого процесса доходят до всех подписчиков.
+    Публикация идёт через один клиент на процесс с пулом соединений.
+    """
+
+    def __init__(self, url=None, channel=CHANNEL):
+        self.url = url or settings.REDIS_URL
+        self.channel = channel
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        """Синхронный клиент Redis, создаётся при первой публикации."""
+        if self._client is None:
+            import redis
+
+            with self._lock:
+                if self._client is None:
+                    self._client = redis.Redis.from_url(self.url)
+        return self._client
+
+    def publish(self, message):
+        """Публикует сообщение в канал Redis."""
+        self.publish_many([message])
+
+    def publish_many(self, messages):
+        """Публикует сообщения в канал Redis одним конвейером."""
+        pipeline = self.client.pipeline(transaction=False)
+        for message in messages:
+            pipeline.publish(self.channel, json.dumps(message))
+        pipeline.execute()
+
+    @asynccontextmanager
+    async def subscribe(self):
+        """
+        Подписывается на канал Redis; возвращает очередь сообщений.
+
+        Если чтение канала прекратилось (например, оборвалось соединение),
+        очередь выбрасывает его ошибку, как только сообщения в ней закончатся.
+        """
+        import redis.asyncio
+
+        client = redis.asyncio.Redis.from_url(self.url)
+        pubsub = client.pubsub()
+        await pubsub.subscribe(self.channel)
+        queue = SubscriptionQueue()
+
+        async def reader():
+            try:
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        await queue.put(json.loads(message["data"]))
+                raise ConnectionError("Redis subscription closed")
+            except Exception as exc:
+                queue.put_nowait(exc)
+
+        task = asyncio.create_task(reader())
+        try:
+            yield queue
+        finally:
+            task.cancel()
+            await pubsub.unsubscribe(self.channel)
+            await pubsub.aclose()
+            await client.aclose()
+
+
+@lru_cache(maxsize=None)
+def get_broadcast():
+    """Возвращает рассылку, заданную настройкой `ORDER_EVENTS_BACKEND`."""
+    backend = getattr(settings, "ORDER_EVENTS_BACKEND", "orders.events.LocalBroadcast")
+    return import_string(backend)()
+
+
+def order_event(event, order):
+    """Формирует сообщение о событии заказа."""
+    return {
+        "event": event,
+        "order": order.pk,
+        "table": order.table_number_id,
+        "status": order.status,
+        "archived": order.archived,
+    }
+
+
+def publish_order_events(messages):
+    """
+    Публикует сообщения после фиксации текущей транзакции.
+
+    Ошибка рассылки (например, недоступен Redis) только записывается
+    в журнал: изменения заказов к этому моменту уже зафиксированы.
+    """
+    messages = list(messages)
+    if messages:
+        transaction.on_commit(
+            lambda: get_broadcast().publish_many(messages), robust=True
+        )
@@ -1,21 +1,236 @@
 from django import forms
-from .models import Order, Product
+from .cache import get_product_choices
+from .models import Order, OrderItem, Product
 
 
 class OrderForm(forms.ModelForm):
     """
     Форма для создания и редактирования заказов.
 
-    Позволяет выбрать номер стола, блюда (множество продуктов) и статус заказа.
-    Поле `products` переопределено для отображения в виде флажков (checkbox).
+    Позволяет выбрать номер стола и статус заказа.
+    Блюда и их количество задаются набором форм `OrderItemFormSet`.
+    Скрытое поле `version` хранит версию заказа, показанную пользователю:
+    если заказ успели изменить, сохранение завершится `OrderConflictError`.
     """
 
-    products = forms.ModelMultipleChoiceField(
-        queryset=Product.objects.all(),
-        widget=forms.CheckboxSelectMultiple,
-        label="Выберите блюда",
-    )
+    version = forms.IntegerField(required=False, min_value=1, widget=forms.HiddenInput)
 
     class Meta:
         model = Order
-        fields = ["table_number", "products", "status"]
+        fields = ["table_number", "status"]
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields["version"].initial = self.instance.version
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if cleaned_data.get("version"):
+            self.instance.version = cleaned_data["version"]
+        return cleaned_data
+
+
+class OrderDeleteForm(forms.Form):
+    """Подтверждение архивации заказа с версией, показанной пользователю."""
+
+    version = forms.IntegerField(required=False, min_value=1, widget=forms.HiddenInput)
+
+
+class OrderFilterForm(forms.Form):
+    """
+    Форма фильтрации списка заказов.
+
+    Поля `status` и `table` сужают выборку, `after` — курсор страницы:
+    идентификатор последнего заказа на предыдущей странице.
+    """
+
+    status = forms.ChoiceField(
+        choices=[("", "Все")] + Order.STATUS_CHOICES, required=False, label="Статус"
+    )
+    table = forms.IntegerField(required=False, min_value=1, label="Номер стола")
+    after = forms.IntegerField(
+        required=False, min_value=1, widget=forms.HiddenInput
+    )
+
+
+class OrderExportForm(forms.Form):
+    """
+    Параметры выгрузки заказов: период создания (обе даты включительно),
+    статус, номер стола и формат файла.
+    """
+
+    date_from = forms.DateField(required=False)
+    date_to = forms.DateField(required=False)
+    status = forms.ChoiceField(
+        choices=[("", "Все")] + Order.STATUS_CHOICES, required=False
+    )
+    table = forms.IntegerField(required=False, min_value=1)
+    format = forms.ChoiceField(
+        choices=[("csv", "CSV"), ("jsonl", "JSONL")], required=False
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        date_from, date_to = cleaned_data.get("date_from"), cleaned_data.get("date_to")
+        if date_from and date_to and date_from > date_to:
+            raise forms.ValidationError("date_from не может быть позже date_to.")
+        cleaned_data["format"] = cleaned_data.get("format") or "csv"
+        return cleaned_data
+
+
+class BulkModelChoiceField(forms.ModelChoiceField):
+    """
+    Поле выбора объекта для пакетной проверки набора форм.
+
+    Если задан `objects` — функция, возвращающая словарь {pk: объект},
+    загруженный набором форм одним запросом на все формы, объект берётся
+    оттуда, а не запрашивается отдельно для каждой формы.
+    """
+
+    objects = None
+
+    def to_python(self, value):
+        if self.objects is None or value in self.empty_values:
+            return super().to_python(value)
+        if isinstance(value, self.queryset.model):
+            value = value.pk
+        try:
+            obj = self.objects().get(int(value))
+        except (TypeError, ValueError):
+            obj = None
+        if obj is None:
+            raise forms.ValidationError(
+                self.error_messages["invalid_choice"],
+                code="invalid_choice",
+                params={"value": value},
+            )
+        return obj
+
+
+class OrderItemForm(forms.ModelForm):
+    """
+    Форма одной позиции заказа: блюдо и количество.
+
+    Если блюдо загружено набором форм, существование внешнего ключа
+    при проверке модели отдельным запросом не перепроверяется.
+    Уникальность блюда в заказе набор форм по-прежнему проверяет.
+    """
+
+    _product_loaded = False
+
+    class Meta:
+        model = OrderItem
+        fields = ["product", "quantity"]
+        labels = {"product": "Блюдо", "quantity": "Количество"}
+        field_classes = {"product": BulkModelChoiceField}
+
+    def _post_clean(self):
+        self._product_loaded = self.fields["product"].objects is not None
+        try:
+            super()._post_clean()
+        finally:
+            self._product_loaded = False
+
+    def _get_validation_exclusions(self):
+        exclude = super()._get_validation_exclusions()
+        # Исключение действует только на проверку полей модели: набор форм
+        # строит по этому же списку проверку уникальности блюда в заказе.
+        if self._product_loaded:
+            exclude.add("product")
+        return exclude
+
+
+class BaseOrderItemFormSet(forms.BaseInlineFormSet):
+    """
+    Набор форм позиций заказа.
+
+    Список блюд берётся из кэша меню один раз на весь набор, а не для каждой формы,
+    и только при отрисовке: для проверки отправленных данных он не нужен.
+    При проверке выбранные блюда загружаются одним `in_bulk` на весь набор,
+    а позиции заказа берутся из уже прочитанного набора.
+    При сохранении цена блюда фиксируется в позиции, новые позиции
+    вставляются одним `bulk_create`, изменённые — одним `bulk_update`.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._product_choices = None
+        self._products = None
+        self._items = None
+
+    def product_choices(self):
+        """Варианты выбора блюда, общие для всех форм набора."""
+        if self._product_choices is None:
+            self._product_choices = [("", "---------")] + get_product_choices()
+        return self._product_choices
+
+    def submitted_products(self):
+        """Блюда, выбранные во всех отправленных формах: {pk: блюдо}."""
+        if self._products is None:
+            ids = set()
+            for index in range(self.total_form_count()):
+                value = self.data.get(f"{self.add_prefix(index)}-product")
+                try:
+                    ids.add(int(value))
+                except (TypeError, ValueError):
+                    pass
+            self._products = Product.objects.in_bulk(ids)
+        return self._products
+
+    def existing_items(self):
+        """Сохранённые позиции заказа из запроса набора форм: {pk: позиция}."""
+        if self._items is None:
+            self._items = {item.pk: item for item in self.get_queryset()}
+        return self._items
+
+    def add_fields(self, form, index):
+        super().add_fields(form, index)
+        # Вызываемый объект оборачивается в ленивый итератор вариантов:
+        # список из тысяч блюд не копируется в каждую форму.
+        form.fields["product"].choices = self.product_choices
+        form.fields["product"].objects = self.submitted_products
+        pk_field = form.fields[self._pk_field.name]
+        form.fields[self._pk_field.name] = BulkModelChoiceField(
+            pk_field.queryset,
+            initial=pk_field.initial,
+            required=pk_field.required,
+            widget=pk_field.widget,
+        )
+        form.fields[self._pk_field.name].objects = self.existing_items
+
+    def save(self, commit=True):
+        """Сохраняет позиции пакетно, фиксируя цену блюда на момент заказа."""
+        items = super().save(commit=False)
+        if not commit:
+            return items
+
+        repriced = {
+            item.pk for item, changed in self.changed_objects if "product" in changed
+        }
+        new_items, changed_items = [], []
+        for item in items:
+            if item.pk is None or item.pk in repriced:
+                item.unit_price = item.product.price
+            (new_items if item.pk is None else changed_items).append(item)
+
+        if self.deleted_objects:
+            OrderItem.objects.filter(
+                pk__in=[item.pk for item in self.deleted_objects]
+            ).delete()
+        if changed_items:
+            OrderItem.objects.bulk_update(
+                changed_items, ["product", "quantity", "unit_price"]
+            )
+        OrderItem.objects.bulk_create(new_items)
+        return items
+
+
+OrderItemFormSet = forms.inlineformset_factory(
+    Order,
+    OrderItem,
+    form=OrderItemForm,
+    formset=BaseOrderItemFormSet,
+    extra=3,
+    min_num=1,
+    validate_min=True,
+)
@@ -0,0 +1,171 @@
+import csv
+import json
+from dataclasses import dataclass
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from typing import Callable
+
+from django.core.exceptions import ValidationError
+from django.core.validators import DecimalValidator
+
+from .cache import invalidate_products_on_commit, invalidate_tables_on_commit
+from .models import Product, Table
+
+
+class ImportRowError(ValueError):
+    """Ошибка разбора строки импортируемого файла."""
+
+    def __init__(self, line_number, message):
+        super().__init__(f"line {line_number}: {message}")
+        self.line_number = line_number
+
+
+def parse_product(row):
+    """Преобразует строку файла меню в поля продукта."""
+    name = (row.get("name") or "").strip()
+    if not name:
+        raise ValueError("name is required")
+    try:
+        price = Decimal(str(row["price"]))
+    except (KeyError, InvalidOperation):
+        raise ValueError("price must be a decimal number")
+    if not price.is_finite():
+        raise ValueError("price must be a decimal number")
+    field = Product._meta.get_field("price")
+    try:
+        DecimalValidator(field.max_digits, field.decimal_places)(price)
+    except ValidationError:
+        raise ValueError(
+            f"price must have at most {field.max_digits} digits, "
+            f"{field.decimal_places} of them after the point"
+        )
+    return {"name": name, "price": price}
+
+
+def parse_table(row):
+    """Преобразует строку файла рассадки в поля стола."""
+    try:
+        number = int(row["number"])
+    except (KeyError, TypeError, ValueError):
+        raise ValueError("number must be an integer")
+    return {"number": number}
+
+
+@dataclass(frozen=True)
+class ImportSpec:
+    """
+    Описание импортируемой сущности.
+
+    Атрибуты:
+        model: Модель, в которую загружаются строки.
+        parse: Функция, превращающая строку файла в поля модели.
+        unique_fields: Естественный ключ, по которому строки сопоставляются.
+        update_fields: Поля, обновляемые у уже существующих записей.
+        invalidate: Сброс кэша после загрузки: `bulk_create` не шлёт сигналы.
+    """
+
+    model: type
+    parse: Callable
+    unique_fields: tuple
+    update_fields: tuple = ()
+    invalidate: Callable = None
+
+    def key(self, values):
+        """Возвращает значение естественного ключа для полей записи."""
+        return tuple(values[field] for field in self.unique_fields)
+
+
+IMPORT_SPECS = {
+    "products": ImportSpec(
+        model=Product,
+        parse=parse_product,
+        unique_fields=("name",),
+        update_fields=("price",),
+        invalidate=invalidate_products_on_commit,
+    ),
+    "tables": ImportSpec(
+        model=Table,
+        parse=parse_table,
+        unique_fields=("number",),
+        invalidate=invalidate_tables_on_commit,
+    ),
+}
+
+
+def read_rows(stream, fmt):
+    """
+    Потоково читает строки CSV (с заголовком) или JSONL.
+
+    Возвращает итератор пар (номер строки, словарь), не загружая файл целиком.
+    """
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+    elif fmt == "jsonl":
+        for line_number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as exc:
+                raise ImportRowError(line_number, f"invalid JSON: {exc.msg}")
+            if not isinstance(row, dict):
+                raise ImportRowError(line_number, "expected a JSON object")
+            yield line_number, row
+    else:
+        raise ValueError(f"Unsupported format: {fmt}")
+
+
+def import_rows(kind, rows, batch_size=1000, progress=None):
+    """
+    Загружает строки пачками через `bulk_create` с обновлением при конфликте.
+
+    Каждая пачка — один INSERT ... ON CONFLICT. Повторы ключа внутри пачки
+    схлопываются (побеждает последняя строка), так как PostgreSQL не позволяет
+    обновить одну запись дважды в одном запросе.
+
+    Аргументы:
+        kind: Ключ из `IMPORT_SPECS` ("products" или "tables").
+        rows: Итератор пар (номер строки, словарь), как у `read_rows`.
+        batch_size: Размер пачки.
+        progress: Необязательная функция, вызываемая с числом загруженных строк
+                  после каждой пачки.
+
+    Возвращает:
+        int: Количество прочитанных строк.
+    """
+    spec = IMPORT_SPECS[kind]
+    rows = iter(rows)
+    total = 0
+    try:
+        while True:
+            batch = {}
+            read = 0
+            for line_number, row in islice(rows, batch_size):
+                read += 1
+                try:
+                    values = spec.parse(row)
+                except ValueError as exc:
+                    raise ImportRowError(line_number, str(exc))
+                batch[spec.key(values)] = spec.model(**values)
+            if not read:
+                return total
+
+            if spec.update_fields:
+                spec.model.objects.bulk_create(
+                    batch.values(),
+                    update_conflicts=True,
+                    unique_fields=spec.unique_fields,
+                    update_fields=spec.update_fields,
+                )
+            else:
+                spec.model.objects.bulk_create(batch.values(), ignore_conflicts=True)
+
+            total += read
+            if progress is not None:
+                progress(total)
+    finally:
+        # Пачки, записанные до ошибки, уже в базе: кэш сбрасывается и тогда.
+        if spec.invalidate is not None and total:
+            spec.invalidate()
@@ -0,0 +1,261 @@
+"""
+Очередь фоновых задач на базе данных, без внешнего брокера.
+
+Функция-задача регистрируется декоратором `task` и ставится в очередь
+`enqueue` — обычной вставкой строки `Job` в текущей транзакции: задача
+появляется, только если транзакция зафиксирована. Воркер (команда
+`run_jobs`) забирает готовые задачи условным UPDATE, поэтому одну задачу
+не выполнят два воркера, и выполняет их в пуле потоков. Результат задачи
+и отметка о выполнении фиксируются одной транзакцией: изменения в базе,
+сделанные задачей, не применяются дважды.
+"""
+
+import os
+import socket
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+TASKS = {}
+
+# Как часто воркер ищет зависшие задачи, секунд.
+REQUEUE_INTERVAL = 60
+
+
+class JobLost(Exception):
+    """Задачу, пока она выполнялась, вернули в очередь другому воркеру."""
+
+
+def task(name=None, max_attempts=3):
+    """
+    Регистрирует функцию как фоновую задачу.
+
+    Аргументы функции передаются именованными и должны сериализоваться
+    в JSON.
+
+    Аргументы:
+        name: Имя задачи в очереди; по умолчанию `модуль.функция`.
+        max_attempts: Сколько раз выполнять задачу, пока она падает.
+    """
+
+    def register(func):
+        func.task_name = name or f"{func.__module__}.{func.__name__}"
+        func.max_attempts = max_attempts
+        TASKS[func.task_name] = func
+        return func
+
+    return register
+
+
+def enqueue(func, delay=None, **kwargs):
+    """
+    Ставит задачу в очередь.
+
+    Вызывается внутри транзакции, изменившей данные: воркер увидит задачу
+    после фиксации, а при откате задача исчезнет вместе с изменениями.
+    С настройкой `JOBS_EAGER` задача выполняется сразу после фиксации
+    в текущем процессе, без очереди; её ошибка только записывается в журнал,
+    как и у воркера, и не влияет на уже зафиксированный запрос.
+
+    Аргументы:
+        func: Функция, зарегистрированная `task`.
+        delay: Отложить запуск на `timedelta`.
+
+    Возвращает:
+        Job: Созданная задача (None в режиме `JOBS_EAGER`).
+    """
+    if TASKS.get(getattr(func, "task_name", None)) is not func:
+        raise ValueError(f"{func!r} is not registered as a task")
+    if getattr(settings, "JOBS_EAGER", False):
+        transaction.on_commit(lambda: func(**kwargs), robust=True)
+        return None
+    run_at = timezone.now() + (delay or timedelta())
+    return Job.objects.create(
+        name=func.task_name,
+        kwargs=kwargs,
+        max_attempts=func.max_attempts,
+        run_at=run_at,
+    )
+
+
+def worker_name():
+    """Уникальное имя воркера: хост, процесс и случайный суффикс."""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def claim_jobs(worker, limit):
+    """
+    Забирает до `limit` готовых задач для воркера `worker`.
+
+    Кандидаты выбираются с SKIP LOCKED там, где он поддерживается, а захват
+    — условным UPDATE `status = 'queued'`: задачу, которую успел забрать
+    другой воркер, UPDATE пропустит.
+
+    Возвращает:
+        list: Захваченные задачи.
+    """
+    with transaction.atomic():
+        due = Job.objects.due().order_by("run_at", "pk")
+        if connection.features.has_select_for_update_skip_locked:
+            due = due.select_for_update(skip_locked=True)
+        pks = list(due.values_list("pk", flat=True)[:limit])
+        if not pks:
+            return []
+        Job.objects.filter(pk__in=pks, status="queued").update(
+            status="running",
+            worker=worker,
+            started_at=timezone.now(),
+            attempts=F("attempts") + 1,
+        )
+    return list(Job.objects.filter(pk__in=pks, status="running", worker=worker))
+
+
+def run_job(job):
+    """
+    Выполняет захваченную задачу.
+
+    Задача и отметка о выполнении фиксируются вместе: если задачу тем
+    временем вернули в очередь как зависшую и её забрал другой воркер,
+    отметка не ставится и изменения задачи откатываются. При ошибке задача
+    возвращается в очередь с паузой `JOBS_RETRY_DELAY * 2 ** (попытка - 1)`
+    секунд, а после последней попытки помечается `failed`.
+
+    Возвращает:
+        bool: Выполнена ли задача успешно.
+    """
+    func = TASKS.get(job.name)
+    try:
+        if func is None:
+            raise LookupError(f"Unknown task: {job.name}")
+        with transaction.atomic():
+            func(**job.kwargs)
+            if not _finish(job, status="done", last_error=""):
+                raise JobLost(job.pk)
+        return True
+    except JobLost:
+        return False
+    except Exception:
+        error = traceback.format_exc()
+    if job.attempts >= job.max_attempts:
+        _finish(job, status="failed", last_error=error)
+    else:
+        delay = getattr(settings, "JOBS_RETRY_DELAY", 5) * 2 ** (job.attempts - 1)
+        _claimed(job).update(
+            status="queued",
+            run_at=timezone.now() + timedelta(seconds=delay),
+            last_error=error,
+        )
+    return False
+
+
+def _claimed(job):
+    """Задача, пока она числится за воркером, который её выполняет."""
+    return Job.objects.filter(pk=job.pk, status="running", worker=job.worker)
+
+
+def _finish(job, **fields):
+    """Завершает задачу; возвращает 0, если её уже забрал другой воркер."""
+    return _claimed(job).update(finished_at=timezone.now(), **fields)
+
+
+def requeue_stale(timeout=None):
+    """
+    Возвращает в очередь задачи, которые выполняются дольше `timeout`
+    секунд (`JOBS_TIMEOUT`): их воркер, вероятно, остановился. Задачи,
+    исчерпавшие попытки, — например, каждый раз роняющие воркер, —
+    помечаются `failed`.
+
+    Возвращает:
+        int: Количество возвращённых задач.
+    """
+    if timeout is None:
+        timeout = getattr(settings, "JOBS_TIMEOUT", 10 * 60)
+    now = timezone.now()
+    stale = Job.objects.filter(
+        status="running", started_at__lt=now - timedelta(seconds=timeout)
+    )
+    stale.filter(attempts__gte=F("max_attempts")).update(
+        status="failed",
+        finished_at=now,
+        worker="",
+        last_error=f"Worker stopped responding after {timeout} seconds",
+    )
+    return stale.update(status="queued", run_at=now, worker="")
+
+
+def run_pending(worker=None, limit=100, pool=None):
+    """
+    Забирает и выполняет одну пачку готовых задач.
+
+    Аргументы:
+        worker: Имя воркера; по умолчанию — новое уникальное.
+        limit: Размер пачки.
+        pool: Пул потоков; без него задачи выполняются в текущем потоке.
+
+    Возвращает:
+        tuple: Количество успешных и неудачных задач.
+    """
+    jobs = claim_jobs(worker or worker_name(), limit)
+    if pool is None:
+        results = [run_job(job) for job in jobs]
+    else:
+        results = list(pool.map(_run_in_thread, jobs))
+    return results.count(True), results.count(False)
+
+
+def _run_in_thread(job):
+    """Выполняет задачу в потоке пула, закрывая устаревшие соединения потока."""
+    close_old_connections()
+    try:
+        return run_job(job)
+    finally:
+        close_old_connections()
+
+
+def work(workers=4, poll_interval=1.0, once=False, stop=None, progress=None):
+    """
+    Цикл воркера: забирает пачки задач и выполняет их в пуле потоков.
+    Раз в `REQUEUE_INTERVAL` секунд возвращает в очередь зависшие задачи.
+
+    Аргументы:
+        workers: Число потоков; пачка задач равна числу потоков.
+        poll_interval: Пауза в секундах, когда готовых задач нет.
+        once: Выйти, когда готовые задачи закончатся.
+        stop: `threading.Event`, по которому цикл завершается.
+        progress: Функция, вызываемая с числами успешных и неудачных задач
+                  после каждой пачки.
+
+    Возвращает:
+        tuple: Всего успешных и неудачных задач.
+    """
+    name = worker_name()
+    succeeded = failed = 0
+    next_requeue = time.monotonic()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while stop is None or not stop.is_set():
+            if time.monotonic() >= next_requeue:
+                requeue_stale()
+                next_requeue = time.monotonic() + REQUEUE_INTERVAL
+            done, errors = run_pending(name, limit=workers, pool=pool)
+            succeeded += done
+            failed += errors
+            if done or errors:
+                if progress is not None:
+                    progress(done, errors)
+                continue
+            if once:
+                break
+            if stop is not None:
+                stop.wait(poll_interval)
+            else:
+                time.sleep(poll_interval)
+    return succeeded, failed
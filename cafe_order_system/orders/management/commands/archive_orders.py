@@ -0,0 +1,80 @@
+from argparse import ArgumentTypeError
+from datetime import date, datetime, time, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from orders.retention import archive_orders
+
+
+class Command(BaseCommand):
+    help = (
+        "Exports archived orders older than the retention period to a gzipped "
+        "JSONL file and deletes them in small transactions"
+    )
+
+    def add_arguments(self, parser):
+        cutoff = parser.add_mutually_exclusive_group()
+        cutoff.add_argument(
+            "--before", type=self.parse_date, help="YYYY-MM-DD, orders created before"
+        )
+        cutoff.add_argument(
+            "--days",
+            type=int,
+            help="Orders older than this many days (default: ORDER_RETENTION_DAYS)",
+        )
+        parser.add_argument(
+            "--output-dir", help="Archive directory (default: ORDER_ARCHIVE_DIR)"
+        )
+        parser.add_argument("--chunk-size", type=int, default=500)
+        parser.add_argument(
+            "--keep", action="store_true", help="Export only, do not delete orders"
+        )
+        parser.add_argument(
+            "--include-undated",
+            action="store_true",
+            help="Also archive orders created before creation dates were recorded",
+        )
+
+    @staticmethod
+    def parse_date(value):
+        try:
+            return date.fromisoformat(value)
+        except ValueError:
+            raise ArgumentTypeError(f"Invalid date: {value}")
+
+    def handle(self, *args, **options):
+        chunk_size = options["chunk_size"]
+        if chunk_size < 1:
+            raise CommandError("--chunk-size must be a positive integer")
+
+        if options["before"] is not None:
+            cutoff = timezone.make_aware(datetime.combine(options["before"], time()))
+        else:
+            days = options["days"]
+            if days is None:
+                days = settings.ORDER_RETENTION_DAYS
+            cutoff = timezone.now() - timedelta(days=days)
+        directory = options["output_dir"] or settings.ORDER_ARCHIVE_DIR
+
+        def progress(total):
+            self.stdout.write(f"Exported {total} orders...")
+
+        path, exported, deleted = archive_orders(
+            cutoff,
+            directory,
+            chunk_size=chunk_size,
+            purge=not options["keep"],
+            progress=progress,
+            include_undated=options["include_undated"],
+        )
+
+        if path is None:
+            self.stdout.write(f"No archived orders created before {cutoff:%Y-%m-%d}")
+            return
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Exported {exported} orders to {path}, deleted {deleted}"
+            )
+        )
@@ -0,0 +1,137 @@
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import (
+    override_settings,
+    setup_test_environment,
+    teardown_test_environment,
+)
+
+from benchmarks import concurrency, data, runner
+from benchmarks.scenarios import SCENARIOS
+
+DEFAULT_BASELINE = Path(settings.BASE_DIR) / "benchmarks" / "baseline.json"
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs the performance benchmark suite on a throwaway database filled "
+        "with synthetic data and compares the results with stored baselines"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scale", choices=sorted(data.SCALES), default="small")
+        parser.add_argument("--iterations", type=int, default=30)
+        parser.add_argument(
+            "--scenario",
+            action="append",
+            choices=[scenario.name for scenario in SCENARIOS],
+            help="Run only this scenario (repeatable)",
+        )
+        parser.add_argument("--output", help="Write results as JSON to this file")
+        parser.add_argument("--baseline", default=str(DEFAULT_BASELINE))
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=0.5,
+            help="Allowed relative p95 growth over the baseline (0.5 = +50%%)",
+        )
+        parser.add_argument(
+            "--save-baseline",
+            action="store_true",
+            help="Store the results as the new baseline instead of comparing",
+        )
+        parser.add_argument(
+            "--slow-clients",
+            type=int,
+            default=0,
+            help="Also compare how fast ASGI and WSGI serve this many slow clients",
+        )
+        parser.add_argument(
+            "--client-delay-ms",
+            type=float,
+            default=100,
+            help="Time a slow client spends reading each response chunk",
+        )
+        parser.add_argument(
+            "--wsgi-threads",
+            type=int,
+            default=4,
+            help="Thread pool size of the WSGI worker in the slow-client comparison",
+        )
+
+    def handle(self, *args, **options):
+        scale_name = options["scale"]
+        scenarios = [
+            scenario
+            for scenario in SCENARIOS
+            if not options["scenario"] or scenario.name in options["scenario"]
+        ]
+
+        setup_test_environment(debug=False)
+        old_name = connection.creation.create_test_db(verbosity=0, serialize=False)
+        try:
+            self.stdout.write(f"Generating {scale_name} data set...")
+            data.generate(
+                data.SCALES[scale_name],
+                progress=lambda count: self.stdout.write(f"  {count} orders"),
+            )
+            report = runner.run(
+                scenarios, options["iterations"], progress=self.report_scenario
+            )
+            if options["slow_clients"]:
+                # Запросы, ждущие своей очереди, заведомо медленные: не пишем их в журнал.
+                with override_settings(SLOW_REQUEST_THRESHOLD_MS=None):
+                    report["concurrency"] = concurrency.compare(
+                        options["slow_clients"],
+                        options["client_delay_ms"] / 1000,
+                        options["wsgi_threads"],
+                    )
+                self.report_concurrency(report["concurrency"])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        report["scale"] = scale_name
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as file:
+                json.dump(report, file, indent=2)
+                file.write("\n")
+
+        if options["save_baseline"]:
+            runner.save_baseline(options["baseline"], scale_name, report["results"])
+            self.stdout.write(self.style.SUCCESS("Baseline saved."))
+            return
+
+        baseline = runner.load_baseline(options["baseline"], scale_name)
+        if not baseline:
+            self.stdout.write(
+                self.style.WARNING(f"No baseline for scale '{scale_name}'.")
+            )
+            return
+        baseline = {
+            name: metrics
+            for name, metrics in baseline.items()
+            if name in report["results"]
+        }
+        regressions = runner.compare(report["results"], baseline, options["tolerance"])
+        if regressions:
+            raise CommandError("Performance regressions:\n" + "\n".join(regressions))
+        self.stdout.write(self.style.SUCCESS("No regressions against the baseline."))
+
+    def report_concurrency(self, metrics):
+        self.stdout.write(
+            f"{metrics['clients']} slow clients ({metrics['delay_ms']} ms per chunk): "
+            f"ASGI {metrics['asgi_s']} s ({metrics['asgi_clients_per_s']} clients/s), "
+            f"WSGI with {metrics['wsgi_threads']} threads {metrics['wsgi_s']} s "
+            f"({metrics['wsgi_clients_per_s']} clients/s)"
+        )
+
+    def report_scenario(self, name, metrics):
+        self.stdout.write(
+            f"{name}: {metrics['queries']} queries, "
+            f"p50 {metrics['p50_ms']} ms, p95 {metrics['p95_ms']} ms"
+        )
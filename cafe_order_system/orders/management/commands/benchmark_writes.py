@@ -0,0 +1,62 @@
+import json
+import os
+import tempfile
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from benchmarks import writes
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares concurrent order write throughput across database profiles "
+        "on throwaway databases"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--profile",
+            action="append",
+            choices=sorted(writes.PROFILES),
+            help=(
+                "Profile to measure (repeatable). Defaults to both SQLite profiles, "
+                "plus postgres when DATABASE_PROFILE=postgres"
+            ),
+        )
+        parser.add_argument("--writers", type=int, default=8)
+        parser.add_argument(
+            "--orders", type=int, default=100, help="Orders created by each writer"
+        )
+        parser.add_argument("--output", help="Write results as JSON to this file")
+
+    def handle(self, *args, **options):
+        profiles = options["profile"] or ["sqlite-default", "sqlite-tuned"]
+        if not options["profile"] and os.environ.get("DATABASE_PROFILE") == "postgres":
+            profiles.append("postgres")
+
+        results = {}
+        setup_test_environment(debug=False)
+        try:
+            with tempfile.TemporaryDirectory() as directory:
+                for name in profiles:
+                    config = writes.PROFILES[name](Path(directory))
+                    results[name] = writes.write_throughput(
+                        config, options["writers"], options["orders"]
+                    )
+                    self.report(name, results[name])
+        finally:
+            teardown_test_environment()
+
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as file:
+                json.dump(results, file, indent=2)
+                file.write("\n")
+
+    def report(self, name, metrics):
+        self.stdout.write(
+            f"{name}: {metrics['orders']} orders by {metrics['writers']} writers "
+            f"in {metrics['seconds']} s ({metrics['orders_per_s']} orders/s), "
+            f"{metrics['errors']} lock errors"
+        )
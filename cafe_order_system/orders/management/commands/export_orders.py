@@ -0,0 +1,56 @@
+from argparse import ArgumentTypeError
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from orders.exports import export_lines, filter_orders
+from orders.models import Order
+
+
+class Command(BaseCommand):
+    help = "Streams orders filtered by date, status and table as CSV or JSONL"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "path", nargs="?", default="-", help="Output file, '-' for stdout"
+        )
+        parser.add_argument("--format", choices=["csv", "jsonl"], default="csv")
+        parser.add_argument("--date-from", type=self.parse_date, help="YYYY-MM-DD")
+        parser.add_argument("--date-to", type=self.parse_date, help="YYYY-MM-DD")
+        parser.add_argument(
+            "--status", choices=[value for value, _ in Order.STATUS_CHOICES]
+        )
+        parser.add_argument("--table", type=int, help="Table number")
+        parser.add_argument("--chunk-size", type=int, default=1000)
+
+    @staticmethod
+    def parse_date(value):
+        try:
+            return date.fromisoformat(value)
+        except ValueError:
+            raise ArgumentTypeError(f"Invalid date: {value}")
+
+    def handle(self, *args, **options):
+        chunk_size = options["chunk_size"]
+        if chunk_size < 1:
+            raise CommandError("--chunk-size must be a positive integer")
+
+        orders = filter_orders(
+            date_from=options["date_from"],
+            date_to=options["date_to"],
+            status=options["status"],
+            table=options["table"],
+        )
+        lines = export_lines(orders, options["format"], chunk_size)
+
+        path = options["path"]
+        if path == "-":
+            for line in lines:
+                self.stdout.write(line, ending="")
+            return
+        try:
+            with open(path, "w", newline="", encoding="utf-8") as stream:
+                stream.writelines(lines)
+        except OSError as exc:
+            raise CommandError(f"Cannot write {path}: {exc.strerror}")
+        self.stdout.write(self.style.SUCCESS(f"Orders exported to {path}"))
@@ -0,0 +1,60 @@
+import sys
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from orders.importers import IMPORT_SPECS, ImportRowError, import_rows, read_rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Streams products or tables from a CSV/JSONL file (or stdin) "
+        "and upserts them in batches"
+    )
+    stealth_options = ("stdin",)
+
+    def add_arguments(self, parser):
+        parser.add_argument("kind", choices=sorted(IMPORT_SPECS))
+        parser.add_argument(
+            "path", nargs="?", default="-", help="File to import, '-' for stdin"
+        )
+        parser.add_argument(
+            "--format",
+            choices=["csv", "jsonl"],
+            help="Input format; inferred from the file extension by default",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        kind = options["kind"]
+        path = options["path"]
+        batch_size = options["batch_size"]
+        if batch_size < 1:
+            raise CommandError("--batch-size must be a positive integer")
+
+        fmt = options["format"]
+        if fmt is None:
+            fmt = "jsonl" if Path(path).suffix in (".jsonl", ".ndjson") else "csv"
+
+        def progress(total):
+            self.stdout.write(f"Imported {total} {kind}...")
+
+        if path == "-":
+            stream = options.get("stdin") or sys.stdin
+            total = self._import(kind, stream, fmt, batch_size, progress)
+        else:
+            try:
+                with open(path, newline="", encoding="utf-8") as stream:
+                    total = self._import(kind, stream, fmt, batch_size, progress)
+            except OSError as exc:
+                raise CommandError(f"Cannot read {path}: {exc.strerror}")
+
+        self.stdout.write(self.style.SUCCESS(f"{total} {kind} imported successfully!"))
+
+    def _import(self, kind, stream, fmt, batch_size, progress):
+        try:
+            return import_rows(
+                kind, read_rows(stream, fmt), batch_size=batch_size, progress=progress
+            )
+        except ImportRowError as exc:
+            raise CommandError(str(exc))
@@ -0,0 +1,57 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import F
+from django.utils import timezone
+
+from orders.models import Job
+
+
+class Command(BaseCommand):
+    help = "Shows background job counts and failures; retries or purges jobs"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--failed", action="store_true", help="List failed jobs with errors"
+        )
+        parser.add_argument(
+            "--retry", action="store_true", help="Queue failed jobs again"
+        )
+        parser.add_argument(
+            "--purge-done",
+            type=int,
+            metavar="DAYS",
+            help="Delete jobs finished successfully more than DAYS ago",
+        )
+
+    def handle(self, *args, **options):
+        if options["retry"]:
+            retried = Job.objects.filter(status="failed").update(
+                status="queued",
+                run_at=timezone.now(),
+                max_attempts=F("attempts") + 1,
+                finished_at=None,
+            )
+            self.stdout.write(f"Queued {retried} failed jobs again")
+        if options["purge_done"] is not None:
+            if options["purge_done"] < 0:
+                raise CommandError("--purge-done must not be negative")
+            finished = timezone.now() - timedelta(days=options["purge_done"])
+            deleted, _ = Job.objects.filter(
+                status="done", finished_at__lt=finished
+            ).delete()
+            self.stdout.write(f"Deleted {deleted} finished jobs")
+
+        rows = list(Job.objects.stats())
+        if not rows:
+            self.stdout.write("No jobs")
+        for row in rows:
+            self.stdout.write(f"{row['name']}: {row['status']} {row['count']}")
+
+        if options["failed"]:
+            for job in Job.objects.filter(status="failed").order_by("pk"):
+                error = job.last_error.strip().splitlines()
+                self.stdout.write(
+                    f"#{job.pk} {job.name} {job.kwargs} after {job.attempts} attempts: "
+                    f"{error[-1] if error else ''}"
+                )
@@ -1,5 +1,5 @@
 from django.core.management.base import BaseCommand
-from orders.models import Product
+from orders.importers import import_rows
 
 
 class Command(BaseCommand):
@@ -17,11 +17,6 @@ class Command(BaseCommand):
             {"name": "Кофе", "price": 150.00},
         ]
 
-        for product_data in products_data:
-            product, created = Product.objects.get_or_create(**product_data)
-            if created:
-                self.stdout.write(self.style.SUCCESS(f"Created product: {product.name}"))
-            else:
-                self.stdout.write(self.style.WARNING(f"Product already exists: {product.name}"))
+        import_rows("products", enumerate(products_data, start=1))
 
         self.stdout.write(self.style.SUCCESS("Products loaded successfully!"))
@@ -1,5 +1,5 @@
 from django.core.management.base import BaseCommand
-from orders.models import Table
+from orders.importers import import_rows
 
 
 class Command(BaseCommand):
@@ -8,12 +8,8 @@ class Command(BaseCommand):
     def handle(self, *args, **options):
         self.stdout.write("Creating tables...")
 
-        # Создаем 20 столиков
-        for table_number in range(1, 21):  # Номера столов от 1 до 20
-            table, created = Table.objects.get_or_create(number=table_number)
-            if created:
-                self.stdout.write(self.style.SUCCESS(f"Created table: {table.number}"))
-            else:
-                self.stdout.write(self.style.WARNING(f"Table already exists: {table.number}"))
+        # Создаем 20 столиков одним запросом, существующие пропускаются
+        tables_data = [{"number": number} for number in range(1, 21)]
+        import_rows("tables", enumerate(tables_data, start=1))
 
         self.stdout.write(self.style.SUCCESS("Tables loaded successfully!"))
@@ -0,0 +1,52 @@
+import orjson
+from django.core.management.base import BaseCommand, CommandError
+
+from orders.retention import read_archive, restore_orders
+
+
+class Command(BaseCommand):
+    help = (
+        "Prints orders from archive files as JSONL, optionally filtered, "
+        "or restores them into the database"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("paths", nargs="+", help="Archive files (.jsonl.gz)")
+        parser.add_argument(
+            "--order", type=int, action="append", dest="orders", help="Order id"
+        )
+        parser.add_argument("--table", type=int, help="Table number")
+        parser.add_argument("--status", help="Order status")
+        parser.add_argument(
+            "--restore",
+            action="store_true",
+            help="Insert matching orders back as archived orders",
+        )
+
+    def handle(self, *args, **options):
+        records = self.matching(options)
+        if not options["restore"]:
+            for record in records:
+                self.stdout.write(orjson.dumps(record).decode())
+            return
+
+        restored, skipped = restore_orders(records)
+        self.stdout.write(
+            self.style.SUCCESS(f"Restored {restored} orders, skipped {skipped}")
+        )
+
+    def matching(self, options):
+        """Записи файлов архива, подходящие под фильтры команды."""
+        orders = set(options["orders"] or ())
+        for path in options["paths"]:
+            try:
+                for record in read_archive(path):
+                    if orders and record["id"] not in orders:
+                        continue
+                    if options["table"] not in (None, record["table_number"]):
+                        continue
+                    if options["status"] not in (None, record["status"]):
+                        continue
+                    yield record
+            except OSError as exc:
+                raise CommandError(f"Cannot read {path}: {exc}")
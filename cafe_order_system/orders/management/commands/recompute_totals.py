@@ -0,0 +1,65 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from orders.models import Order, open_orders
+from orders.totals import recompute_totals
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes order totals from their items with chunked set-based "
+        "UPDATEs; only open orders unless --all is given"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--product",
+            type=int,
+            action="append",
+            dest="products",
+            help="Only orders containing this product id (repeatable)",
+        )
+        parser.add_argument(
+            "--reprice",
+            action="store_true",
+            help="Update item prices of open orders to current product prices",
+        )
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Include paid and archived orders (their prices are not changed)",
+        )
+        parser.add_argument("--chunk-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        chunk_size = options["chunk_size"]
+        if chunk_size < 1:
+            raise CommandError("--chunk-size must be a positive integer")
+
+        orders = Order.objects.all()
+        if not options["all"]:
+            orders = orders.filter(open_orders())
+
+        def progress(changed, repriced):
+            self.stdout.write(
+                f"Recomputing... {changed} orders changed, {repriced} items repriced"
+            )
+
+        changed, repriced = recompute_totals(
+            orders,
+            product_ids=options["products"],
+            reprice=options["reprice"],
+            chunk_size=chunk_size,
+            progress=progress,
+        )
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Totals recomputed: {changed} orders changed, "
+                f"{repriced} items repriced"
+            )
+        )
+        if changed and options["all"]:
+            self.stdout.write(
+                "Settled orders may have changed; run backfill_sales "
+                "to rebuild sales rollups"
+            )
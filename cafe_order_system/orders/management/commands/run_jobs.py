@@ -0,0 +1,48 @@
+import signal
+import threading
+
+from django.core.management.base import BaseCommand, CommandError
+
+from orders.jobs import work
+
+
+class Command(BaseCommand):
+    help = "Runs background jobs from the database queue in a thread pool"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=4, help="Worker threads")
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=1.0,
+            help="Seconds to wait when the queue is empty",
+        )
+        parser.add_argument(
+            "--once", action="store_true", help="Exit when no jobs are due"
+        )
+
+    def handle(self, *args, **options):
+        workers = options["workers"]
+        if workers < 1:
+            raise CommandError("--workers must be a positive integer")
+
+        stop = threading.Event()
+        if threading.current_thread() is threading.main_thread():
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                signal.signal(signum, lambda *_: stop.set())
+
+        def progress(done, failed):
+            self.stdout.write(f"Processed jobs: {done} done, {failed} failed")
+
+        if not options["once"]:
+            self.stdout.write(f"Worker started with {workers} threads")
+        done, failed = work(
+            workers=workers,
+            poll_interval=options["poll_interval"],
+            once=options["once"],
+            stop=stop,
+            progress=progress,
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f"Worker stopped: {done} jobs done, {failed} failed")
+        )
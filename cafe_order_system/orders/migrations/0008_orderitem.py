@@ -0,0 +1,97 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def copy_order_products(apps, schema_editor):
+    """Переносит связи заказ-продукт из старой M2M-таблицы в позиции заказа."""
+    Order = apps.get_model("orders", "Order")
+    OrderItem = apps.get_model("orders", "OrderItem")
+    db_alias = schema_editor.connection.alias
+    links = Order.products.through.objects.using(db_alias).select_related("product")
+    OrderItem.objects.using(db_alias).bulk_create(
+        (
+            OrderItem(
+                order_id=link.order_id,
+                product_id=link.product_id,
+                quantity=1,
+                unit_price=link.product.price,
+            )
+            for link in links.iterator(chunk_size=2000)
+        ),
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0007_order_archived_alter_order_status"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OrderItem",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "quantity",
+                    models.PositiveIntegerField(default=1, verbose_name="Количество"),
+                ),
+                (
+                    "unit_price",
+                    models.DecimalField(
+                        decimal_places=2,
+                        max_digits=10,
+                        verbose_name="Цена за единицу",
+                    ),
+                ),
+                (
+                    "order",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="items",
+                        to="orders.order",
+                        verbose_name="Заказ",
+                    ),
+                ),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="order_items",
+                        to="orders.product",
+                        verbose_name="Блюдо",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Позиция заказа",
+                "verbose_name_plural": "Позиции заказа",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("order", "product"), name="unique_order_product"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(copy_order_products, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name="order",
+            name="products",
+        ),
+        migrations.AddField(
+            model_name="order",
+            name="products",
+            field=models.ManyToManyField(
+                related_name="orders", through="orders.OrderItem", to="orders.product"
+            ),
+        ),
+    ]
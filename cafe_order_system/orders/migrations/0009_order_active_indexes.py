@@ -0,0 +1,45 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0008_orderitem"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                condition=models.Q(("archived", False)),
+                fields=["-id"],
+                name="order_active_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                condition=models.Q(("archived", False)),
+                fields=["status", "-id"],
+                name="order_active_status_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                condition=models.Q(("archived", False)),
+                fields=["status", "table_number", "-id"],
+                name="order_active_status_table_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                condition=models.Q(("archived", False)),
+                fields=["table_number", "-id"],
+                name="order_active_table_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:11
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def rename_duplicate_products(apps, schema_editor):
+    """
+    Переименовывает блюда с повторяющимися названиями перед добавлением
+    уникальности: первое по id сохраняет название, остальные получают
+    суффикс « (2)», « (3)» и т. д. Блюда не объединяются, чтобы не трогать
+    позиции заказов и сводки, ссылающиеся на каждое из них.
+    """
+    Product = apps.get_model("orders", "Product")
+    products = Product.objects.using(schema_editor.connection.alias)
+    duplicates = (
+        products.values("name")
+        .annotate(count=Count("pk"))
+        .filter(count__gt=1)
+        .values_list("name", flat=True)
+    )
+    taken = set(products.values_list("name", flat=True))
+    max_length = Product._meta.get_field("name").max_length
+    for name in list(duplicates):
+        number = 1
+        for product in products.filter(name=name).order_by("pk")[1:]:
+            while True:
+                number += 1
+                suffix = f" ({number})"
+                new_name = name[: max_length - len(suffix)] + suffix
+                if new_name not in taken:
+                    break
+            taken.add(new_name)
+            product.name = new_name
+            product.save(update_fields=["name"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0009_order_active_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(rename_duplicate_products, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="product",
+            name="name",
+            field=models.CharField(max_length=255, unique=True),
+        ),
+    ]
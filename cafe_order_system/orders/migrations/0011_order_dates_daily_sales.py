@@ -0,0 +1,128 @@
+# Generated by Django 5.1.7 on 2026-10-18 10:17
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0010_product_name_unique"),
+    ]
+
+    operations = [
+        # Существующие заказы получают NULL, а не время миграции: иначе
+        # все прошлые продажи попали бы в сводки одним днём.
+        migrations.AddField(
+            model_name="order",
+            name="created_at",
+            field=models.DateTimeField(null=True, verbose_name="Создан"),
+        ),
+        migrations.AlterField(
+            model_name="order",
+            name="created_at",
+            field=models.DateTimeField(
+                default=django.utils.timezone.now, null=True, verbose_name="Создан"
+            ),
+        ),
+        migrations.AddField(
+            model_name="order",
+            name="settled_at",
+            field=models.DateTimeField(
+                blank=True, editable=False, null=True, verbose_name="Закрыт"
+            ),
+        ),
+        migrations.CreateModel(
+            name="DailyProductSales",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField(verbose_name="Дата")),
+                (
+                    "quantity",
+                    models.PositiveIntegerField(default=0, verbose_name="Количество"),
+                ),
+                (
+                    "revenue",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=0,
+                        max_digits=12,
+                        verbose_name="Выручка",
+                    ),
+                ),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="daily_sales",
+                        to="orders.product",
+                        verbose_name="Блюдо",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Продажи блюда за день",
+                "verbose_name_plural": "Продажи блюд по дням",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("date", "product"), name="unique_day_product"
+                    )
+                ],
+            },
+        ),
+        migrations.CreateModel(
+            name="DailyTableSales",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField(verbose_name="Дата")),
+                (
+                    "orders_count",
+                    models.PositiveIntegerField(default=0, verbose_name="Заказов"),
+                ),
+                (
+                    "revenue",
+                    models.DecimalField(
+                        decimal_places=2,
+                        default=0,
+                        max_digits=12,
+                        verbose_name="Выручка",
+                    ),
+                ),
+                (
+                    "table",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="daily_sales",
+                        to="orders.table",
+                        verbose_name="Стол",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Продажи стола за день",
+                "verbose_name_plural": "Продажи столов по дням",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("date", "table"), name="unique_day_table"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+from django.db import migrations
+from django.db.models import Exists, OuterRef
+
+
+def sync_occupancy(apps, schema_editor):
+    """Выставляет занятость столов по текущим открытым заказам."""
+    Order = apps.get_model("orders", "Order")
+    Table = apps.get_model("orders", "Table")
+    db_alias = schema_editor.connection.alias
+    open_orders = Order.objects.using(db_alias).filter(
+        table_number=OuterRef("pk"),
+        archived=False,
+        status__in=("waiting", "ready"),
+    )
+    Table.objects.using(db_alias).update(is_occupied=Exists(open_orders))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0011_order_dates_daily_sales"),
+    ]
+
+    operations = [
+        migrations.RunPython(sync_occupancy, migrations.RunPython.noop),
+    ]
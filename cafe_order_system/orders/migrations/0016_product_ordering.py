@@ -0,0 +1,17 @@
+# Generated by Django 5.1.7 on 2026-10-18 11:21
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0015_order_created_idx"),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="product",
+            options={"ordering": ("name",)},
+        ),
+    ]
@@ -1,10 +1,90 @@
-from django.db import models
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db import connections, models, router, transaction
+from django.db.models import (
+    Count,
+    Exists,
+    F,
+    OuterRef,
+    Prefetch,
+    Q,
+    Subquery,
+    Sum,
+    Value,
+)
+from django.db.models.functions import Coalesce, Round
+from django.utils import timezone
+
+from .events import order_event, publish_order_events
+
+
+PRICE_FIELD = models.DecimalField(max_digits=10, decimal_places=2)
+
+# Статусы заказа, за которым ещё сидят гости: не оплачен и не в архиве.
+OPEN_STATUSES = ("waiting", "ready")
+
+# Допустимые смены статуса: оплаченный заказ не возвращается в работу.
+STATUS_TRANSITIONS = {
+    "waiting": ("ready", "paid"),
+    "ready": ("waiting", "paid"),
+    "paid": (),
+}
+
+
+def open_orders(prefix=""):
+    """Условие открытого заказа: не оплачен и не архивирован."""
+    return Q(**{f"{prefix}archived": False, f"{prefix}status__in": OPEN_STATUSES})
+
+
+class TableQuerySet(models.QuerySet):
+    def sync_occupancy(self):
+        """
+        Пересчитывает `is_occupied` выбранных столов по их открытым заказам.
+
+        Строки столов блокируются (SELECT ... FOR UPDATE в порядке pk), а флаг
+        вычисляется уже после получения блокировки, поэтому параллельные
+        создание и оплата заказов одного стола не затирают результат друг
+        друга. SQLite не поддерживает FOR UPDATE, но и так выполняет
+        пишущие транзакции по одной, поэтому там блокировка не запрашивается.
+        Вызывать внутри транзакции, изменившей заказы.
+
+        Возвращает:
+            int: Количество обновлённых столов.
+        """
+        tables = self
+        if connections[self.db].features.has_select_for_update:
+            pks = self.select_for_update().order_by("pk").values_list("pk", flat=True)
+            tables = Table.objects.using(self.db).filter(pk__in=list(pks))
+        occupied = Order.objects.filter(open_orders(), table_number=OuterRef("pk"))
+        return tables.update(is_occupied=Exists(occupied))
+
+    def board(self):
+        """
+        Состояние столов для зала одним агрегирующим запросом: занятость,
+        число открытых заказов и их общая сумма.
+        """
+        condition = open_orders("orders__")
+        return (
+            self.annotate(
+                open_orders=Count("orders", filter=condition),
+                open_total=Coalesce(
+                    Sum("orders__total_price", filter=condition),
+                    Value(Decimal("0")),
+                    output_field=PRICE_FIELD,
+                ),
+            )
+            .order_by("number")
+            .values("id", "number", "is_occupied", "open_orders", "open_total")
+        )
 
 
 class Table(models.Model):
     number = models.IntegerField(unique=True, verbose_name="Номер стола")
     is_occupied = models.BooleanField(default=False, verbose_name="Занят")
 
+    objects = TableQuerySet.as_manager()
+
     def __str__(self):
         return f"Стол #{self.number}"
 
@@ -14,7 +94,7 @@ class Table(models.Model):
 
 
 class Product(models.Model):
-    name = models.CharField(max_length=255)
+    name = models.CharField(max_length=255, unique=True)
     price = models.DecimalField(max_digits=10, decimal_places=2)
 
     class Meta:
@@ -24,6 +104,217 @@ class Product(models.Model):
         return f"{self.name} | {self.price} руб."
 
 
+def items_total(prefix=""):
+    """Выражение суммы позиций заказа: количество × зафиксированная цена."""
+    return Sum(
+        F(f"{prefix}quantity") * F(f"{prefix}unit_price"), output_field=PRICE_FIELD
+    )
+
+
+def order_total():
+    """
+    Выражение итоговой стоимости заказа по его позициям (0 без позиций).
+
+    Сумма округляется до копеек: SQLite считает её в плавающей точке,
+    и без округления сравнение с сохранённой стоимостью давало бы ложные
+    расхождения.
+    """
+    totals = (
+        OrderItem.objects.filter(order=OuterRef("pk"))
+        .values("order")
+        .annotate(total=items_total())
+        .values("total")
+    )
+    return Round(
+        Coalesce(
+            Subquery(totals, output_field=PRICE_FIELD),
+            Value(Decimal("0")),
+            output_field=PRICE_FIELD,
+        ),
+        2,
+        output_field=PRICE_FIELD,
+    )
+
+
+def items_prefetch():
+    """Позиции заказа с блюдами одним запросом, в порядке добавления."""
+    return Prefetch(
+        "items", queryset=OrderItem.objects.select_related("product").order_by("pk")
+    )
+
+
+class OrderQuerySet(models.QuerySet):
+    def create_with_items(self, entries):
+        """
+        Создаёт пакет заказов с позициями двумя INSERT: один на заказы,
+        один на все их позиции.
+
+        Аргументы:
+            entries: Список пар (несохранённый Order, список несохранённых
+                     OrderItem с заполненными `product` и `quantity`).
+
+        Цена позиции фиксируется по текущей цене блюда, итоговая стоимость
+        заказа вычисляется до вставки, поэтому отдельный пересчёт не нужен.
+        Занятость столов с открытыми заказами обновляется в той же транзакции.
+        Вызывать внутри транзакции.
+
+        Возвращает:
+            list: Созданные заказы с первичными ключами.
+        """
+        from .cache import invalidate_tables_on_commit
+        from .rollups import record_sales_on_commit
+
+        orders = []
+        now = timezone.now()
+        for order, items in entries:
+            if order.settled_at is None and order.is_settled:
+                order.settled_at = now
+            for item in items:
+                item.unit_price = item.product.price
+            order.total_price = sum(
+                (item.line_total for item in items), Decimal("0")
+            )
+            orders.append(order)
+        self.bulk_create(orders)
+
+        items = []
+        for order, order_items in entries:
+            for item in order_items:
+                item.order = order
+                items.append(item)
+        OrderItem.objects.bulk_create(items)
+
+        Table.objects.filter(
+            pk__in={order.table_number_id for order in orders if not order.is_settled}
+        ).sync_occupancy()
+        invalidate_tables_on_commit()
+        record_sales_on_commit(
+            order.pk for order in orders if order.settled_at is not None
+        )
+        publish_order_events(order_event("created", order) for order in orders)
+        return orders
+
+    def with_items(self):
+        """
+        Подгружает стол и позиции заказа вместе с блюдами.
+
+        Независимо от числа заказов выполняется два запроса:
+        заказы со столами и позиции с блюдами.
+        """
+        return self.select_related("table_number").prefetch_related(items_prefetch())
+
+    def update_totals(self):
+        """
+        Пересчитывает `total_price` выбранных заказов одним UPDATE
+        с коррелированным подзапросом по позициям заказа.
+        """
+        return self.update(total_price=order_total())
+
+    def stale_totals(self):
+        """Заказы, у которых `total_price` расходится с суммой позиций."""
+        return self.exclude(total_price=order_total())
+
+    def refresh_totals(self):
+        """
+        Исправляет расходящиеся `total_price` выбранных заказов одним UPDATE.
+
+        Версия изменённых заказов увеличивается: формы, открытые до пересчёта,
+        получат конфликт вместо записи старой стоимости, а отрисованные блоки
+        заказов в кэше обновятся. Совпадающие заказы не переписываются.
+
+        Возвращает:
+            int: Количество изменённых заказов.
+        """
+        return self.stale_totals().update(
+            total_price=order_total(), version=F("version") + 1
+        )
+
+    def change_status(self, order_ids, status):
+        """
+        Переводит заказы в статус `status` одним условным UPDATE.
+
+        Меняются только неархивированные заказы, для которых переход допустим
+        (`STATUS_TRANSITIONS`). Строки заказов блокируются на время
+        транзакции, а условие перехода повторяется в самом UPDATE, поэтому
+        недопустимый переход не происходит и при параллельных изменениях.
+        Версия изменённых заказов увеличивается, при оплате заполняется
+        `settled_at`. Занятость столов, кэш зала, сводки продаж и события
+        заказов обновляются так же, как при сохранении заказов по одному.
+
+        Аргументы:
+            order_ids: Идентификаторы заказов.
+            status: Новый статус.
+
+        Возвращает:
+            tuple: Список изменённых заказов, список заказов, у которых уже
+                   был этот статус, и словарь {id: статус} отклонённых
+                   заказов (None — заказа нет или он в архиве).
+        """
+        from .cache import invalidate_tables_on_commit
+        from .rollups import record_sales_on_commit
+
+        order_ids = set(order_ids)
+        sources = [
+            source
+            for source, targets in STATUS_TRANSITIONS.items()
+            if status in targets
+        ]
+        locked = self.select_for_update().filter(pk__in=order_ids, archived=False)
+        with transaction.atomic(using=locked.db):
+            rows = locked.order_by("pk").values_list(
+                "pk", "table_number", "status", "settled_at"
+            )
+            updated, unchanged, rejected = [], [], {}
+            tables, settled, events = set(), [], []
+            for pk, table, current, settled_at in rows:
+                if current == status:
+                    unchanged.append(pk)
+                    continue
+                if current not in sources:
+                    rejected[pk] = current
+                    continue
+                updated.append(pk)
+                if (current in OPEN_STATUSES) != (status in OPEN_STATUSES):
+                    tables.add(table)
+                if status == "paid" and settled_at is None:
+                    settled.append(pk)
+                order = self.model(
+                    pk=pk, table_number_id=table, status=status, archived=False
+                )
+                events.append(order_event("status", order))
+            found = {*updated, *unchanged, *rejected}
+            rejected.update((pk, None) for pk in sorted(order_ids - found))
+            if not updated:
+                return updated, unchanged, rejected
+
+            changes = {"status": status, "version": F("version") + 1}
+            if status == "paid":
+                changes["settled_at"] = Coalesce(F("settled_at"), Value(timezone.now()))
+            self.filter(pk__in=updated, archived=False, status__in=sources).update(
+                **changes
+            )
+
+            if tables:
+                Table.objects.filter(pk__in=tables).sync_occupancy()
+            invalidate_tables_on_commit()
+            record_sales_on_commit(settled)
+            publish_order_events(events)
+        return updated, unchanged, rejected
+
+
+class OrderConflictError(Exception):
+    """
+    Заказ изменён другим запросом после того, как был прочитан.
+
+    Транзакция, в которой возникла ошибка, непригодна для продолжения,
+    поэтому перехватывать её нужно снаружи блока `transaction.atomic()`.
+    """
+
+    def __init__(self, order):
+        super().__init__(f"Order #{order.pk} was changed by another request.")
+        self.order = order
+
+
 class Order(models.Model):
     STATUS_CHOICES = [
         ("waiting", "В ожидании"),
@@ -34,7 +325,9 @@ class Order(models.Model):
     table_number = models.ForeignKey(
         Table, on_delete=models.CASCADE, related_name="orders", verbose_name="Стол"
     )
-    products = models.ManyToManyField(Product, related_name="orders")
+    products = models.ManyToManyField(
+        Product, through="OrderItem", related_name="orders"
+    )
     total_price = models.DecimalField(
         max_digits=10, decimal_places=2, blank=True, null=True, default=0
     )
@@ -42,10 +335,305 @@ class Order(models.Model):
         max_length=10, choices=STATUS_CHOICES, default="waiting", verbose_name="статус"
     )
     archived = models.BooleanField(default=False)
+    # У заказов, созданных до появления поля, время создания неизвестно (NULL).
+    created_at = models.DateTimeField(
+        null=True, default=timezone.now, verbose_name="Создан"
+    )
+    settled_at = models.DateTimeField(
+        null=True, blank=True, editable=False, verbose_name="Закрыт"
+    )
+    version = models.PositiveIntegerField(
+        default=1, editable=False, verbose_name="Версия"
+    )
+
+    objects = OrderQuerySet.as_manager()
+
+    class Meta:
+        # Рабочий набор — неархивированные заказы. Частичные индексы не растут
+        # вместе с архивом и покрывают выборки списка заказов и кухни:
+        # от новых к старым, по статусу и/или столу.
+        indexes = [
+            models.Index(
+                fields=["-id"],
+                condition=Q(archived=False),
+                name="order_active_idx",
+            ),
+            models.Index(
+                fields=["status", "-id"],
+                condition=Q(archived=False),
+                name="order_active_status_idx",
+            ),
+            models.Index(
+                fields=["status", "table_number", "-id"],
+                condition=Q(archived=False),
+                name="order_active_status_table_idx",
+            ),
+            models.Index(
+                fields=["table_number", "-id"],
+                condition=Q(archived=False),
+                name="order_active_table_idx",
+            ),
+            # Выгрузка и хранение архива выбирают заказы по периоду создания,
+            # включая архивные.
+            models.Index(fields=["created_at"], name="order_created_idx"),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_state()
+        return instance
+
+    def remember_state(self):
+        """
+        Запоминает статус, флаг архива и стол, чтобы после сохранения понять,
+        какое событие заказа произошло и занятость каких столов изменилась.
+        """
+        self._loaded_state = {
+            field: self.__dict__[field]
+            for field in ("status", "archived", "table_number_id")
+            if field in self.__dict__
+        }
+
+    @property
+    def is_settled(self):
+        """Заказ закрыт: оплачен или архивирован."""
+        return self.status == "paid" or self.archived
+
+    def check_status_change(self, status):
+        """
+        Проверяет, что заказ можно перевести из статуса, прочитанного
+        из базы, в `status` (`STATUS_TRANSITIONS`); иначе, например для
+        оплаченного заказа, возвращаемого в работу, выбрасывает
+        `ValidationError` с ошибкой поля `status`. Общая проверка для форм,
+        синхронного и асинхронного API; массовая смена статуса применяет
+        те же правила в условном UPDATE.
+        """
+        current = getattr(self, "_loaded_state", {}).get("status")
+        if current is None or status == current:
+            return
+        if status not in STATUS_TRANSITIONS.get(current, ()):
+            labels = dict(self.STATUS_CHOICES)
+            raise ValidationError(
+                {
+                    "status": f"Нельзя перевести заказ из статуса "
+                    f"«{labels[current]}» в «{labels.get(status, status)}»."
+                }
+            )
+
+    def clean(self):
+        super().clean()
+        self.check_status_change(self.status)
+
+    def save(self, *args, **kwargs):
+        """
+        Сохраняет заказ, отмечая момент закрытия.
+
+        При переходе в оплаченный или архивный заказ из открытого
+        (по состоянию, прочитанному из базы) заполняется `settled_at`,
+        а после фиксации транзакции продажи попадают в дневные сводки.
+        Заказы, прочитанные уже закрытыми, не отмечаются: у закрытых
+        до появления `settled_at` момент закрытия неизвестен. Сохранение
+        и обработчики `post_save` (в том числе пересчёт занятости стола)
+        выполняются в одной транзакции.
+        """
+        loaded = getattr(self, "_loaded_state", {})
+        was_settled = loaded.get("status") == "paid" or bool(loaded.get("archived"))
+        self._just_settled = (
+            self.settled_at is None and self.is_settled and not was_settled
+        )
+        if self._just_settled:
+            self.settled_at = timezone.now()
+            update_fields = kwargs.get("update_fields")
+            if update_fields is not None:
+                kwargs["update_fields"] = {*update_fields, "settled_at"}
+        using = kwargs.get("using") or router.db_for_write(Order, instance=self)
+        with transaction.atomic(using=using, savepoint=False):
+            super().save(*args, **kwargs)
+
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, forced_update):
+        """
+        Обновляет заказ, только если его версия в базе совпадает с `version`.
+
+        Запрос принимает вид `UPDATE ... SET ..., version = version + 1
+        WHERE id = %s AND version = %s`, поэтому долгие блокировки строк
+        не нужны. Если строка есть, но версия другая, заказ успели изменить
+        после чтения — выбрасывается `OrderConflictError`.
+        """
+        version_field = self._meta.get_field("version")
+        values = [value for value in values if value[0] is not version_field]
+        values.append((version_field, None, F("version") + 1))
+        updated = super()._do_update(
+            base_qs.filter(version=self.version),
+            using,
+            pk_val,
+            values,
+            update_fields,
+            forced_update,
+        )
+        if updated:
+            self.version += 1
+        elif base_qs.filter(pk=pk_val).exists():
+            raise OrderConflictError(self)
+        return updated
 
     def calculate_total_price(self):
-        """Метод для расчета общей стоимости заказа."""
-        if self.products.exists():
-            self.total_price = sum(product.price for product in self.products.all())
-        else:
-            self.total_price = 0
+        """Метод для расчета общей стоимости заказа одним агрегирующим запросом."""
+        total = self.items.aggregate(total=items_total())["total"]
+        self.total_price = total if total is not None else Decimal("0")
+
+
+class OrderItem(models.Model):
+    """
+    Позиция заказа.
+
+    Хранит количество и цену продукта на момент оформления заказа,
+    чтобы изменение цены в меню не влияло на уже созданные заказы.
+    """
+
+    order = models.ForeignKey(
+        Order, on_delete=models.CASCADE, related_name="items", verbose_name="Заказ"
+    )
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name="order_items",
+        verbose_name="Блюдо",
+    )
+    quantity = models.PositiveIntegerField(default=1, verbose_name="Количество")
+    unit_price = models.DecimalField(
+        max_digits=10, decimal_places=2, verbose_name="Цена за единицу"
+    )
+
+    class Meta:
+        verbose_name = "Позиция заказа"
+        verbose_name_plural = "Позиции заказа"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["order", "product"], name="unique_order_product"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.product.name} × {self.quantity}"
+
+    @property
+    def line_total(self):
+        """Стоимость позиции с учётом количества."""
+        return self.unit_price * self.quantity
+
+
+class DailyTableSales(models.Model):
+    """
+    Дневная сводка продаж по столу.
+
+    Пополняется при закрытии заказа (оплата или архивация), поэтому отчёты
+    читают только сводки, не просматривая таблицу заказов.
+    """
+
+    date = models.DateField(verbose_name="Дата")
+    table = models.ForeignKey(
+        Table, on_delete=models.CASCADE, related_name="daily_sales", verbose_name="Стол"
+    )
+    orders_count = models.PositiveIntegerField(default=0, verbose_name="Заказов")
+    revenue = models.DecimalField(
+        max_digits=12, decimal_places=2, default=0, verbose_name="Выручка"
+    )
+
+    class Meta:
+        verbose_name = "Продажи стола за день"
+        verbose_name_plural = "Продажи столов по дням"
+        constraints = [
+            models.UniqueConstraint(fields=["date", "table"], name="unique_day_table"),
+        ]
+
+
+class DailyProductSales(models.Model):
+    """Дневная сводка продаж по блюду: количество и выручка."""
+
+    date = models.DateField(verbose_name="Дата")
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name="daily_sales",
+        verbose_name="Блюдо",
+    )
+    quantity = models.PositiveIntegerField(default=0, verbose_name="Количество")
+    revenue = models.DecimalField(
+        max_digits=12, decimal_places=2, default=0, verbose_name="Выручка"
+    )
+
+    class Meta:
+        verbose_name = "Продажи блюда за день"
+        verbose_name_plural = "Продажи блюд по дням"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["date", "product"], name="unique_day_product"
+            ),
+        ]
+
+
+class JobQuerySet(models.QuerySet):
+    def due(self):
+        """Задачи в очереди, время запуска которых наступило."""
+        return self.filter(status="queued", run_at__lte=timezone.now())
+
+    def stats(self):
+        """Количество задач по имени и состоянию одним агрегирующим запросом."""
+        return (
+            self.values("name", "status")
+            .annotate(count=Count("id"))
+            .order_by("name", "status")
+        )
+
+
+class Job(models.Model):
+    """
+    Фоновая задача в очереди на базе данных.
+
+    Задача ставится в очередь в транзакции, изменившей данные, и видна
+    воркеру (`run_jobs`) только после её фиксации. Неудачная попытка
+    откладывает задачу с растущей паузой, после `max_attempts` попыток
+    задача остаётся в состоянии `failed` с текстом последней ошибки.
+    """
+
+    STATUS_CHOICES = [
+        ("queued", "В очереди"),
+        ("running", "Выполняется"),
+        ("done", "Выполнена"),
+        ("failed", "Ошибка"),
+    ]
+
+    name = models.CharField(max_length=100, verbose_name="Задача")
+    kwargs = models.JSONField(default=dict, blank=True, verbose_name="Аргументы")
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default="queued",
+        verbose_name="Состояние",
+    )
+    attempts = models.PositiveIntegerField(default=0, verbose_name="Попыток")
+    max_attempts = models.PositiveIntegerField(default=3, verbose_name="Макс. попыток")
+    run_at = models.DateTimeField(default=timezone.now, verbose_name="Запуск")
+    created_at = models.DateTimeField(default=timezone.now, verbose_name="Создана")
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name="Начата")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="Завершена")
+    worker = models.CharField(max_length=100, blank=True, verbose_name="Воркер")
+    last_error = models.TextField(blank=True, verbose_name="Ошибка")
+
+    objects = JobQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = "Фоновая задача"
+        verbose_name_plural = "Фоновые задачи"
+        # Воркер выбирает только ожидающие задачи; выполненные в индекс не входят.
+        indexes = [
+            models.Index(
+                fields=["run_at", "id"],
+                condition=Q(status="queued"),
+                name="job_queued_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
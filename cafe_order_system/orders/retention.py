@@ -0,0 +1,277 @@
+"""
+Хранение старых архивных заказов вне базы.
+
+Архивные заказы старше порога выгружаются вместе с позициями в файл
+JSONL, сжатый gzip, — по одному заказу на строку. Файл пишется под
+временным именем и переименовывается только целиком, после чего
+выгруженные заказы удаляются короткими транзакциями: SQLite не блокируется
+надолго, а прерванная выгрузка не теряет заказов. Дневные сводки продаж
+не затрагиваются, поэтому отчёты за прошлые периоды не меняются.
+Из файлов архива заказы можно прочитать и при необходимости восстановить.
+"""
+
+import gzip
+import os
+from array import array
+from collections import defaultdict
+from decimal import Decimal
+
+import orjson
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Order, OrderItem, Product, Table
+from .totals import order_chunks
+
+ORDER_FIELDS = (
+    "pk",
+    "table_number",
+    "table_number__number",
+    "status",
+    "total_price",
+    "created_at",
+    "settled_at",
+    "version",
+)
+ITEM_FIELDS = ("order", "product", "product__name", "quantity", "unit_price")
+
+
+def expired_orders(cutoff, include_undated=False):
+    """
+    Архивные заказы, созданные раньше `cutoff`.
+
+    Заказы без даты создания появились до того, как её стали записывать,
+    и их возраст неизвестен, поэтому они попадают в выборку только
+    с `include_undated`.
+    """
+    expired = Q(created_at__lt=cutoff)
+    if include_undated:
+        expired |= Q(created_at__isnull=True)
+    return Order.objects.filter(expired, archived=True)
+
+
+def order_records(orders, chunk_size=500):
+    """
+    Читает заказы с позициями по частям: два запроса на часть.
+
+    Возвращает:
+        Iterator[dict]: Записи заказов в формате файла архива.
+    """
+    for chunk in order_chunks(orders, chunk_size):
+        rows = list(chunk.order_by("pk").values_list(*ORDER_FIELDS))
+        if not rows:
+            continue
+        items = defaultdict(list)
+        lines = (
+            OrderItem.objects.filter(order__in=[row[0] for row in rows])
+            .order_by("pk")
+            .values_list(*ITEM_FIELDS)
+        )
+        for order, product, name, quantity, unit_price in lines:
+            items[order].append(
+                {
+                    "product": product,
+                    "name": name,
+                    "quantity": quantity,
+                    "unit_price": f"{unit_price:f}",
+                }
+            )
+        for pk, table, number, status, total, created, settled, version in rows:
+            yield {
+                "id": pk,
+                "table": table,
+                "table_number": number,
+                "status": status,
+                "total_price": None if total is None else f"{total:f}",
+                "created_at": created,
+                "settled_at": settled,
+                "version": version,
+                "items": items[pk],
+            }
+
+
+def export_orders(orders, path, chunk_size=500, progress=None):
+    """
+    Выгружает заказы в файл JSONL, сжатый gzip.
+
+    Файл появляется под именем `path` только после того, как записан
+    полностью и сброшен на диск; если выгружать нечего, файл не создаётся.
+    Существующий файл не перезаписывается.
+
+    Аргументы:
+        orders: Выборка заказов.
+        path: Путь к файлу архива.
+        chunk_size: Количество заказов, читаемых за раз.
+        progress: Функция, вызываемая с числом выгруженных заказов
+                  после каждой части.
+
+    Возвращает:
+        array: Идентификаторы выгруженных заказов.
+    """
+    if os.path.exists(path):
+        raise FileExistsError(f"{path} already exists")
+    exported = array("q")
+    partial = f"{path}.part"
+    with open(partial, "xb") as raw:
+        with gzip.open(raw, "wb") as stream:
+            for record in order_records(orders, chunk_size):
+                stream.write(orjson.dumps(record, option=orjson.OPT_APPEND_NEWLINE))
+                exported.append(record["id"])
+                if progress is not None and len(exported) % chunk_size == 0:
+                    progress(len(exported))
+        raw.flush()
+        os.fsync(raw.fileno())
+    if exported:
+        os.replace(partial, path)
+    else:
+        os.remove(partial)
+    return exported
+
+
+def purge_orders(order_ids, chunk_size=500):
+    """
+    Удаляет архивные заказы и их позиции, по `chunk_size` заказов
+    в транзакции. Заказы, которые успели вернуть из архива, не удаляются.
+
+    Возвращает:
+        int: Количество удалённых заказов.
+    """
+    deleted = 0
+    for start in range(0, len(order_ids), chunk_size):
+        pks = list(order_ids[start : start + chunk_size])
+        with transaction.atomic():
+            _, by_model = Order.objects.filter(pk__in=pks, archived=True).delete()
+        deleted += by_model.get(Order._meta.label, 0)
+    return deleted
+
+
+def archive_orders(
+    cutoff,
+    directory,
+    chunk_size=500,
+    purge=True,
+    progress=None,
+    include_undated=False,
+):
+    """
+    Выгружает архивные заказы старше `cutoff` в новый файл каталога
+    `directory` и удаляет их из базы.
+
+    Аргументы:
+        cutoff: Момент времени; выгружаются заказы, созданные раньше.
+        directory: Каталог файлов архива.
+        chunk_size: Количество заказов в части выгрузки и в транзакции удаления.
+        purge: Удалять ли выгруженные заказы.
+        progress: См. `export_orders`.
+        include_undated: Выгружать ли и архивные заказы без даты создания.
+
+    Возвращает:
+        tuple: Путь к файлу (None, если выгружать нечего), количество
+               выгруженных и удалённых заказов.
+    """
+    os.makedirs(directory, exist_ok=True)
+    stamp = timezone.now().strftime("%Y%m%dT%H%M%S%f")
+    path = os.path.join(directory, f"orders-before-{cutoff:%Y%m%d}-{stamp}.jsonl.gz")
+    exported = export_orders(
+        expired_orders(cutoff, include_undated), path, chunk_size, progress
+    )
+    if not exported:
+        return None, 0, 0
+    deleted = purge_orders(exported, chunk_size) if purge else 0
+    return path, len(exported), deleted
+
+
+def read_archive(path):
+    """
+    Читает записи заказов из файла архива.
+
+    Возвращает:
+        Iterator[dict]: Записи в порядке выгрузки.
+    """
+    with gzip.open(path, "rb") as stream:
+        for line in stream:
+            if line.strip():
+                yield orjson.loads(line)
+
+
+def restore_orders(records, batch_size=500):
+    """
+    Возвращает заказы из записей архива в базу как архивные.
+
+    Заказы восстанавливаются с прежними идентификаторами, ценами и версиями;
+    уже существующие заказы пропускаются. Заказ, стол которого удалён,
+    и позиции удалённых блюд восстановить нельзя — они тоже пропускаются.
+    В сводки продаж заказы повторно не попадают: их выгрузка сводки
+    не меняла.
+
+    Возвращает:
+        tuple: Количество восстановленных и пропущенных заказов.
+    """
+    restored = skipped = 0
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= batch_size:
+            done = _restore_batch(batch)
+            restored += done
+            skipped += len(batch) - done
+            batch = []
+    if batch:
+        done = _restore_batch(batch)
+        restored += done
+        skipped += len(batch) - done
+    return restored, skipped
+
+
+def _restore_batch(records):
+    """Восстанавливает пачку заказов: по одному запросу на проверку и вставку."""
+    existing = set(
+        Order.objects.filter(pk__in=[r["id"] for r in records]).values_list(
+            "pk", flat=True
+        )
+    )
+    tables = set(
+        Table.objects.filter(pk__in={r["table"] for r in records}).values_list(
+            "pk", flat=True
+        )
+    )
+    products = set(
+        Product.objects.filter(
+            pk__in={item["product"] for r in records for item in r["items"]}
+        ).values_list("pk", flat=True)
+    )
+
+    orders, items = [], []
+    for record in records:
+        if record["id"] in existing or record["table"] not in tables:
+            continue
+        total = record["total_price"]
+        created, settled = record["created_at"], record["settled_at"]
+        orders.append(
+            Order(
+                pk=record["id"],
+                table_number_id=record["table"],
+                status=record["status"],
+                total_price=None if total is None else Decimal(total),
+                archived=True,
+                created_at=None if created is None else parse_datetime(created),
+                settled_at=None if settled is None else parse_datetime(settled),
+                version=record["version"],
+            )
+        )
+        items.extend(
+            OrderItem(
+                order_id=record["id"],
+                product_id=item["product"],
+                quantity=item["quantity"],
+                unit_price=Decimal(item["unit_price"]),
+            )
+            for item in record["items"]
+            if item["product"] in products
+        )
+    with transaction.atomic():
+        Order.objects.bulk_create(orders)
+        OrderItem.objects.bulk_create(items)
+    return len(orders)
@@ -0,0 +1,198 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum, Value
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from .jobs import enqueue, task
+from .models import (
+    PRICE_FIELD,
+    DailyProductSales,
+    DailyTableSales,
+    Order,
+    OrderItem,
+    items_total,
+)
+
+
+@task(max_attempts=5)
+def record_sales(order_ids):
+    """
+    Добавляет закрытые заказы в дневные сводки продаж.
+
+    Выполняется фоновой задачей, поэтому не задерживает ответ на запрос,
+    закрывший заказы. Заказы и агрегаты их позиций читаются двумя запросами
+    уже после фиксации этой транзакции — к этому моменту стоимость
+    и позиции окончательны. Каждая строка сводки увеличивается
+    UPDATE ... SET x = x + n, а при отсутствии создаётся.
+
+    Аргументы:
+        order_ids: Идентификаторы заказов с заполненным `settled_at`.
+    """
+    orders = Order.objects.filter(pk__in=order_ids, settled_at__isnull=False).values(
+        "pk", "settled_at", "table_number", "total_price"
+    )
+    days = {}
+    tables = defaultdict(lambda: [0, Decimal("0")])
+    for order in orders:
+        day = days[order["pk"]] = timezone.localdate(order["settled_at"])
+        totals = tables[(day, order["table_number"])]
+        totals[0] += 1
+        totals[1] += order["total_price"] or 0
+    if not days:
+        return
+
+    products = defaultdict(lambda: [0, Decimal("0")])
+    lines = (
+        OrderItem.objects.filter(order__in=list(days))
+        .values("order", "product")
+        .annotate(quantity_sum=Sum("quantity"), revenue=items_total())
+        .order_by()
+    )
+    for line in lines:
+        totals = products[(days[line["order"]], line["product"])]
+        totals[0] += line["quantity_sum"]
+        totals[1] += line["revenue"]
+
+    with transaction.atomic():
+        _apply(tables, products)
+
+
+def record_sales_on_commit(order_ids):
+    """
+    Ставит `record_sales` в очередь фоновых задач: воркер выполнит её
+    после фиксации текущей транзакции.
+    """
+    order_ids = list(order_ids)
+    if order_ids:
+        enqueue(record_sales, order_ids=order_ids)
+
+
+def _apply(tables, products):
+    """Прибавляет собранные итоги к строкам сводок."""
+    for (day, table), (orders_count, revenue) in tables.items():
+        _increment(
+            DailyTableSales,
+            {"date": day, "table_id": table},
+            orders_count=orders_count,
+            revenue=revenue,
+        )
+    for (day, product), (quantity, revenue) in products.items():
+        _increment(
+            DailyProductSales,
+            {"date": day, "product_id": product},
+            quantity=quantity,
+            revenue=revenue,
+        )
+
+
+def _increment(model, lookup, **amounts):
+    """Увеличивает счётчики строки сводки, создавая её при необходимости."""
+    changes = {field: F(field) + value for field, value in amounts.items()}
+    if model.objects.filter(**lookup).update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, **amounts)
+    except IntegrityError:
+        # Строку успел создать параллельный запрос.
+        model.objects.filter(**lookup).update(**changes)
+
+
+def rebuild_sales(date_from=None, date_to=None, batch_size=1000):
+    """
+    Пересобирает дневные сводки из заказов и позиций set-based запросами.
+
+    Закрытым заказам без `settled_at` проставляется время создания.
+    Заказы, созданные до появления дат (без `created_at`), датировать
+    нечем: они в сводки не попадают и только подсчитываются. Затем сводки
+    за период удаляются и заново заполняются агрегатами, сгруппированными
+    на стороне базы.
+
+    Возвращает:
+        tuple: Количество строк сводок по столам и по блюдам и количество
+               закрытых заказов без даты.
+    """
+    period = Q()
+    if date_from is not None:
+        period &= Q(date__gte=date_from)
+    if date_to is not None:
+        period &= Q(date__lte=date_to)
+
+    with transaction.atomic():
+        unsettled = Order.objects.filter(
+            Q(status="paid") | Q(archived=True), settled_at__isnull=True
+        )
+        unsettled.filter(created_at__isnull=False).update(settled_at=F("created_at"))
+        undated = unsettled.count()
+
+        DailyTableSales.objects.filter(period).delete()
+        DailyProductSales.objects.filter(period).delete()
+
+        orders = (
+            Order.objects.filter(settled_at__isnull=False)
+            .annotate(date=TruncDate("settled_at"))
+            .filter(period)
+            .values("date", "table_number")
+            .annotate(
+                orders_count=Count("id"),
+                revenue=Coalesce(
+                    Sum("total_price"), Value(Decimal("0")), output_field=PRICE_FIELD
+                ),
+            )
+            .order_by()
+        )
+        tables = _bulk_insert(
+            DailyTableSales,
+            (
+                DailyTableSales(
+                    date=row["date"],
+                    table_id=row["table_number"],
+                    orders_count=row["orders_count"],
+                    revenue=row["revenue"],
+                )
+                for row in orders.iterator(chunk_size=batch_size)
+            ),
+            batch_size,
+        )
+
+        lines = (
+            OrderItem.objects.filter(order__settled_at__isnull=False)
+            .annotate(date=TruncDate("order__settled_at"))
+            .filter(period)
+            .values("date", "product")
+            .annotate(quantity_sum=Sum("quantity"), revenue=items_total())
+            .order_by()
+        )
+        products = _bulk_insert(
+            DailyProductSales,
+            (
+                DailyProductSales(
+                    date=row["date"],
+                    product_id=row["product"],
+                    quantity=row["quantity_sum"],
+                    revenue=row["revenue"],
+                )
+                for row in lines.iterator(chunk_size=batch_size)
+            ),
+            batch_size,
+        )
+    return tables, products, undated
+
+
+def _bulk_insert(model, objects, batch_size):
+    """Вставляет объекты пачками, не собирая их все в памяти."""
+    total = 0
+    batch = []
+    for obj in objects:
+        batch.append(obj)
+        if len(batch) >= batch_size:
+            model.objects.bulk_create(batch)
+            total += len(batch)
+            batch = []
+    if batch:
+        model.objects.bulk_create(batch)
+        total += len(batch)
+    return total
@@ -0,0 +1,144 @@
+"""
+Поиск блюд по названию для подсказок при вводе.
+
+Индекс строится в памяти процесса по строкам меню из кэша и живёт, пока
+не сменится версия меню, — то есть до сохранения или удаления любого
+блюда. Названия приводятся к одному виду (без учёта регистра, в том числе
+кириллицы, «ё» как «е»), поэтому поиск не зависит от того, как база
+сравнивает строки: `LIKE` в SQLite без учёта регистра работает только
+для латиницы. Запрос к индексу не обращается ни к базе, ни к кэшу меню,
+кроме чтения его версии.
+"""
+
+from bisect import bisect_left
+from collections import defaultdict
+
+from .cache import get_cached_products, get_products_version
+from .models import Product
+
+# Длина n-грамм индекса подстрок.
+GRAM_SIZE = 3
+
+_index = None
+
+
+def normalize(text):
+    """Приводит строку к виду для поиска: нижний регистр, «ё» как «е», пробелы."""
+    return " ".join(text.casefold().replace("ё", "е").split())
+
+
+class MenuIndex:
+    """
+    Поисковый индекс меню.
+
+    Атрибуты:
+        products: Словарь {id: (нормализованное название, название, цена)}.
+        names: Отсортированные пары (нормализованное название, id)
+               для поиска по началу названия.
+        words: Отсортированные пары (слово, id) для поиска по началу слова.
+        grams: Словарь {n-грамма: множество id} для поиска подстроки.
+    """
+
+    def __init__(self, rows):
+        self.products = {}
+        self.names, self.words = [], []
+        self.grams = defaultdict(set)
+        for pk, name, price in rows:
+            key = normalize(name)
+            self.products[pk] = (key, name, price)
+            self.names.append((key, pk))
+            self.words.extend((word, pk) for word in key.split()[1:])
+            for start in range(len(key) - GRAM_SIZE + 1):
+                self.grams[key[start : start + GRAM_SIZE]].add(pk)
+        self.names.sort()
+        self.words.sort()
+
+    def search(self, query, limit=10):
+        """
+        Ищет блюда, название которых содержит `query`.
+
+        Сначала идут блюда, название которых начинается с запроса, затем —
+        с совпадением в начале другого слова, затем — в середине слова;
+        внутри каждой группы — по алфавиту.
+
+        Возвращает:
+            list: Не больше `limit` идентификаторов блюд.
+        """
+        query = normalize(query)
+        if not query or limit < 1:
+            return []
+        found = []
+        seen = set()
+        groups = (
+            lambda: _prefixed(self.names, query),
+            lambda: self._sorted(_prefixed(self.words, query)),
+            lambda: self._sorted(self._containing(query)),
+        )
+        for group in groups:
+            for pk in group():
+                if pk not in seen:
+                    seen.add(pk)
+                    found.append(pk)
+                    if len(found) == limit:
+                        return found
+        return found
+
+    def _containing(self, query):
+        """Блюда с подстрокой `query`: кандидаты по n-граммам, затем проверка."""
+        if len(query) < GRAM_SIZE:
+            candidates = self.products
+        else:
+            postings = sorted(
+                (
+                    self.grams.get(query[start : start + GRAM_SIZE], set())
+                    for start in range(len(query) - GRAM_SIZE + 1)
+                ),
+                key=len,
+            )
+            candidates = set.intersection(*postings)
+        return [pk for pk in candidates if query in self.products[pk][0]]
+
+    def _sorted(self, pks):
+        return sorted(set(pks), key=lambda pk: self.products[pk][0])
+
+
+def _prefixed(entries, prefix):
+    """Идентификаторы из отсортированных пар, ключ которых начинается с `prefix`."""
+    position = bisect_left(entries, (prefix,))
+    while position < len(entries) and entries[position][0].startswith(prefix):
+        yield entries[position][1]
+        position += 1
+
+
+def get_menu_index():
+    """
+    Возвращает индекс текущей версии меню, при смене версии строит новый.
+
+    Строки меню берутся из кэша меню, поэтому после изменения блюд база
+    читается один раз на все процессы, а не каждым процессом.
+    """
+    global _index
+    version = get_products_version()
+    if _index is None or _index[0] != version:
+        rows = get_cached_products(
+            "search:rows",
+            lambda: list(Product.objects.values_list("pk", "name", "price")),
+            version=version,
+        )
+        _index = (version, MenuIndex(rows))
+    return _index[1]
+
+
+def search_products(query, limit=10):
+    """
+    Блюда для подсказки по запросу `query`.
+
+    Возвращает:
+        list: Словари `{"id", "name", "price"}`, цена — строка.
+    """
+    index = get_menu_index()
+    results = []
+    for pk in index.search(query, limit):
+        _, name, price = index.products[pk]
+        results.append({"id": pk, "name": name, "price": f"{price:f}"})
+    return results
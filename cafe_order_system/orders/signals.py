@@ -0,0 +1,86 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import invalidate_products_on_commit, invalidate_tables_on_commit
+from .events import order_event, publish_order_events
+from .models import Order, Product, Table
+from .rollups import record_sales_on_commit
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def product_changed(sender, **kwargs):
+    """Сбрасывает кэш меню и обновляет снимок меню при изменении продукта."""
+    invalidate_products_on_commit()
+
+
+@receiver(post_save, sender=Order)
+def order_saved(sender, instance, created, **kwargs):
+    """
+    Публикует событие заказа после фиксации транзакции.
+
+    Событие определяется по сравнению с состоянием, загруженным из базы:
+    создание, архивация или смена статуса. Сохранения без таких изменений
+    (например, пересчёт стоимости) событий не порождают.
+    """
+    loaded = getattr(instance, "_loaded_state", None)
+    if created:
+        event = "created"
+    elif loaded is None:
+        event = "updated"
+    elif instance.archived and not loaded.get("archived"):
+        event = "archived"
+    elif instance.status != loaded.get("status"):
+        event = "status"
+    else:
+        event = None
+
+    tables = occupancy_tables(instance, created, loaded)
+    if tables:
+        Table.objects.filter(pk__in=tables).sync_occupancy()
+    invalidate_tables_on_commit()
+
+    instance.remember_state()
+    if getattr(instance, "_just_settled", False):
+        instance._just_settled = False
+        record_sales_on_commit([instance.pk])
+    if event is not None:
+        publish_order_events([order_event(event, instance)])
+
+
+@receiver(post_delete, sender=Order)
+def order_deleted(sender, instance, **kwargs):
+    """
+    Освобождает стол, если удалён его последний открытый заказ. Удаление
+    архивного заказа (очистка архива) занятость и зал не меняет.
+    """
+    if instance.archived:
+        return
+    Table.objects.filter(pk=instance.table_number_id).sync_occupancy()
+    invalidate_tables_on_commit()
+
+
+def occupancy_tables(order, created, loaded):
+    """
+    Возвращает столы, занятость которых могла измениться после сохранения
+    заказа: при создании, открытии или закрытии заказа и при пересадке.
+    """
+    if created or loaded is None:
+        return {order.table_number_id}
+    was_open = not (
+        loaded.get("status", order.status) == "paid"
+        or loaded.get("archived", order.archived)
+    )
+    previous = loaded.get("table_number_id", order.table_number_id)
+    if previous != order.table_number_id:
+        return {previous, order.table_number_id}
+    if was_open != (not order.is_settled):
+        return {order.table_number_id}
+    return set()
+
+
+@receiver(post_save, sender=Table)
+@receiver(post_delete, sender=Table)
+def table_changed(sender, **kwargs):
+    """Сбрасывает кэш зала при сохранении или удалении стола."""
+    invalidate_tables_on_commit()
@@ -1,6 +1,43 @@
-from django.test import TestCase
+import asyncio
+import csv
+import json
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock, skipUnless
+
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.template.loader import render_to_string
+from django.test import TestCase, TransactionTestCase, override_settings
 from django.urls import reverse
-from .models import Order, Table, Product
+from django.utils import timezone
+from .cache import get_cached_tables, get_products_version
+from .events import CHANNEL, LocalBroadcast, RedisBroadcast
+from .forms import OrderItemFormSet
+from .models import (
+    DailyProductSales,
+    DailyTableSales,
+    Job,
+    Order,
+    OrderConflictError,
+    OrderItem,
+    Table,
+    Product,
+)
+from .jobs import claim_jobs, enqueue, requeue_stale, run_job, run_pending, task
+from .retention import read_archive
+from .totals import order_chunks, recompute_totals
+
+
+@task(name="tests.flaky", max_attempts=2)
+def flaky_job(fail: bool, number: int = 99) -> None:
+    """Тестовая задача: падает, если `fail`, иначе создаёт стол `number`."""
+    if fail:
+        raise RuntimeError("kitchen printer is offline")
+    Table.objects.create(number=number)
 
 
 class BaseTestCase(TestCase):
@@ -10,7 +47,8 @@ class BaseTestCase(TestCase):
     Подготавливает общие объекты:
     - Стол с номером 1
     - Продукт "Маргарита" с ценой 500
-    - Заказ со статусом "waiting", не архивирован, привязан к столу и продукту
+    - Заказ со статусом "waiting", не архивирован, привязан к столу,
+      с одной позицией продукта по цене 500
     Используется всеми другими классами тестов через наследование.
     """
 
@@ -22,7 +60,9 @@ class BaseTestCase(TestCase):
         cls.order = Order.objects.create(
             status="waiting", table_number=cls.table, archived=False
         )
-        cls.order.products.add(cls.product)
+        OrderItem.objects.create(
+            order=cls.order, product=cls.product, quantity=1, unit_price=500
+        )
 
 
 class OrderListViewTest(BaseTestCase):
@@ -66,6 +106,147 @@ class OrderListViewTest(BaseTestCase):
         self.order.calculate_total_price()
         self.assertEqual(self.order.total_price, 500)
 
+    def test_total_price_uses_quantity_and_price_snapshot(self) -> None:
+        """
+        Проверяет, что стоимость считается по количеству и цене на момент заказа,
+        а не по текущей цене продукта в меню.
+        """
+        OrderItem.objects.filter(order=self.order).update(quantity=3)
+        Product.objects.filter(pk=self.product.pk).update(price=900)
+
+        with self.assertNumQueries(1):
+            self.order.calculate_total_price()
+        self.assertEqual(self.order.total_price, 1500)
+
+    def test_update_totals_single_query(self) -> None:
+        """Проверяет, что update_totals пересчитывает стоимость одним UPDATE."""
+        empty_order = Order.objects.create(table_number=self.table, total_price=100)
+
+        with self.assertNumQueries(1):
+            Order.objects.filter(
+                pk__in=[self.order.pk, empty_order.pk]
+            ).update_totals()
+
+        self.order.refresh_from_db()
+        empty_order.refresh_from_db()
+        self.assertEqual(self.order.total_price, 500)
+        self.assertEqual(empty_order.total_price, 0)
+
+
+class OrderListPaginationTest(BaseTestCase):
+    """
+    Тесты постраничного вывода и фильтрации списка заказов.
+    Проверяет страницы по ключу, фильтры и постоянное число запросов.
+    """
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        """Добавляет второй стол и ещё 24 заказа с позициями."""
+        super().setUpTestData()
+        cls.other_table = Table.objects.create(number=2)
+        for index in range(24):
+            order = Order.objects.create(
+                table_number=cls.other_table if index % 2 else cls.table,
+                status="ready" if index % 3 == 0 else "waiting",
+            )
+            OrderItem.objects.create(
+                order=order, product=cls.product, quantity=2, unit_price=500
+            )
+
+    def test_first_page_is_newest_orders(self) -> None:
+        """Проверяет, что первая страница содержит 20 самых новых заказов."""
+        response = self.client.get(reverse("orders:order_list"))
+        ids = [order.id for order in response.context["order_list"]]
+        expected = list(
+            Order.objects.order_by("-pk").values_list("pk", flat=True)[:20]
+        )
+        self.assertEqual(ids, expected)
+        self.assertIn("after=", response.context["next_query"])
+
+    def test_next_page_continues_after_cursor(self) -> None:
+        """Проверяет, что следующая страница начинается после курсора."""
+        first = self.client.get(reverse("orders:order_list"))
+        second = self.client.get(
+            reverse("orders:order_list") + "?" + first.context["next_query"]
+        )
+        first_ids = {order.id for order in first.context["order_list"]}
+        second_ids = {order.id for order in second.context["order_list"]}
+
+        self.assertEqual(len(second_ids), 5)
+        self.assertFalse(first_ids & second_ids)
+        self.assertIsNone(second.context["next_query"])
+
+    def test_filters_by_status_and_table(self) -> None:
+        """Проверяет фильтрацию списка по статусу и номеру стола."""
+        response = self.client.get(
+            reverse("orders:order_list"), {"status": "ready", "table": 2}
+        )
+        orders = response.context["order_list"]
+        self.assertTrue(orders)
+        for order in orders:
+            self.assertEqual(order.status, "ready")
+            self.assertEqual(order.table_number.number, 2)
+
+    def test_page_query_count_is_constant(self) -> None:
+        """
+        Проверяет, что страница списка выполняет фиксированное число запросов:
+        заказы со столами и позиции с блюдами, а с блоками в кэше — только
+        заказы.
+        """
+        cache.clear()
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse("orders:order_list"))
+            response.render()
+
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("orders:order_list"))
+            response.render()
+
+
+@skipUnless(connection.vendor == "sqlite", "План запроса проверяется на SQLite")
+class OrderIndexQueryPlanTest(BaseTestCase):
+    """
+    Тесты планов запросов к рабочему набору заказов.
+    Проверяет, что выборки списка и кухни идут по частичным индексам
+    без полного просмотра таблицы и без отдельной сортировки.
+    """
+
+    def assertUsesIndex(self, queryset, index_name: str) -> None:
+        """Проверяет, что план запроса использует индекс и не сортирует отдельно."""
+        plan = queryset.explain()
+        self.assertIn(f"USING INDEX {index_name}", plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+
+    def active_orders(self):
+        """Возвращает выборку неархивированных заказов от новых к старым."""
+        return Order.objects.filter(archived=False).order_by("-pk")
+
+    def test_order_list_uses_active_index(self) -> None:
+        """Проверяет план запроса списка неархивированных заказов."""
+        self.assertUsesIndex(self.active_orders()[:21], "order_active_idx")
+
+    def test_status_filter_uses_status_index(self) -> None:
+        """Проверяет план запроса кухни: заказы с заданным статусом."""
+        self.assertUsesIndex(
+            self.active_orders().filter(status="waiting")[:21],
+            "order_active_status_idx",
+        )
+
+    def test_status_and_table_filter_uses_composite_index(self) -> None:
+        """Проверяет план запроса по статусу и столу."""
+        self.assertUsesIndex(
+            self.active_orders().filter(status="waiting", table_number__number=1)[
+                :21
+            ],
+            "order_active_status_table_idx",
+        )
+
+    def test_table_filter_avoids_full_scan(self) -> None:
+        """Проверяет, что выборка по столу не просматривает всю таблицу заказов."""
+        plan = self.active_orders().filter(table_number__number=1)[:21].explain()
+        self.assertNotIn("SCAN orders_order", plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+
 
 class OrderCreateViewTest(BaseTestCase):
     """
@@ -83,6 +264,70 @@ class OrderCreateViewTest(BaseTestCase):
         response = self.client.get(reverse("orders:order_create"))
         self.assertTemplateUsed(response, "orders/order_create_form.html")
 
+    def test_order_create_form_uses_menu_cache(self) -> None:
+        """
+        Проверяет, что список блюд в форме берётся из кэша меню
+        и обновляется после изменения продукта.
+        """
+        cache.clear()
+        self.client.get(reverse("orders:order_create"))
+
+        # Единственный запрос — список столов.
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("orders:order_create"))
+            response.render()
+
+        Product.objects.create(name="Кофе", price=150)
+        response = self.client.get(reverse("orders:order_create"))
+        self.assertContains(response, "Кофе | 150")
+
+    def test_order_create_with_quantities(self) -> None:
+        """
+        Проверяет, что POST-запрос создаёт заказ с позициями, фиксирует цену
+        продукта в позиции и вычисляет итоговую стоимость с учётом количества.
+        """
+        coffee = Product.objects.create(name="Кофе", price=150)
+        response = self.client.post(
+            reverse("orders:order_create"),
+            {
+                "table_number": self.table.pk,
+                "status": "waiting",
+                "items-TOTAL_FORMS": "2",
+                "items-INITIAL_FORMS": "0",
+                "items-MIN_NUM_FORMS": "1",
+                "items-MAX_NUM_FORMS": "1000",
+                "items-0-product": coffee.pk,
+                "items-0-quantity": "3",
+                "items-1-product": self.product.pk,
+                "items-1-quantity": "1",
+            },
+        )
+        self.assertRedirects(response, reverse("orders:order_list"))
+
+        order = Order.objects.exclude(pk=self.order.pk).get()
+        self.assertEqual(order.total_price, 950)
+        item = order.items.get(product=coffee)
+        self.assertEqual(item.quantity, 3)
+        self.assertEqual(item.unit_price, 150)
+
+    def test_order_create_requires_items(self) -> None:
+        """Проверяет, что заказ без позиций не создаётся."""
+        response = self.client.post(
+            reverse("orders:order_create"),
+            {
+                "table_number": self.table.pk,
+                "status": "waiting",
+                "items-TOTAL_FORMS": "1",
+                "items-INITIAL_FORMS": "0",
+                "items-MIN_NUM_FORMS": "1",
+                "items-MAX_NUM_FORMS": "1000",
+                "items-0-product": "",
+                "items-0-quantity": "1",
+            },
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Order.objects.count(), 1)
+
 
 class OrderDetailViewTest(BaseTestCase):
     """
@@ -153,6 +398,104 @@ class OrderUpdateViewTest(BaseTestCase):
         self.assertEqual(response.context["order_update"].table_number, self.table)
         self.assertIn(self.product, response.context["order_update"].products.all())
 
+    def test_update_keeps_price_snapshot(self) -> None:
+        """
+        Проверяет, что при изменении количества цена позиции остаётся прежней,
+        даже если цена продукта в меню изменилась, а итог пересчитывается.
+        """
+        item = self.order.items.get()
+        Product.objects.filter(pk=self.product.pk).update(price=900)
+
+        response = self.client.post(
+            reverse("orders:order_update", args=(self.order.id,)),
+            {
+                "table_number": self.table.pk,
+                "status": "ready",
+                "items-TOTAL_FORMS": "1",
+                "items-INITIAL_FORMS": "1",
+                "items-MIN_NUM_FORMS": "1",
+                "items-MAX_NUM_FORMS": "1000",
+                "items-0-id": item.pk,
+                "items-0-order": self.order.pk,
+                "items-0-product": self.product.pk,
+                "items-0-quantity": "2",
+            },
+        )
+        self.assertRedirects(response, reverse("orders:order_list"))
+
+        self.order.refresh_from_db()
+        item.refresh_from_db()
+        self.assertEqual(self.order.status, "ready")
+        self.assertEqual(item.unit_price, 500)
+        self.assertEqual(self.order.total_price, 1000)
+
+
+    def test_formset_loads_products_in_bulk(self) -> None:
+        """
+        Проверяет, что набор форм проверяет позиции одним запросом позиций
+        заказа и одним запросом блюд, сколько бы строк ни было отправлено,
+        и по-прежнему отклоняет неизвестное блюдо и повтор блюда.
+        """
+        item = self.order.items.get()
+        coffee = Product.objects.create(name="Кофе", price=150)
+        tea = Product.objects.create(name="Чай", price=100)
+        data = {
+            "items-TOTAL_FORMS": "3",
+            "items-INITIAL_FORMS": "1",
+            "items-MIN_NUM_FORMS": "1",
+            "items-MAX_NUM_FORMS": "1000",
+            "items-0-id": item.pk,
+            "items-0-order": self.order.pk,
+            "items-0-product": self.product.pk,
+            "items-0-quantity": "2",
+            "items-1-product": coffee.pk,
+            "items-1-quantity": "1",
+            "items-2-product": tea.pk,
+            "items-2-quantity": "1",
+        }
+        order = Order.objects.get(pk=self.order.pk)
+
+        with self.assertNumQueries(2):
+            formset = OrderItemFormSet(data, instance=order)
+            self.assertTrue(formset.is_valid())
+        self.assertEqual(formset.forms[0].cleaned_data["id"], item)
+        self.assertEqual(formset.forms[1].cleaned_data["product"], coffee)
+
+        unknown = OrderItemFormSet({**data, "items-2-product": "999"}, instance=order)
+        self.assertFalse(unknown.is_valid())
+        self.assertIn("product", unknown.forms[2].errors)
+        repeated = OrderItemFormSet(
+            {**data, "items-2-product": coffee.pk}, instance=order
+        )
+        self.assertFalse(repeated.is_valid())
+        self.assertTrue(repeated.non_form_errors())
+
+    def test_update_rejects_reopening_paid_order(self) -> None:
+        """Проверяет, что форма не возвращает оплаченный заказ в работу (400)."""
+        Order.objects.filter(pk=self.order.pk).update(status="paid")
+        item = self.order.items.get()
+
+        response = self.client.post(
+            reverse("orders:order_update", args=(self.order.id,)),
+            {
+                "table_number": self.table.pk,
+                "status": "waiting",
+                "items-TOTAL_FORMS": "1",
+                "items-INITIAL_FORMS": "1",
+                "items-MIN_NUM_FORMS": "1",
+                "items-MAX_NUM_FORMS": "1000",
+                "items-0-id": item.pk,
+                "items-0-order": self.order.pk,
+                "items-0-product": self.product.pk,
+                "items-0-quantity": "1",
+            },
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("status", response.context["form"].errors)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, "paid")
+
 
 class OrderDeleteViewTest(BaseTestCase):
     """
@@ -199,3 +542,1111 @@ class OrderDeleteViewTest(BaseTestCase):
         self.order.refresh_from_db()
         self.assertTrue(self.order.archived)
         self.assertRedirects(response, reverse("orders:order_list"))
+
+
+class ImportCatalogCommandTest(TestCase):
+    """
+    Тесты команды import_catalog.
+    Проверяет загрузку CSV и JSONL, обновление существующих записей,
+    пакетную запись и сообщения об ошибках.
+    """
+
+    def run_import(self, *args, stdin: str = "", **options) -> str:
+        """Запускает команду с данными из stdin и возвращает её вывод."""
+        stdout = StringIO()
+        call_command(
+            "import_catalog", *args, stdin=StringIO(stdin), stdout=stdout, **options
+        )
+        return stdout.getvalue()
+
+    def test_products_csv_upsert(self) -> None:
+        """Проверяет, что CSV создаёт новые продукты и обновляет цены существующих."""
+        Product.objects.create(name="Чай", price=100)
+
+        self.run_import("products", stdin="name,price\nЧай,120.50\nКофе,150\n")
+
+        self.assertEqual(Product.objects.count(), 2)
+        self.assertEqual(str(Product.objects.get(name="Чай").price), "120.50")
+        self.assertEqual(Product.objects.get(name="Кофе").price, 150)
+
+    def test_tables_jsonl_skips_existing(self) -> None:
+        """Проверяет, что JSONL добавляет столы и не дублирует существующие."""
+        Table.objects.create(number=1, is_occupied=True)
+
+        self.run_import(
+            "tables",
+            "--format=jsonl",
+            stdin='{"number": 1}\n{"number": 2}\n\n{"number": 3}\n',
+        )
+
+        self.assertEqual(
+            list(Table.objects.order_by("number").values_list("number", flat=True)),
+            [1, 2, 3],
+        )
+        self.assertTrue(Table.objects.get(number=1).is_occupied)
+
+    def test_one_query_per_batch_with_progress(self) -> None:
+        """Проверяет, что каждая пачка записывается одним запросом, с отчётом о ходе."""
+        rows = "".join(f"Блюдо {index},{index}\n" for index in range(250))
+
+        with self.assertNumQueries(3):
+            output = self.run_import(
+                "products", "--batch-size=100", stdin="name,price\n" + rows
+            )
+
+        self.assertEqual(Product.objects.count(), 250)
+        self.assertIn("Imported 100 products", output)
+        self.assertIn("Imported 250 products", output)
+
+    def test_products_import_invalidates_menu_cache(self) -> None:
+        """Проверяет, что импорт продуктов сменяет версию кэша меню."""
+        version = get_products_version()
+        self.run_import("products", stdin="name,price\nЧай,100\n")
+
+        self.assertNotEqual(get_products_version(), version)
+
+    def test_tables_import_invalidates_board_cache(self) -> None:
+        """Проверяет, что импорт столов сбрасывает закэшированное табло зала."""
+        count = Table.objects.count
+        self.assertEqual(get_cached_tables("test:board", count), 0)
+
+        self.run_import("tables", "--format=jsonl", stdin='{"number": 1}\n')
+
+        self.assertEqual(get_cached_tables("test:board", count), 1)
+
+    def test_duplicate_keys_in_batch(self) -> None:
+        """Проверяет, что повтор ключа внутри пачки не ломает запись."""
+        self.run_import("products", stdin="name,price\nЧай,100\nЧай,110\n")
+
+        self.assertEqual(Product.objects.get().price, 110)
+
+    def test_invalid_row_reports_line(self) -> None:
+        """Проверяет, что ошибка в строке сообщает её номер."""
+        with self.assertRaisesMessage(CommandError, "line 3"):
+            self.run_import("products", stdin="name,price\nЧай,100\nКофе,дорого\n")
+
+    def test_unusable_price_reports_line(self) -> None:
+        """Проверяет, что NaN, бесконечность и лишние знаки цены — ошибки строки."""
+        for price in ("NaN", "Infinity", "12345678901", "1.005"):
+            with self.assertRaisesMessage(CommandError, "line 2: price"):
+                self.run_import("products", stdin=f"name,price\nЧай,{price}\n")
+
+        self.assertFalse(Product.objects.exists())
+
+    def test_failed_import_invalidates_written_batches(self) -> None:
+        """
+        Проверяет, что при ошибке в середине файла пачки, записанные до неё,
+        видны в меню: версия кэша меню сменилась.
+        """
+        version = get_products_version()
+        with self.assertRaises(CommandError):
+            self.run_import(
+                "products",
+                "--batch-size=2",
+                stdin="name,price\nЧай,100\nКофе,150\nСок,дорого\n",
+            )
+
+        self.assertEqual(Product.objects.count(), 2)
+        self.assertNotEqual(get_products_version(), version)
+
+    def test_reads_file(self) -> None:
+        """Проверяет импорт из файла с определением формата по расширению."""
+        with tempfile.NamedTemporaryFile(
+            "w", suffix=".jsonl", encoding="utf-8", delete=False
+        ) as file:
+            file.write('{"name": "Борщ", "price": "300"}\n')
+        self.addCleanup(os.unlink, file.name)
+        self.run_import("products", file.name)
+
+        self.assertEqual(Product.objects.get().name, "Борщ")
+
+
+class OrderEventsTest(BaseTestCase):
+    """
+    Тесты событий заказов.
+    Проверяет публикацию событий после фиксации транзакции
+    и их доставку подписчикам через поток SSE.
+    """
+
+    def setUp(self) -> None:
+        """Подменяет рассылку записывающим объектом."""
+        self.published = []
+        patcher = mock.patch("orders.events.get_broadcast")
+        get_broadcast = patcher.start()
+        get_broadcast.return_value.publish_many.side_effect = self.published.extend
+        self.addCleanup(patcher.stop)
+        self.broadcast = get_broadcast.return_value
+
+    def events(self) -> list:
+        """Возвращает пары (событие, заказ) из опубликованных сообщений."""
+        return [(message["event"], message["order"]) for message in self.published]
+
+    def test_status_change_and_archive_events(self) -> None:
+        """Проверяет события смены статуса и архивации после фиксации транзакции."""
+        order = Order.objects.get(pk=self.order.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            order.status = "ready"
+            order.save()
+            self.assertEqual(self.published, [])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse("orders:order_delete", args=(order.id,)))
+
+        self.assertEqual(self.events(), [("status", order.pk), ("archived", order.pk)])
+        self.assertEqual(self.published[0]["status"], "ready")
+
+    def test_broadcast_failure_does_not_fail_write(self) -> None:
+        """Проверяет, что ошибка рассылки после фиксации не ломает сохранение."""
+        self.broadcast.publish_many.side_effect = ConnectionError
+        order = Order.objects.get(pk=self.order.pk)
+
+        with self.assertLogs("django", "ERROR"):
+            with self.captureOnCommitCallbacks(execute=True):
+                order.status = "ready"
+                order.save()
+
+        self.assertEqual(Order.objects.get(pk=order.pk).status, "ready")
+
+    def test_redis_publishes_batch_through_pipeline(self) -> None:
+        """Проверяет, что RedisBroadcast шлёт пачку конвейером одного клиента."""
+        broadcast = RedisBroadcast(url="redis://localhost")
+        broadcast._client = client = mock.Mock()
+
+        broadcast.publish_many([{"order": 1}, {"order": 2}])
+        broadcast.publish({"order": 3})
+
+        pipeline = client.pipeline.return_value
+        self.assertEqual(client.pipeline.call_count, 2)
+        self.assertEqual(pipeline.publish.call_count, 3)
+        self.assertEqual(pipeline.execute.call_count, 2)
+        pipeline.publish.assert_any_call(CHANNEL, json.dumps({"order": 2}))
+
+    def test_save_without_state_change_is_silent(self) -> None:
+        """Проверяет, что пересчёт стоимости не порождает событий."""
+        order = Order.objects.get(pk=self.order.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            order.calculate_total_price()
+            order.save(update_fields=["total_price"])
+
+        self.assertEqual(self.published, [])
+
+    def test_bulk_create_publishes_created(self) -> None:
+        """Проверяет события создания для пакетной вставки заказов."""
+        with self.captureOnCommitCallbacks(execute=True):
+            orders = Order.objects.create_with_items(
+                [
+                    (
+                        Order(table_number=self.table),
+                        [OrderItem(product=self.product, quantity=2)],
+                    )
+                ]
+            )
+
+        self.assertEqual(self.events(), [("created", orders[0].pk)])
+
+
+class OrderEventStreamTest(TestCase):
+    """
+    Тесты потока событий заказов (order_events) под ASGI.
+    Использует рассылку внутри процесса, Redis не нужен.
+    """
+
+    async def test_stream_delivers_published_events(self) -> None:
+        """
+        Проверяет, что подключившийся клиент получает опубликованное событие
+        в формате Server-Sent Events.
+        """
+        broadcast = LocalBroadcast()
+        with mock.patch("orders.views.get_broadcast", return_value=broadcast):
+            response = await self.async_client.get(reverse("orders:order_events"))
+            self.assertEqual(response["Content-Type"], "text/event-stream")
+
+            stream = aiter(response.streaming_content)
+            self.assertEqual(await anext(stream), b": connected\n\n")
+
+            broadcast.publish({"event": "created", "order": 7, "status": "waiting"})
+            chunk = await asyncio.wait_for(anext(stream), 1)
+            await stream.aclose()
+
+        event, data = chunk.decode().strip().split("\n")
+        self.assertEqual(event, "event: order.created")
+        self.assertEqual(json.loads(data.removeprefix("data: "))["order"], 7)
+
+
+    async def test_keepalive_read_per_request(self) -> None:
+        """Проверяет, что интервал пинга берётся из настроек при подключении."""
+        with (
+            mock.patch("orders.views.get_broadcast", return_value=LocalBroadcast()),
+            override_settings(ORDER_EVENTS_KEEPALIVE=0.01),
+        ):
+            response = await self.async_client.get(reverse("orders:order_events"))
+            stream = aiter(response.streaming_content)
+            await anext(stream)
+            chunk = await asyncio.wait_for(anext(stream), 1)
+            await stream.aclose()
+
+        self.assertEqual(chunk, b": keepalive\n\n")
+
+    async def test_redis_reader_failure_reaches_subscriber(self) -> None:
+        """
+        Проверяет, что обрыв чтения канала Redis выбрасывается подписчику
+        после уже полученных сообщений, а подписка закрывается.
+        """
+
+        async def listen():
+            yield {"type": "subscribe", "data": 1}
+            yield {"type": "message", "data": json.dumps({"order": 7})}
+            raise ConnectionError("connection lost")
+
+        redis = mock.MagicMock()
+        client = redis.asyncio.Redis.from_url.return_value
+        client.aclose = mock.AsyncMock()
+        pubsub = client.pubsub.return_value
+        pubsub.subscribe = mock.AsyncMock()
+        pubsub.unsubscribe = mock.AsyncMock()
+        pubsub.aclose = mock.AsyncMock()
+        pubsub.listen = listen
+        broadcast = RedisBroadcast(url="redis://localhost")
+
+        modules = {"redis": redis, "redis.asyncio": redis.asyncio}
+        with mock.patch.dict("sys.modules", modules):
+            async with broadcast.subscribe() as queue:
+                message = await asyncio.wait_for(queue.get(), 1)
+                with self.assertRaisesMessage(ConnectionError, "connection lost"):
+                    await asyncio.wait_for(queue.get(), 1)
+
+        self.assertEqual(message, {"order": 7})
+        pubsub.aclose.assert_awaited_once()
+        client.aclose.assert_awaited_once()
+
+
+class SalesRollupTest(BaseTestCase):
+    """
+    Тесты дневных сводок продаж.
+    Проверяет пополнение сводок при оплате и архивации заказа,
+    отсутствие повторного учёта и пересборку командой backfill_sales.
+    """
+
+    def settle(self, order: Order, **changes) -> None:
+        """
+        Изменяет заказ, выполняет отложенные до фиксации действия
+        и фоновые задачи.
+        """
+        with self.captureOnCommitCallbacks(execute=True):
+            for field, value in changes.items():
+                setattr(order, field, value)
+            order.save()
+        run_pending()
+
+    def test_paid_order_is_rolled_up(self) -> None:
+        """Проверяет, что оплата заказа добавляет его в сводки по столу и блюду."""
+        OrderItem.objects.filter(order=self.order).update(quantity=2)
+        Order.objects.filter(pk=self.order.pk).update_totals()
+        order = Order.objects.get(pk=self.order.pk)
+
+        self.settle(order, status="paid")
+
+        order.refresh_from_db()
+        table_sales = DailyTableSales.objects.get()
+        product_sales = DailyProductSales.objects.get()
+        self.assertEqual(table_sales.date, order.settled_at.date())
+        self.assertEqual(table_sales.table, self.table)
+        self.assertEqual(table_sales.orders_count, 1)
+        self.assertEqual(table_sales.revenue, 1000)
+        self.assertEqual(product_sales.product, self.product)
+        self.assertEqual(product_sales.quantity, 2)
+        self.assertEqual(product_sales.revenue, 1000)
+
+    def test_order_counted_once(self) -> None:
+        """Проверяет, что оплаченный, а затем архивированный заказ учтён один раз."""
+        Order.objects.filter(pk=self.order.pk).update_totals()
+        order = Order.objects.get(pk=self.order.pk)
+        self.settle(order, status="paid")
+        self.settle(order, archived=True)
+
+        other = Order.objects.create(table_number=self.table)
+        OrderItem.objects.create(
+            order=other, product=self.product, quantity=1, unit_price=500
+        )
+        Order.objects.filter(pk=other.pk).update_totals()
+        self.settle(Order.objects.get(pk=other.pk), archived=True)
+
+        table_sales = DailyTableSales.objects.get()
+        self.assertEqual(table_sales.orders_count, 2)
+        self.assertEqual(table_sales.revenue, 1000)
+        self.assertEqual(DailyProductSales.objects.get().quantity, 2)
+
+    def test_open_order_is_not_rolled_up(self) -> None:
+        """Проверяет, что смена статуса на «готово» не затрагивает сводки."""
+        self.settle(Order.objects.get(pk=self.order.pk), status="ready")
+
+        self.assertFalse(DailyTableSales.objects.exists())
+
+    def test_backfill_rebuilds_rollups(self) -> None:
+        """
+        Проверяет, что команда backfill_sales пересобирает сводки
+        и учитывает заказы, закрытые до появления сводок.
+        """
+        Order.objects.filter(pk=self.order.pk).update_totals()
+        self.settle(Order.objects.get(pk=self.order.pk), status="paid")
+        legacy = Order.objects.create(table_number=self.table, archived=True)
+        OrderItem.objects.create(
+            order=legacy, product=self.product, quantity=1, unit_price=500
+        )
+        Order.objects.filter(pk=legacy.pk).update(total_price=500, settled_at=None)
+        DailyTableSales.objects.update(orders_count=0, revenue=0)
+
+        call_command("backfill_sales", stdout=StringIO())
+
+        legacy.refresh_from_db()
+        self.assertEqual(legacy.settled_at, legacy.created_at)
+        table_sales = DailyTableSales.objects.get()
+        self.assertEqual(table_sales.orders_count, 2)
+        self.assertEqual(table_sales.revenue, 1000)
+        self.assertEqual(DailyProductSales.objects.get().quantity, 2)
+
+    def test_archiving_legacy_paid_order_is_not_rolled_up(self) -> None:
+        """
+        Проверяет, что архивация заказа, оплаченного до появления
+        `settled_at`, не считает его закрытым сегодня.
+        """
+        Order.objects.filter(pk=self.order.pk).update(
+            status="paid", total_price=500, settled_at=None
+        )
+
+        self.settle(Order.objects.get(pk=self.order.pk), archived=True)
+
+        order = Order.objects.get(pk=self.order.pk)
+        self.assertTrue(order.archived)
+        self.assertIsNone(order.settled_at)
+        self.assertFalse(DailyTableSales.objects.exists())
+
+    def test_backfill_skips_undated_orders(self) -> None:
+        """
+        Проверяет, что заказы, закрытые до появления дат, не попадают
+        в сводки одним днём, а команда сообщает об их количестве.
+        """
+        Order.objects.filter(pk=self.order.pk).update(
+            status="paid", total_price=500, created_at=None, settled_at=None
+        )
+        out = StringIO()
+
+        call_command("backfill_sales", stdout=out)
+
+        self.assertIsNone(Order.objects.get(pk=self.order.pk).settled_at)
+        self.assertFalse(DailyTableSales.objects.exists())
+        self.assertIn("1 settled orders predate order dates", out.getvalue())
+        with self.assertRaisesMessage(CommandError, "argument --date-from"):
+            call_command("backfill_sales", "--date-from", "yesterday")
+
+        content = b"".join(
+            self.client.get(reverse("orders:order_export")).streaming_content
+        )
+        self.assertIn(f"{self.order.pk},,,1,paid".encode(), content)
+
+
+class OrderConcurrencyTest(BaseTestCase):
+    """
+    Тесты оптимистичной блокировки заказа.
+    Проверяет, что устаревшая версия заказа не затирает чужие изменения.
+    """
+
+    def update_data(self, **extra):
+        item = self.order.items.get()
+        return {
+            "table_number": self.table.pk,
+            "status": "ready",
+            "items-TOTAL_FORMS": "1",
+            "items-INITIAL_FORMS": "1",
+            "items-MIN_NUM_FORMS": "1",
+            "items-MAX_NUM_FORMS": "1000",
+            "items-0-id": item.pk,
+            "items-0-order": self.order.pk,
+            "items-0-product": self.product.pk,
+            "items-0-quantity": "3",
+            **extra,
+        }
+
+    def test_save_increments_version(self) -> None:
+        """Проверяет, что каждое сохранение увеличивает версию заказа."""
+        self.order.status = "ready"
+        self.order.save()
+        self.assertEqual(self.order.version, 2)
+        self.assertEqual(Order.objects.get(pk=self.order.pk).version, 2)
+
+    def test_stale_instance_raises_conflict(self) -> None:
+        """Проверяет, что сохранение прочитанной ранее копии заказа отклоняется."""
+        kitchen = Order.objects.get(pk=self.order.pk)
+        waiter = Order.objects.get(pk=self.order.pk)
+        kitchen.status = "ready"
+        kitchen.save()
+
+        waiter.table_number = Table.objects.create(number=2)
+        with self.assertRaises(OrderConflictError), transaction.atomic():
+            waiter.save()
+        self.assertEqual(Order.objects.get(pk=self.order.pk).table_number, self.table)
+
+    def test_update_form_renders_version(self) -> None:
+        """Проверяет, что форма редактирования содержит текущую версию."""
+        response = self.client.get(
+            reverse("orders:order_update", args=(self.order.pk,))
+        )
+        self.assertContains(response, 'name="version" value="1"')
+
+    def test_update_with_stale_version_returns_conflict(self) -> None:
+        """
+        Проверяет, что форма с устаревшей версией возвращает 409 с ошибкой,
+        а ни заказ, ни его позиции не меняются.
+        """
+        Order.objects.filter(pk=self.order.pk).update(version=2)
+
+        response = self.client.post(
+            reverse("orders:order_update", args=(self.order.pk,)),
+            self.update_data(version="1"),
+        )
+
+        self.assertEqual(response.status_code, 409)
+        self.assertContains(
+            response, "Заказ был изменён другим пользователем", status_code=409
+        )
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, "waiting")
+        self.assertEqual(self.order.items.get().quantity, 1)
+
+    def test_update_with_current_version(self) -> None:
+        """Проверяет, что форма с актуальной версией сохраняется."""
+        response = self.client.post(
+            reverse("orders:order_update", args=(self.order.pk,)),
+            self.update_data(version="1"),
+        )
+
+        self.assertRedirects(response, reverse("orders:order_list"))
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.version, 2)
+        self.assertEqual(self.order.total_price, 1500)
+
+    def test_delete_with_stale_version_returns_conflict(self) -> None:
+        """Проверяет, что архивация по устаревшей версии возвращает 409."""
+        Order.objects.filter(pk=self.order.pk).update(version=2)
+
+        response = self.client.post(
+            reverse("orders:order_delete", args=(self.order.pk,)), {"version": "1"}
+        )
+
+        self.assertEqual(response.status_code, 409)
+        self.order.refresh_from_db()
+        self.assertFalse(self.order.archived)
+
+
+class TableOccupancyTest(BaseTestCase):
+    """
+    Тесты занятости столов.
+    Проверяет, что флаг is_occupied следует за открытыми заказами стола.
+    """
+
+    def assertOccupied(self, table, expected) -> None:
+        table.refresh_from_db()
+        self.assertIs(table.is_occupied, expected)
+
+    def test_order_create_occupies_table(self) -> None:
+        """Проверяет, что новый заказ занимает свободный стол."""
+        table = Table.objects.create(number=2)
+        Order.objects.create(table_number=table)
+        self.assertOccupied(table, True)
+
+    def test_payment_frees_table(self) -> None:
+        """Проверяет, что оплата последнего открытого заказа освобождает стол."""
+        self.order.status = "paid"
+        self.order.save()
+        self.assertOccupied(self.table, False)
+
+    def test_table_busy_while_other_order_open(self) -> None:
+        """Проверяет, что стол остаётся занятым, пока открыт другой заказ."""
+        Order.objects.create(table_number=self.table)
+        self.order.status = "paid"
+        self.order.save()
+        self.assertOccupied(self.table, True)
+
+    def test_archive_view_frees_table(self) -> None:
+        """Проверяет, что архивация заказа через интерфейс освобождает стол."""
+        self.client.post(reverse("orders:order_delete", args=[self.order.pk]))
+        self.assertOccupied(self.table, False)
+
+    def test_moving_order_updates_both_tables(self) -> None:
+        """Проверяет пересадку: старый стол освобождается, новый занимается."""
+        table = Table.objects.create(number=2)
+        self.order.table_number = table
+        self.order.save()
+        self.assertOccupied(self.table, False)
+        self.assertOccupied(table, True)
+
+    def test_status_change_without_closing_keeps_table(self) -> None:
+        """Проверяет, что смена статуса без закрытия не трогает столы."""
+        self.order.status = "ready"
+        with self.assertNumQueries(1):
+            self.order.save()
+        self.assertOccupied(self.table, True)
+
+
+class RequestMetricsTest(BaseTestCase):
+    """
+    Тесты метрик запросов (RequestMetricsMiddleware).
+    Проверяет заголовок Server-Timing, бюджеты запросов к базе для страниц
+    заказов и журнал медленных запросов.
+    """
+
+    # Наибольшее допустимое число запросов к базе на страницу.
+    QUERY_BUDGETS = {
+        "orders:order_list": 2,
+        "orders:order_detail": 2,
+        "orders:order_create": 2,
+        "orders:order_update": 3,
+    }
+
+    def get(self, name):
+        """Открывает страницу; страницам одного заказа передаёт его pk."""
+        if name in ("orders:order_detail", "orders:order_update"):
+            return self.client.get(reverse(name, args=(self.order.pk,)))
+        return self.client.get(reverse(name))
+
+    def test_server_timing_header(self) -> None:
+        """Проверяет, что ответ содержит время SQL, представления и шаблона."""
+        response = self.client.get(reverse("orders:order_list"))
+        timing = response["Server-Timing"]
+        self.assertIn(f'desc="{response.metrics.queries} queries"', timing)
+        for metric in ("db;dur=", "view;dur=", "render;dur=", "total;dur="):
+            self.assertIn(metric, timing)
+
+    def test_query_budgets(self) -> None:
+        """Проверяет, что страницы укладываются в бюджет запросов к базе."""
+        for name, budget in self.QUERY_BUDGETS.items():
+            with self.subTest(view=name):
+                response = self.get(name)
+                self.assertEqual(response.status_code, 200)
+                self.assertLessEqual(response.metrics.queries, budget)
+
+    def test_order_list_queries_do_not_grow(self) -> None:
+        """Проверяет, что число запросов списка не зависит от числа заказов."""
+        before = self.get("orders:order_list").metrics.queries
+        for _ in range(5):
+            order = Order.objects.create(table_number=self.table)
+            OrderItem.objects.create(
+                order=order, product=self.product, quantity=2, unit_price=500
+            )
+        self.assertEqual(self.get("orders:order_list").metrics.queries, before)
+
+    @override_settings(SLOW_REQUEST_THRESHOLD_MS=0)
+    def test_slow_request_logged(self) -> None:
+        """Проверяет структурированную запись о запросе дольше порога."""
+        with self.assertLogs("cafe_order_system.performance", "WARNING") as logs:
+            response = self.client.get(reverse("orders:order_list"))
+
+        record = logs.records[0].request_metrics
+        self.assertEqual(record["path"], reverse("orders:order_list"))
+        self.assertEqual(record["status"], 200)
+        self.assertEqual(record["queries"], response.metrics.queries)
+        self.assertEqual(json.loads(logs.records[0].getMessage()), record)
+
+
+class OrderFragmentCacheTest(BaseTestCase):
+    """
+    Тесты кэша отрисованных блоков заказов.
+    Проверяет повторное использование блоков и их обновление при изменении
+    заказа, блюд и стола.
+    """
+
+    def setUp(self) -> None:
+        cache.clear()
+        self.other = Order.objects.create(table_number=self.table)
+        OrderItem.objects.create(
+            order=self.other, product=self.product, quantity=2, unit_price=500
+        )
+
+    def render_list(self):
+        response = self.client.get(reverse("orders:order_list"))
+        return response.content.decode()
+
+    def test_unchanged_orders_reuse_fragments(self) -> None:
+        """Проверяет, что после изменения одного заказа перерисовывается только он."""
+        self.render_list()
+        self.other.status = "ready"
+        self.other.save()
+
+        with mock.patch(
+            "orders.cache.render_to_string", wraps=render_to_string
+        ) as render:
+            content = self.render_list()
+
+        self.assertEqual(render.call_count, 1)
+        self.assertEqual(render.call_args.args[1]["order"].pk, self.other.pk)
+        self.assertIn("статус: Готово", content)
+
+    def test_items_change_updates_fragment(self) -> None:
+        """Проверяет, что изменение позиций через форму видно в списке и карточке."""
+        self.render_list()
+        self.client.get(reverse("orders:order_detail", args=[self.other.pk]))
+        item = self.other.items.get()
+        self.client.post(
+            reverse("orders:order_update", args=[self.other.pk]),
+            {
+                "table_number": self.table.pk,
+                "status": "waiting",
+                "version": self.other.version,
+                "items-TOTAL_FORMS": 1,
+                "items-INITIAL_FORMS": 1,
+                "items-0-id": item.pk,
+                "items-0-product": self.product.pk,
+                "items-0-quantity": 3,
+            },
+        )
+
+        self.assertIn("Маргарита × 3", self.render_list())
+        detail = self.client.get(reverse("orders:order_detail", args=[self.other.pk]))
+        self.assertContains(detail, "Итоговая стоимость: 1500")
+
+    def test_product_and_table_changes_update_fragments(self) -> None:
+        """Проверяет, что переименование блюда и стола обновляет блоки."""
+        self.render_list()
+        self.product.name = "Пепперони"
+        self.product.save()
+        self.assertIn("Пепперони × 2", self.render_list())
+
+        self.table.number = 5
+        self.table.save()
+        self.assertIn("Номер стола: Стол #5", self.render_list())
+
+
+class RecomputeTotalsTest(BaseTestCase):
+    """
+    Тесты массового пересчёта стоимости заказов.
+    Проверяет пересчёт по частям, переоценку позиций открытых заказов
+    и команду recompute_totals.
+    """
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        """Добавляет оплаченный заказ и заказ с другим блюдом."""
+        super().setUpTestData()
+        cls.paid = Order.objects.create(
+            status="paid", table_number=cls.table, total_price=500
+        )
+        OrderItem.objects.create(
+            order=cls.paid, product=cls.product, quantity=1, unit_price=500
+        )
+        cls.other_product = Product.objects.create(name="Цезарь", price=300)
+        cls.other = Order.objects.create(table_number=cls.table, total_price=0)
+        OrderItem.objects.create(
+            order=cls.other, product=cls.other_product, quantity=2, unit_price=300
+        )
+
+    def test_chunks_cover_orders(self) -> None:
+        """Проверяет, что части не пересекаются и покрывают все заказы."""
+        chunks = [
+            sorted(chunk.values_list("pk", flat=True))
+            for chunk in order_chunks(Order.objects.all(), 2)
+        ]
+        self.assertEqual(chunks, [[self.order.pk, self.paid.pk], [self.other.pk]])
+
+    def test_only_stale_orders_change(self) -> None:
+        """
+        Проверяет, что пересчитываются только расходящиеся заказы
+        и их версия увеличивается.
+        """
+        changed, repriced = recompute_totals(chunk_size=1)
+
+        self.assertEqual((changed, repriced), (2, 0))
+        self.order.refresh_from_db()
+        self.other.refresh_from_db()
+        self.paid.refresh_from_db()
+        self.assertEqual(self.order.total_price, 500)
+        self.assertEqual(self.other.total_price, 600)
+        self.assertEqual((self.order.version, self.paid.version), (2, 1))
+        self.assertEqual(recompute_totals(), (0, 0))
+
+    def test_reprice_affected_open_orders(self) -> None:
+        """
+        Проверяет, что переоценка затрагивает только открытые заказы
+        с изменённым блюдом, а оплаченный заказ сохраняет прежнюю цену.
+        """
+        Product.objects.filter(pk=self.product.pk).update(price=550)
+
+        # Граница части, затем переоценка и пересчёт в одной транзакции.
+        with self.assertNumQueries(1 + 4):
+            changed, repriced = recompute_totals(
+                product_ids=[self.product.pk], reprice=True
+            )
+
+        self.assertEqual((changed, repriced), (1, 1))
+        self.order.refresh_from_db()
+        self.other.refresh_from_db()
+        self.paid.refresh_from_db()
+        self.assertEqual(self.order.total_price, 550)
+        self.assertEqual(self.order.items.get().unit_price, 550)
+        self.assertEqual(self.paid.total_price, 500)
+        self.assertEqual(self.other.total_price, 0)
+
+    def test_command_defaults_to_open_orders(self) -> None:
+        """Проверяет, что команда без --all не трогает закрытые заказы."""
+        Order.objects.filter(pk=self.paid.pk).update(total_price=0)
+        out = StringIO()
+
+        call_command("recompute_totals", "--chunk-size", "1", stdout=out)
+
+        self.paid.refresh_from_db()
+        self.assertEqual(self.paid.total_price, 0)
+        self.assertIn("2 orders changed, 0 items repriced", out.getvalue())
+
+        call_command("recompute_totals", "--all", stdout=out)
+        self.paid.refresh_from_db()
+        self.assertEqual(self.paid.total_price, 500)
+        self.assertIn("run backfill_sales", out.getvalue())
+
+    def test_command_rejects_bad_chunk_size(self) -> None:
+        """Проверяет, что команда отклоняет неположительный размер части."""
+        with self.assertRaises(CommandError):
+            call_command("recompute_totals", "--chunk-size", "0")
+
+
+class OrderRetentionTest(BaseTestCase):
+    """
+    Тесты хранения архива заказов.
+    Проверяет выгрузку старых архивных заказов в файл, их удаление
+    и чтение и восстановление из файла.
+    """
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        """Добавляет старый архивный заказ и свежий архивный заказ."""
+        super().setUpTestData()
+        old = timezone.now() - timedelta(days=400)
+        cls.expired = Order.objects.create(
+            table_number=cls.table,
+            status="paid",
+            archived=True,
+            created_at=old,
+            total_price=1000,
+        )
+        OrderItem.objects.create(
+            order=cls.expired, product=cls.product, quantity=2, unit_price=500
+        )
+        cls.recent = Order.objects.create(table_number=cls.table, archived=True)
+
+    def setUp(self) -> None:
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def archive(self, *args) -> str:
+        """Запускает archive_orders и возвращает путь к созданному файлу."""
+        call_command(
+            "archive_orders", "--output-dir", self.directory, *args, stdout=StringIO()
+        )
+        files = os.listdir(self.directory)
+        return os.path.join(self.directory, files[0]) if files else None
+
+    def test_expired_orders_exported_and_deleted(self) -> None:
+        """
+        Проверяет, что в файл попадают только старые архивные заказы
+        с позициями, а затем они удаляются из базы.
+        """
+        path = self.archive("--days", "365", "--chunk-size", "1")
+
+        records = list(read_archive(path))
+        self.assertEqual([record["id"] for record in records], [self.expired.pk])
+        self.assertEqual(records[0]["total_price"], "1000.00")
+        self.assertEqual(records[0]["table_number"], 1)
+        self.assertEqual(
+            records[0]["items"],
+            [
+                {
+                    "product": self.product.pk,
+                    "name": "Маргарита",
+                    "quantity": 2,
+                    "unit_price": "500.00",
+                }
+            ],
+        )
+        self.assertFalse(Order.objects.filter(pk=self.expired.pk).exists())
+        self.assertFalse(OrderItem.objects.filter(order=self.expired.pk).exists())
+        self.assertTrue(Order.objects.filter(pk=self.recent.pk).exists())
+        self.assertTrue(Table.objects.get(pk=self.table.pk).is_occupied)
+
+    def test_keep_and_nothing_to_export(self) -> None:
+        """Проверяет выгрузку без удаления и запуск без подходящих заказов."""
+        path = self.archive("--keep")
+        self.assertEqual(len(list(read_archive(path))), 1)
+        self.assertTrue(Order.objects.filter(pk=self.expired.pk).exists())
+
+        self.expired.delete()
+        self.assertEqual(len(os.listdir(self.directory)), 1)
+        self.archive()
+        self.assertEqual(len(os.listdir(self.directory)), 1)
+
+        with self.assertRaisesMessage(CommandError, "argument --before"):
+            self.archive("--before", "yesterday")
+
+    def test_undated_orders_kept_unless_requested(self) -> None:
+        """
+        Проверяет, что архивный заказ без даты создания не выгружается
+        по сроку хранения, а с --include-undated выгружается.
+        """
+        undated = Order.objects.create(table_number=self.table, archived=True)
+        Order.objects.filter(pk=undated.pk).update(created_at=None)
+
+        path = self.archive("--before", "2000-01-01", "--keep")
+        self.assertIsNone(path)
+
+        path = self.archive("--include-undated")
+        self.assertEqual(
+            sorted(record["id"] for record in read_archive(path)),
+            [self.expired.pk, undated.pk],
+        )
+        self.assertFalse(Order.objects.filter(pk=undated.pk).exists())
+        self.assertTrue(Order.objects.filter(pk=self.recent.pk).exists())
+
+    def test_read_and_restore(self) -> None:
+        """
+        Проверяет, что команда read_archive фильтрует записи
+        и восстанавливает заказ с прежними ценами, а повторно — пропускает.
+        """
+        path = self.archive()
+        out = StringIO()
+        call_command("read_archive", path, "--table", "2", stdout=out)
+        self.assertEqual(out.getvalue(), "")
+        call_command("read_archive", path, "--status", "paid", stdout=out)
+        self.assertEqual(json.loads(out.getvalue())["id"], self.expired.pk)
+
+        call_command("read_archive", path, "--restore", stdout=out)
+        call_command("read_archive", path, "--restore", stdout=out)
+
+        restored = Order.objects.get(pk=self.expired.pk)
+        self.assertTrue(restored.archived)
+        self.assertEqual(restored.total_price, 1000)
+        self.assertEqual(restored.created_at, self.expired.created_at)
+        self.assertEqual(restored.items.get().line_total, 1000)
+        self.assertIn("Restored 0 orders, skipped 1", out.getvalue())
+
+
+class OrderExportTest(BaseTestCase):
+    """
+    Тесты выгрузки заказов для бухгалтерии.
+    Проверяет потоковую выгрузку CSV и JSONL, фильтры и число запросов.
+    """
+
+    @classmethod
+    def setUpTestData(cls) -> None:
+        """Добавляет оплаченный архивный заказ годичной давности и заказ стола 2."""
+        super().setUpTestData()
+        cls.old = Order.objects.create(
+            table_number=cls.table,
+            status="paid",
+            archived=True,
+            total_price=1000,
+            created_at=timezone.now() - timedelta(days=365),
+        )
+        OrderItem.objects.create(
+            order=cls.old, product=cls.product, quantity=2, unit_price=500
+        )
+        cls.other_table = Table.objects.create(number=2)
+        cls.other = Order.objects.create(table_number=cls.other_table)
+
+    def test_csv_streamed(self) -> None:
+        """Проверяет, что CSV передаётся потоком и содержит все заказы с позициями."""
+        response = self.client.get(reverse("orders:order_export"))
+
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "text/csv; charset=utf-8")
+        content = b"".join(response.streaming_content).decode()
+        rows = list(csv.reader(content.splitlines()))
+        self.assertEqual(rows[0][:4], ["id", "created_at", "settled_at", "table"])
+        self.assertEqual(
+            [row[0] for row in rows[1:]],
+            [str(self.order.pk), str(self.old.pk), str(self.other.pk)],
+        )
+        self.assertEqual(
+            rows[2][3:], ["1", "paid", "1", "1000.00", "Маргарита × 2 @ 500.00"]
+        )
+
+    def test_filters(self) -> None:
+        """Проверяет фильтры по периоду, статусу и столу и ошибку в периоде."""
+        url = reverse("orders:order_export")
+        today = timezone.localdate().isoformat()
+
+        response = self.client.get(
+            url, {"date_from": today, "table": 1, "format": "jsonl"}
+        )
+        content = b"".join(response.streaming_content)
+        records = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual([record["id"] for record in records], [self.order.pk])
+
+        response = self.client.get(url, {"status": "paid", "format": "jsonl"})
+        record = json.loads(b"".join(response.streaming_content))
+        self.assertEqual(record["items"][0]["unit_price"], "500.00")
+
+        response = self.client.get(url, {"date_from": today, "date_to": "2000-01-01"})
+        self.assertEqual(response.status_code, 400)
+
+    async def test_asgi_streams_asynchronously(self) -> None:
+        """
+        Проверяет, что под ASGI ответ получает асинхронный итератор
+        и отдаёт те же строки, что и синхронный.
+        """
+        url = reverse("orders:order_export")
+        response = await self.async_client.get(url, {"format": "jsonl"})
+
+        self.assertTrue(response.is_async)
+        lines = [line async for line in response.streaming_content]
+        self.assertEqual(
+            [json.loads(line)["id"] for line in lines],
+            [self.order.pk, self.old.pk, self.other.pk],
+        )
+
+    def test_command_rejects_bad_date(self) -> None:
+        """Проверяет, что неверная дата — ошибка аргумента, а не исключение."""
+        with self.assertRaisesMessage(CommandError, "argument --date-from"):
+            call_command("export_orders", "--date-from", "2025-13-01")
+
+    def test_command_reads_in_chunks(self) -> None:
+        """
+        Проверяет, что команда export_orders читает заказы порциями:
+        запрос заказов и по запросу позиций на порцию.
+        """
+        out = StringIO()
+        with self.assertNumQueries(1 + 2):
+            call_command(
+                "export_orders", "--format", "jsonl", "--chunk-size", "2", stdout=out
+            )
+
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(json.loads(lines[1])["total_price"], "1000.00")
+
+
+class JobQueueTest(BaseTestCase):
+    """
+    Тесты очереди фоновых задач.
+    Проверяет постановку в очередь в транзакции, выполнение, повторы
+    с паузой, состояние failed и команду jobs.
+    """
+
+    def test_rollup_moved_to_queue(self) -> None:
+        """Проверяет, что оплата ставит сводку в очередь, а воркер её выполняет."""
+        order = Order.objects.get(pk=self.order.pk)
+        order.status = "paid"
+        order.save()
+
+        job = Job.objects.get()
+        self.assertEqual(job.name, "orders.rollups.record_sales")
+        self.assertEqual(job.kwargs, {"order_ids": [order.pk]})
+        self.assertFalse(DailyTableSales.objects.exists())
+
+        self.assertEqual(run_pending(), (1, 0))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ("done", 1))
+        self.assertEqual(DailyTableSales.objects.get().orders_count, 1)
+        self.assertEqual(run_pending(), (0, 0))
+
+    def test_rolled_back_job_discarded(self) -> None:
+        """Проверяет, что задача из откатившейся транзакции не ставится."""
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                enqueue(flaky_job, fail=False)
+                raise RuntimeError
+
+        self.assertFalse(Job.objects.exists())
+
+    @override_settings(JOBS_RETRY_DELAY=60)
+    def test_retry_then_fail(self) -> None:
+        """
+        Проверяет, что упавшая задача откладывается, после последней попытки
+        получает состояние failed и возвращается в очередь командой jobs.
+        """
+        job = enqueue(flaky_job, fail=True)
+
+        self.assertEqual(run_pending(), (0, 1))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ("queued", 1))
+        self.assertGreater(job.run_at, timezone.now() + timedelta(seconds=50))
+        self.assertIn("kitchen printer is offline", job.last_error)
+        self.assertEqual(run_pending(), (0, 0))
+
+        Job.objects.update(run_at=timezone.now())
+        self.assertEqual(run_pending(), (0, 1))
+        job.refresh_from_db()
+        self.assertEqual(job.status, "failed")
+
+        out = StringIO()
+        call_command("jobs", "--failed", stdout=out)
+        self.assertIn("tests.flaky: failed 1", out.getvalue())
+        self.assertIn("after 2 attempts: RuntimeError", out.getvalue())
+
+        Job.objects.update(kwargs={"fail": False})
+        call_command("jobs", "--retry", stdout=out)
+        self.assertEqual(run_pending(), (1, 0))
+        self.assertTrue(Table.objects.filter(number=99).exists())
+
+    def test_stale_job_not_finished_twice(self) -> None:
+        """
+        Проверяет, что задача, которую вернули в очередь и забрал другой
+        воркер, не фиксирует свои изменения у первого воркера, а задача,
+        исчерпавшая попытки, не возвращается в очередь.
+        """
+        enqueue(flaky_job, fail=False)
+        [job] = claim_jobs("first", 1)
+        Job.objects.update(started_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(requeue_stale(timeout=60), 1)
+        [retaken] = claim_jobs("second", 1)
+
+        self.assertFalse(run_job(job))
+        self.assertFalse(Table.objects.filter(number=99).exists())
+        self.assertTrue(run_job(retaken))
+        self.assertEqual(Table.objects.filter(number=99).count(), 1)
+
+        job = enqueue(flaky_job, fail=False, number=98)
+        Job.objects.filter(pk=job.pk).update(
+            status="running",
+            attempts=job.max_attempts,
+            started_at=timezone.now() - timedelta(hours=1),
+        )
+        self.assertEqual(requeue_stale(timeout=60), 0)
+        job.refresh_from_db()
+        self.assertEqual(job.status, "failed")
+
+    @override_settings(JOBS_EAGER=True)
+    def test_eager_mode(self) -> None:
+        """
+        Проверяет, что с JOBS_EAGER задача выполняется после фиксации без очереди,
+        а ошибка задачи записывается в журнал и не прерывает запрос.
+        """
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertIsNone(enqueue(flaky_job, fail=False))
+
+        self.assertFalse(Job.objects.exists())
+        self.assertTrue(Table.objects.filter(number=99).exists())
+
+        with self.assertLogs("django", "ERROR") as logs:
+            with self.captureOnCommitCallbacks(execute=True):
+                enqueue(flaky_job, fail=True)
+                enqueue(flaky_job, fail=False, number=98)
+
+        self.assertIn("kitchen printer is offline", logs.output[0])
+        self.assertTrue(Table.objects.filter(number=98).exists())
+
+
+class RunJobsCommandTest(TransactionTestCase):
+    """
+    Тест воркера: команда run_jobs выполняет задачи в потоке пула.
+    Тестовая база SQLite в памяти с общим кэшем блокирует таблицы целиком,
+    поэтому поток один.
+    """
+
+    def test_worker_drains_queue(self) -> None:
+        """Проверяет, что run_jobs --once выполняет все готовые задачи и выходит."""
+        for number in (101, 102, 103):
+            enqueue(flaky_job, fail=False, number=number)
+        out = StringIO()
+
+        call_command("run_jobs", "--once", "--workers", "1", stdout=out)
+
+        self.assertEqual(Job.objects.filter(status="done").count(), 3)
+        self.assertEqual(Table.objects.filter(number__gt=100).count(), 3)
+        self.assertIn("3 jobs done, 0 failed", out.getvalue())
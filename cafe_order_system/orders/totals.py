@@ -0,0 +1,93 @@
+"""
+Массовый пересчёт итоговой стоимости заказов.
+
+Заказы обрабатываются диапазонами первичных ключей: граница очередного
+диапазона находится одним запросом, а пересчёт внутри диапазона — одним
+UPDATE с подзапросом по позициям. В Python не загружается ни один заказ,
+поэтому миллион заказов пересчитывается за тысячу коротких транзакций.
+"""
+
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Subquery
+
+from .cache import invalidate_tables_on_commit
+from .models import Order, OrderItem, Product, open_orders
+
+
+def order_chunks(queryset, chunk_size):
+    """
+    Делит выборку заказов на последовательные диапазоны первичных ключей.
+
+    Для каждого диапазона выполняется один запрос за его верхней границей;
+    сами заказы не читаются.
+
+    Возвращает:
+        Iterator[QuerySet]: Выборки заказов не больше `chunk_size` каждая.
+    """
+    last = 0
+    while True:
+        rest = queryset.filter(pk__gt=last)
+        upper = (
+            rest.order_by("pk")
+            .values_list("pk", flat=True)[chunk_size - 1 : chunk_size]
+            .first()
+        )
+        if upper is None:
+            yield rest
+            return
+        yield rest.filter(pk__lte=upper)
+        last = upper
+
+
+def recompute_totals(
+    orders=None, product_ids=None, reprice=False, chunk_size=1000, progress=None
+):
+    """
+    Пересчитывает `total_price` заказов set-based запросами по частям.
+
+    Переписываются только заказы, чья стоимость расходится с позициями;
+    их версия увеличивается (см. `OrderQuerySet.refresh_totals`).
+
+    Аргументы:
+        orders: Выборка заказов; по умолчанию — все заказы.
+        product_ids: Ограничивает пересчёт заказами с этими блюдами.
+        reprice: Перед пересчётом обновить цену позиций открытых заказов
+                 по текущей цене блюда. Цена позиции — снимок на момент
+                 заказа, поэтому закрытые заказы не переоцениваются никогда.
+        chunk_size: Количество заказов в одной транзакции.
+        progress: Функция, вызываемая после каждой части с числами
+                  изменённых заказов и переоценённых позиций.
+
+    Возвращает:
+        tuple: Количество изменённых заказов и переоценённых позиций.
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be a positive integer")
+    if orders is None:
+        orders = Order.objects.all()
+    items = OrderItem.objects.all()
+    if product_ids is not None:
+        items = items.filter(product__in=product_ids)
+        orders = orders.filter(
+            Exists(items.filter(order=OuterRef("pk")).values("pk"))
+        )
+
+    price = Subquery(
+        Product.objects.filter(pk=OuterRef("product")).order_by().values("price")
+    )
+    changed = repriced = 0
+    for chunk in order_chunks(orders, chunk_size):
+        with transaction.atomic():
+            if reprice:
+                repriced += (
+                    items.filter(order__in=chunk.filter(open_orders()).values("pk"))
+                    .exclude(unit_price=F("product__price"))
+                    .update(unit_price=price)
+                )
+            chunk_changed = chunk.refresh_totals()
+            if chunk_changed:
+                invalidate_tables_on_commit()
+            changed += chunk_changed
+        if progress is not None:
+            progress(changed, repriced)
+    return changed, repriced
@@ -1,5 +1,13 @@
 from django.urls import path
-from .views import OrderCreate, OrderList, OrderDetail, OrderUpdate, OrderDelete
+from .views import (
+    OrderCreate,
+    OrderList,
+    OrderDetail,
+    OrderUpdate,
+    OrderDelete,
+    OrderEvents,
+    OrderExport,
+)
 
 app_name = "orders"
 
@@ -9,4 +17,6 @@ urlpatterns = [
     path("orders/<int:pk>", OrderDetail.as_view(), name="order_detail"),
     path("orders/<int:pk>/update", OrderUpdate.as_view(), name="order_update"),
     path("orders/<int:pk>/delete", OrderDelete.as_view(), name="order_delete"),
+    path("orders/events/", OrderEvents.as_view(), name="order_events"),
+    path("orders/export/", OrderExport.as_view(), name="order_export"),
 ]
@@ -1,5 +1,16 @@
-from django.http import HttpResponseRedirect
+import asyncio
+import json
+
+from django.conf import settings
+from django.db import transaction
+from django.core.handlers.asgi import ASGIRequest
+from django.http import (
+    HttpResponseBadRequest,
+    HttpResponseRedirect,
+    StreamingHttpResponse,
+)
 from django.urls import reverse_lazy
+from django.views import View
 from django.views.generic import (
     ListView,
     DetailView,
@@ -7,8 +18,21 @@ from django.views.generic import (
     UpdateView,
     DeleteView,
 )
-from .models import Order
-from .forms import OrderForm
+from .cache import render_order_fragments
+from .events import get_broadcast
+from .exports import EXPORT_FORMATS, aiter_lines, export_lines, filter_orders
+from .models import Order, OrderConflictError
+from .forms import (
+    OrderDeleteForm,
+    OrderExportForm,
+    OrderFilterForm,
+    OrderForm,
+    OrderItemFormSet,
+)
+
+CONFLICT_MESSAGE = (
+    "Заказ был изменён другим пользователем. Обновите страницу и повторите изменения."
+)
 
 
 class OrderList(ListView):
@@ -16,25 +40,130 @@ class OrderList(ListView):
     Представление для отображения списка заказов.
 
     Контролирует отображение всех заказов, которые не архивированы.
-    Использует фильтрацию по полю `archived` (false).
+    Использует фильтрацию по полю `archived` (false), а также по статусу
+    и номеру стола из GET-параметров `status` и `table`.
+
+    Список разбивается на страницы по ключу (keyset): заказы идут от новых
+    к старым, следующая страница начинается после заказа с id из параметра
+    `after`. В отличие от OFFSET стоимость страницы не растёт с глубиной,
+    а стол и позиции подгружаются фиксированным числом запросов.
 
     Атрибуты:
         model: Модель, с которой работает представление (Order).
         context_object_name: Имя контекста для списка заказов.
         queryset: Запрос для получения всех неархивированных заказов.
+        paginate_by: Количество заказов на странице.
     """
 
     model = Order
     context_object_name = "order_list"
-    queryset = Order.objects.filter(archived=False)
+    queryset = Order.objects.filter(archived=False).select_related("table_number")
+    paginate_by = 20
+
+    def get_queryset(self):
+        """Применяет фильтры по статусу и столу и сортирует от новых к старым."""
+        queryset = super().get_queryset()
+        self.filter_form = OrderFilterForm(self.request.GET)
+        if self.filter_form.is_valid():
+            status = self.filter_form.cleaned_data["status"]
+            table = self.filter_form.cleaned_data["table"]
+            if status:
+                queryset = queryset.filter(status=status)
+            if table:
+                queryset = queryset.filter(table_number__number=table)
+        return queryset.order_by("-pk")
+
+    def paginate_queryset(self, queryset, page_size):
+        """
+        Возвращает страницу заказов по ключу.
+
+        Выбирает на одну запись больше размера страницы, чтобы без COUNT(*)
+        узнать, есть ли следующая страница.
+        """
+        after = None
+        if self.filter_form.is_valid():
+            after = self.filter_form.cleaned_data["after"]
+        if after:
+            queryset = queryset.filter(pk__lt=after)
+
+        orders = list(queryset[: page_size + 1])
+        has_next = len(orders) > page_size
+        orders = orders[:page_size]
+
+        self.next_query = None
+        if has_next:
+            query = self.request.GET.copy()
+            query["after"] = orders[-1].pk
+            self.next_query = query.urlencode()
+        return None, None, orders, has_next
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["filter_form"] = self.filter_form
+        context["next_query"] = self.next_query
+        context["order_fragments"] = render_order_fragments(
+            context["object_list"], "list"
+        )
+        return context
+
+
+class OrderItemsMixin:
+    """
+    Примесь для представлений, редактирующих заказ вместе с его позициями.
+
+    Добавляет в контекст набор форм `formset` и сохраняет заказ и позиции
+    в одной транзакции. Итоговая стоимость пересчитывается одним UPDATE
+    по зафиксированным ценам позиций. Форма с ошибками (в том числе
+    с недопустимой сменой статуса) возвращается с кодом 400. Если заказ
+    изменили после открытия формы, транзакция откатывается и форма
+    возвращается с ошибкой и кодом 409.
+    """
+
+    def get_formset(self):
+        """Возвращает набор форм позиций для текущего заказа."""
+        kwargs = {"instance": self.object}
+        if self.request.method == "POST":
+            kwargs["data"] = self.request.POST
+        return OrderItemFormSet(**kwargs)
+
+    def get_context_data(self, **kwargs):
+        if "formset" not in kwargs:
+            kwargs["formset"] = self.get_formset()
+        return super().get_context_data(**kwargs)
 
+    def form_invalid(self, form):
+        return self.render_to_response(self.get_context_data(form=form), status=400)
 
-class OrderCreate(CreateView):
+    def form_valid(self, form):
+        """Сохраняет заказ и его позиции, если валидны и форма, и набор форм."""
+        formset = self.get_formset()
+        if not formset.is_valid():
+            return self.render_to_response(
+                self.get_context_data(form=form, formset=formset), status=400
+            )
+
+        try:
+            with transaction.atomic():
+                self.object = form.save()
+                formset.instance = self.object
+                formset.save()
+                Order.objects.filter(pk=self.object.pk).update_totals()
+        except OrderConflictError:
+            form.add_error(None, CONFLICT_MESSAGE)
+            return self.render_to_response(
+                self.get_context_data(form=form, formset=formset), status=409
+            )
+
+        return HttpResponseRedirect(self.get_success_url())
+
+
+class OrderCreate(OrderItemsMixin, CreateView):
     """
     Представление для создания нового заказа.
 
-    Формирует форму для создания нового заказа. После того как форма отправлена и валидирована,
-    создаётся новый объект заказа, вычисляется его общая стоимость, и он сохраняется в базе данных.
+    Формирует форму для создания нового заказа и набор форм его позиций. После того как
+    формы отправлены и валидированы, заказ и позиции сохраняются в базе данных, а общая
+    стоимость вычисляется по зафиксированным ценам позиций.
 
     Атрибуты:
         model: Модель, с которой работает представление (Order).
@@ -43,9 +172,6 @@ class OrderCreate(CreateView):
         template_name: Шаблон для отображения формы.
         success_url: URL, куда происходит редирект после успешного создания заказа.
 
-    Методы:
-        form_valid: Обработка валидной формы — сохраняет заказ, вычисляет его общую стоимость
-                    и перенаправляет на страницу списка заказов.
     """
 
     model = Order
@@ -54,40 +180,35 @@ class OrderCreate(CreateView):
     template_name = "orders/order_create_form.html"
     success_url = reverse_lazy("orders:order_list")
 
-    def form_valid(self, form):
-        """Обработка валидной формы."""
-        self.object = form.save(commit=False)
-        self.object.save()
-
-        form.save_m2m()
-
-        self.object.calculate_total_price()
-        self.object.save()
-
-        return super().form_valid(form)
-
 
 class OrderDetail(DetailView):
     """
     Представление для отображения подробностей заказа.
 
     Отображает подробную информацию о выбранном заказе, включая все связанные продукты.
+    Блок заказа берётся из кэша фрагментов, позиции читаются только при промахе.
 
     Атрибуты:
-        queryset: Запрос для получения заказа с предзагруженными связанными продуктами.
+        queryset: Запрос для получения заказа вместе со столом.
         context_object_name: Имя контекста для отображаемых данных заказа.
     """
 
-    queryset = Order.objects.prefetch_related("products")
+    queryset = Order.objects.select_related("table_number")
     context_object_name = "order_details"
 
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["order_fragment"] = render_order_fragments([self.object], "detail")[0]
+        return context
 
-class OrderUpdate(UpdateView):
+
+class OrderUpdate(OrderItemsMixin, UpdateView):
     """
     Представление для редактирования заказа.
 
     Обрабатывает обновление данных существующего заказа. Пользователь может изменить информацию о заказе,
-    включая статус и продукты. После успешного обновления заказ сохраняется.
+    включая статус, блюда и их количество. После успешного обновления заказ сохраняется,
+    а общая стоимость пересчитывается.
 
     Атрибуты:
         model: Модель, с которой работает представление (Order).
@@ -114,6 +235,7 @@ class OrderDelete(DeleteView):
     Атрибуты:
         model: Модель, с которой работает представление (Order).
         context_object_name: Имя контекста для отображаемого заказа.
+        form_class: Форма подтверждения с версией заказа.
         template_name: Шаблон для отображения страницы удаления.
         success_url: URL, куда происходит редирект после успешного удаления.
 
@@ -123,12 +245,98 @@ class OrderDelete(DeleteView):
 
     model = Order
     context_object_name = "order_delete"
+    form_class = OrderDeleteForm
     template_name = "orders/order_delete.html"
     success_url = reverse_lazy("orders:order_list")
 
+    def get_initial(self):
+        return {"version": self.object.version}
+
     def form_valid(self, form):
-        """Архивирует заказ и перенаправляет на страницу списка заказов."""
+        """
+        Архивирует заказ и перенаправляет на страницу списка заказов.
+        Если заказ изменили после открытия страницы, возвращает 409 с ошибкой формы.
+        """
         success_url = self.get_success_url()
+        if form.cleaned_data["version"]:
+            self.object.version = form.cleaned_data["version"]
         self.object.archived = True
-        self.object.save()
+        try:
+            with transaction.atomic():
+                self.object.save()
+        except OrderConflictError:
+            form.add_error(None, CONFLICT_MESSAGE)
+            return self.render_to_response(self.get_context_data(form=form), status=409)
         return HttpResponseRedirect(success_url)
+
+
+class OrderExport(View):
+    """
+    Выгрузка заказов для бухгалтерии в CSV или JSONL.
+
+    Параметры GET: `date_from`, `date_to`, `status`, `table` и `format`
+    (`csv` по умолчанию или `jsonl`). Ответ передаётся потоком по мере
+    чтения заказов из базы порциями, поэтому ни ответ, ни выборка
+    не собираются в памяти целиком. Под ASGI ответ получает асинхронный
+    итератор: синхронный Django собрал бы в памяти до первого байта.
+
+    Атрибуты:
+        chunk_size: Количество заказов в одной порции чтения.
+    """
+
+    chunk_size = 1000
+
+    def get(self, request, *args, **kwargs):
+        form = OrderExportForm(request.GET)
+        if not form.is_valid():
+            return HttpResponseBadRequest(form.errors.as_text())
+        params = dict(form.cleaned_data)
+        fmt = params.pop("format")
+        lines = export_lines(filter_orders(**params), fmt, self.chunk_size)
+        if isinstance(request, ASGIRequest):
+            lines = aiter_lines(lines)
+        response = StreamingHttpResponse(lines, content_type=EXPORT_FORMATS[fmt])
+        response["Content-Disposition"] = f'attachment; filename="orders.{fmt}"'
+        return response
+
+
+class OrderEvents(View):
+    """
+    Поток событий заказов для экранов кухни и зала (Server-Sent Events).
+
+    Вместо периодической перезагрузки списка заказов экран держит одно
+    соединение и получает события о создании заказа, смене статуса
+    и архивации по мере их появления. Во время простоя отправляется
+    комментарий-пинг, чтобы прокси не закрывали соединение.
+
+    Работает только под ASGI: каждое открытое соединение — это корутина,
+    а не занятый поток.
+
+    Интервал пинга в секундах задаётся настройкой `ORDER_EVENTS_KEEPALIVE`
+    (по умолчанию 15). Если рассылка оборвала подписку, поток завершается
+    с ошибкой, а клиент `EventSource` переподключается сам.
+    """
+
+    async def get(self, request, *args, **kwargs):
+        response = StreamingHttpResponse(
+            self.stream(), content_type="text/event-stream"
+        )
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+    async def stream(self):
+        """Подписывается на рассылку и отдаёт события в формате SSE."""
+        keepalive = getattr(settings, "ORDER_EVENTS_KEEPALIVE", 15)
+        async with get_broadcast().subscribe() as queue:
+            yield ": connected\n\n"
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), keepalive)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield (
+                    f"event: order.{message['event']}\n"
+                    f"data: {json.dumps(message)}\n\n"
+                )